@@ -1,15 +1,28 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import os, json
+import sys
+import subprocess
 import re
 import random
-import base64
-from functools import lru_cache
-from itertools import product
-from PIL import Image
+import time
+import threading
+import logging
+from collections import OrderedDict
+import heapq
+import hashlib
+import sqlite3
+from contextlib import closing
 import altair as alt
-from save_reader import get_savegames, extract_weapons_from_scop, extract_unknown_weapon_tokens
-from paths_config import get_path
+from save_reader import (
+    get_savegames, scan_save, scan_all_saves, merge_save_scans, first_seen_timeline,
+    UNKNOWN_TOKEN_LIMIT,
+)
+from paths_config import PATHS, get_path
+from icon_store import load_icon_store, icon_cache
+
+logger = logging.getLogger(__name__)
 
 # --- CONFIG & PATHS ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -17,10 +30,22 @@ DATA_DIR = os.path.join(BASE_DIR, "loadout_lab_data")
 LOCKER_FILE = os.path.join(DATA_DIR, "test_locker.json") if os.environ.get("TESTING_ENV") else os.path.join(DATA_DIR, "my_locker.json")
 BACKUP_FILE = os.path.join(DATA_DIR, "test_locker_backup.json") if os.environ.get("TESTING_ENV") else os.path.join(DATA_DIR, "my_locker_backup.json")
 UI_PREFS_FILE = os.path.join(DATA_DIR, "ui_prefs.json")
+ICON_DIR = os.path.join(DATA_DIR, "icons")
+WEAPON_CACHE_META = None if os.environ.get("TESTING_ENV") else os.path.join(DATA_DIR, "weapons_cache.json")
+DRAFT_CACHE_FILE = None if os.environ.get("TESTING_ENV") else os.path.join(DATA_DIR, "draft_cache.sqlite")
+INGAME_OVERRIDES_FILE = os.path.join(BASE_DIR, "ingame_stats_overrides.json")
+BALANCE_CFG_PATH = "balance_config.json"
+BULK_SCAN_CACHE_FILE = None if os.environ.get("TESTING_ENV") else os.path.join(DATA_DIR, "save_scan_cache.json")
+SCRAPER_SCRIPT = os.path.join(BASE_DIR, "scraper.py")
+# Same order as scraper.STAGES (the app doesn't import the scraper).
+SCRAPER_STAGES = ("discover", "parse", "resolve", "classify", "dedupe", "stats", "icons")
+SCRAPER_OUTPUT_LINES = 15
 SAVE_DIR = "/mnt/c/G.A.M.M.A/Anomaly-1.5.3-Full.2/appdata/savedgames/"
 SAVE_DIR = str(get_path("save_dir", SAVE_DIR))
 
 # --- CONFIG & RULES ---
+DEFAULT_DRAFT_SEED = 0
+DRAFT_SEED_MAX = 999_999
 GROUP_LIGHT = ['5.45x39', '5.56x45', '7.62x39', '9x39']
 GROUP_HEAVY = ['7.62x51', '7.62x54', '12.7x55', '.300', '.338', '23x75', '12x76']
 POWER_AMMO = GROUP_HEAVY + ['23x75', '12x76']
@@ -36,10 +61,6 @@ SIDEARM_SMG_PREFIXES = (
     "wpn_mp7",
     "wpn_eft_mp7",
 )
-ICON_NO_CW_FALLBACK_PREFIXES = (
-    "wpn_spas12",
-)
-
 CALIBER_WEIGHT_PATTERNS = [
     ("9x18", 0.72),
     ("9x19", 0.72),
@@ -129,6 +150,9 @@ def save_ui_prefs():
         "show_raw_stats_cards": st.session_state.get("show_raw_stats_cards", False),
         "show_locker_icons": st.session_state.get("show_locker_icons", False),
         "diversity_draft_mode": st.session_state.get("diversity_draft_mode", False),
+        "optimal_draft_mode": st.session_state.get("optimal_draft_mode", False),
+        "draft_first_n": int(st.session_state.get("draft_first_n", 0)),
+        "draft_seed": int(st.session_state.get("draft_seed", DEFAULT_DRAFT_SEED)),
     }
     with open(UI_PREFS_FILE, "w", encoding="utf-8") as f:
         json.dump(payload, f, indent=2)
@@ -143,15 +167,146 @@ def init_ui_prefs():
         "show_raw_stats_cards": False,
         "show_locker_icons": False,
         "diversity_draft_mode": False,
+        "optimal_draft_mode": False,
+        "draft_first_n": 0,
+        "draft_seed": DEFAULT_DRAFT_SEED,
     }
     for key, default_value in defaults.items():
         if key not in st.session_state:
             st.session_state[key] = prefs.get(key, default_value)
 
+DRAFT_STREAM_REFRESH_S = 0.25
+
+def render_draft_progress(placeholder, sets):
+    recent = "  \n".join(
+        f"{s['badge']} #{s['order'] + 1}: " + " · ".join(str(w.get('real_name') or w.get('id')) for w in s['weapons'])
+        for s in sets[-8:]
+    )
+    placeholder.info(f"⏳ Drafting... {len(sets)} sets so far  \n{recent}")
+
+def stream_draft_sets(inventory_ids, strategy, draft_mode, seed, first_n, run_key):
+    """Planner drafting: cached drafts return at once, new ones render set by set.
+
+    A click on 'Cancel draft' interrupts the running script; the rerun then shows the
+    sets drafted so far (kept in session_state) instead of starting over.
+    """
+    inventory, cache_key = draft_request(inventory_ids, strategy, draft_mode, seed)
+    cached = lookup_draft(cache_key)
+    if cached is not None:
+        if not first_n:
+            return cached
+        # Same N sets a fresh run would stop at: first in draft order, then display-sorted.
+        head = sorted(cached, key=lambda s: s['order'])[:first_n]
+        return finish_draft(list(inventory), strategy, draft_mode, seed, head, complete=False)
+
+    cancel_slot = st.empty()
+    with cancel_slot:
+        cancel_clicked = st.button("⏹ Cancel draft", key="cancel_draft")
+    partial = st.session_state.get("draft_partial")
+    if partial and partial["key"] == run_key and (cancel_clicked or partial["cancelled"]):
+        partial["cancelled"] = True
+        cancel_slot.empty()
+        st.warning(f"Draft cancelled after {len(partial['sets'])} sets; showing the partial result. Change a draft setting or use 'Generate sets' to run it again.")
+        return finish_draft(list(inventory), strategy, draft_mode, seed, list(partial["sets"]), complete=False)
+
+    progress = st.empty()
+    progress.info("⏳ Drafting...")
+    sets = []
+    st.session_state.draft_partial = {"key": run_key, "sets": sets, "cancelled": False}
+    stopped_early = False
+    last_render = time.perf_counter()
+
+    def solver_progress(nodes):
+        # Redrawing the placeholder is also where Streamlit delivers a Cancel click, so an
+        # optimal-mode solve stops here instead of running out its time budget.
+        nonlocal last_render
+        if time.perf_counter() - last_render >= DRAFT_STREAM_REFRESH_S:
+            progress.info(f"🧮 Solving for the most flawless sets... {nodes} nodes searched")
+            last_render = time.perf_counter()
+
+    for s_entry in iter_draft_sets(list(inventory), strategy, draft_mode, seed, on_solver_progress=solver_progress):
+        sets.append(s_entry)
+        if first_n and len(sets) >= first_n:
+            stopped_early = True
+            break
+        if time.perf_counter() - last_render >= DRAFT_STREAM_REFRESH_S:
+            render_draft_progress(progress, sets)
+            last_render = time.perf_counter()
+    progress.empty()
+    cancel_slot.empty()
+    st.session_state.draft_partial = None
+
+    result = finish_draft(list(inventory), strategy, draft_mode, seed, sets, complete=not stopped_early)
+    if not stopped_early:
+        remember_draft(cache_key, result)
+    return result
+
+def render_solver_report(report, greedy):
+    # `greedy` summarizes the classic draft for the same locker/strategy/seed. Gaps are measured
+    # against bounds: the most disjoint flawless sets (proven, or the solver's root bound on
+    # timeout) and draft_summary's minimum reuse. Only the flawless sets are solved exactly;
+    # the remaining sets are drafted greedily, so their reuse is bounded, not minimized.
+    optimal = report.get("optimal")
+    if not optimal or not greedy:
+        return
+    if report.get("proven_optimal"):
+        status = "flawless sets proven maximal"
+        flawless_max = optimal["flawless_sets"]
+    else:
+        status = f"time budget hit; at most {report.get('flawless_bound')} flawless sets exist"
+        flawless_max = report.get("flawless_bound", optimal["flawless_sets"])
+    reuse_gap = lambda summary: summary["redundant_slots"] - summary.get("min_redundant_slots", 0)
+    st.caption(
+        f"🧮 Optimal draft ({status}; {report.get('nodes', 0)} nodes in {report.get('seconds', 0.0) * 1000:.0f} ms). "
+        f"Gap to the bounds, optimal vs. greedy: {flawless_max - optimal['flawless_sets']} vs. "
+        f"{flawless_max - greedy['flawless_sets']} flawless sets below the maximum of {flawless_max}; "
+        f"{reuse_gap(optimal)} vs. {reuse_gap(greedy)} reused slots above the minimum "
+        f"({optimal['redundant_slots']} vs. {greedy['redundant_slots']} reused, "
+        f"{optimal['total_sets']} vs. {greedy['total_sets']} sets, "
+        f"flawless score {optimal['flawless_score']:.0f} vs. {greedy['flawless_score']:.0f}). "
+        f"Sets after the flawless ones are drafted greedily, so their reuse is bounded, not minimized."
+    )
+
+def reroll_draft_seed():
+    # Widget callback: runs before the seed input is re-created, so it may set its key.
+    st.session_state.draft_seed = random.randrange(DRAFT_SEED_MAX + 1)
+
+def reload_paths():
+    # Widget callback: runs before SAVE_DIR is read again, so a changed save_dir applies on this rerun.
+    changed = PATHS.refresh()
+    st.session_state.paths_reload_note = "Paths reloaded." if changed else "paths_config.json and modlist unchanged."
+
+def run_scraper_stage(stage):
+    # Widget callback: the stage runs in a child process; this rerun waits for it.
+    started = time.perf_counter()
+    with st.spinner(f"Running scraper stage '{stage}'..."):
+        try:
+            proc = subprocess.run([sys.executable, SCRAPER_SCRIPT, "--only", stage], cwd=BASE_DIR,
+                                  capture_output=True, text=True, encoding="utf-8", errors="replace")
+            ok, output = proc.returncode == 0, proc.stdout + proc.stderr
+        except Exception as e:
+            ok, output = False, str(e)
+    st.session_state.scraper_stage_result = {
+        "stage": stage, "ok": ok, "seconds": time.perf_counter() - started,
+        "output": "\n".join(output.strip().splitlines()[-SCRAPER_OUTPUT_LINES:]),
+    }
+
+def render_scraper_stages():
+    with st.sidebar.expander("🛠️ Scraper stages"):
+        st.caption("Re-run one stage from the last scrape's checkpoints, e.g. `icons` after an icon fix. "
+                   "Earlier stages run too if their checkpoint is missing.")
+        stage = st.selectbox("Stage", SCRAPER_STAGES, index=SCRAPER_STAGES.index("icons"), key="scraper_stage")
+        st.button("▶️ Run stage", key="run_scraper_stage", on_click=run_scraper_stage, args=(stage,))
+        result = st.session_state.get("scraper_stage_result")
+        if result:
+            status = "finished" if result["ok"] else "failed"
+            st.caption(f"Stage '{result['stage']}' {status} in {result['seconds']:.1f}s")
+            st.code(result["output"] or "(no output)")
+
 def render_startup_health():
     config_ok = os.path.exists("paths_config.json")
     stats_ok = os.path.exists(os.path.join(DATA_DIR, "weapons_stats.csv"))
-    icon_dir = os.path.join(DATA_DIR, "icons")
+    icon_dir = ICON_DIR
     icon_count = 0
     if os.path.isdir(icon_dir):
         try:
@@ -162,6 +317,8 @@ def render_startup_health():
 
     if config_ok and stats_ok and icons_ok:
         st.sidebar.success("🩺 Startup health: ready")
+        render_runtime_stats()
+        render_scraper_stages()
         return
 
     st.sidebar.warning("🩺 Startup health: action needed")
@@ -175,14 +332,29 @@ def render_startup_health():
             st.caption("Fix: run python3 scraper.py to generate weapons_stats.csv.")
         if not icons_ok:
             st.caption("Fix: run python3 scraper.py to extract icon PNGs.")
-
-def apply_unified_score_to_df():
-    # Display layer uses normalized score for readability; draft logic still
-    # uses final_score internally.
-    if 'global_norm_score' in df.columns:
-        df['score'] = df['global_norm_score']
-    else:
-        df['score'] = df['final_score']
+    render_runtime_stats()
+    render_scraper_stages()
+
+def render_runtime_stats():
+    if WEAPON_TABLE_INFO["seconds"] is not None:
+        source = "binary cache" if WEAPON_TABLE_INFO["source"] == "cache" else "weapons_stats.csv (cache rebuilt)"
+        st.sidebar.caption(f"⏱️ Weapon table: {WEAPON_TABLE_INFO['seconds'] * 1000:.0f} ms from {source} (shared by all sessions)")
+    stats = icon_cache.stats()
+    lookups = stats["hits"] + stats["misses"]
+    hit_rate = (100.0 * stats["hits"] / lookups) if lookups else 0.0
+    st.sidebar.caption(
+        f"🖼️ Icon cache: {stats['entries']} items, {stats['mb']:.1f}/{stats['budget_mb']:.0f} MB · "
+        f"{stats['hits']} hits / {stats['misses']} misses ({hit_rate:.0f}%) · "
+        f"{stats['evictions']} evicted · {stats['invalidations']} resets"
+    )
+    paths = PATHS.info()
+    mods = f" · {paths['mods']} MO2 mods" if paths["modlists"] else ""
+    st.sidebar.caption(f"📁 Paths: resolved in {paths['seconds'] * 1000:.1f} ms{mods} · {paths['refreshes']} reloads")
+    st.sidebar.button("🔄 Reload paths", key="reload_paths", on_click=reload_paths,
+                      help="Re-read paths_config.json and the MO2 modlist if they changed on disk.")
+    note = st.session_state.pop("paths_reload_note", None)
+    if note:
+        st.sidebar.caption(note)
 
 def prettify_ammo(ammo_raw):
     if pd.isna(ammo_raw):
@@ -273,90 +445,21 @@ def compute_class_normalized_scores(df_local):
     )
     return ranked * 100.0
 
-def load_icon_image(path):
-    def open_visible_rgba(p):
-        if not os.path.exists(p):
-            return None
-        rgba_local = Image.open(p).convert("RGBA")
-        alpha_max = rgba_local.getchannel("A").getextrema()[1]
-        if alpha_max == 0:
-            return None
-        return rgba_local
-
-    rgba = open_visible_rgba(path)
-    if rgba is None:
-        root, ext = os.path.splitext(path)
-        stem = os.path.basename(root)
-        folder = os.path.dirname(path)
-        candidates = []
-        
-        # Manual fix: Base SPAS-12 icon often extracts as invisible. Fall back to custom variant.
-        if stem == "wpn_spas12":
-            candidates.append(os.path.join(folder, f"wpn_spas12_custom{ext}"))
-            
-        allow_cw_fallback = not any(stem.startswith(prefix) for prefix in ICON_NO_CW_FALLBACK_PREFIXES)
-
-        if allow_cw_fallback and not stem.endswith("_cw"):
-            candidates.append(os.path.join(folder, f"{stem}_cw{ext}"))
-
-        parts = stem.split("_")
-        for i in range(len(parts) - 1, 1, -1):
-            base = "_".join(parts[:i])
-            if allow_cw_fallback:
-                candidates.append(os.path.join(folder, f"{base}_cw{ext}"))
-
-        seen = set()
-        for candidate in candidates:
-            if candidate in seen:
-                continue
-            seen.add(candidate)
-            rgba = open_visible_rgba(candidate)
-            if rgba is not None:
-                break
-
-    if rgba is None:
-        return None
-
-    r, g, b, a = rgba.split()
-
-    orig_rgba = Image.merge("RGBA", (r, g, b, a))
-    swap_rgba = Image.merge("RGBA", (b, g, r, a))
-
-    def to_rgb_on_black(img_rgba):
-        bg = Image.new("RGBA", img_rgba.size, (0, 0, 0, 255))
-        bg.paste(img_rgba, mask=img_rgba.split()[-1])
-        return bg.convert("RGB")
-
-    orig_rgb = to_rgb_on_black(orig_rgba)
-    swap_rgb = to_rgb_on_black(swap_rgba)
-
-    # Some DDS->PNG exports have swapped R/B channels, others do not.
-    # Choose the more plausible variant per icon via a simple color-balance heuristic.
-    o_stat = orig_rgb.convert("RGB").resize((1, 1), Image.BOX).getpixel((0, 0))
-    use_swapped = o_stat[2] > (o_stat[0] * 1.02)
-
-    return swap_rgb if use_swapped else orig_rgb
-
 ICON_OVERRIDES = {
     "wpn_scar": "wpn_scar_siber",
 }
 
-def icon_path_for_id(w_id):
+def icon_stem_for_id(w_id):
     if not w_id:
         return None
-    resolved = ICON_OVERRIDES.get(str(w_id), str(w_id))
-    return os.path.join(DATA_DIR, "icons", f"{resolved}.png")
+    return ICON_OVERRIDES.get(str(w_id), str(w_id))
 
-@lru_cache(maxsize=2048)
-def icon_data_url(path):
-    if not path or not os.path.exists(path):
-        return None
-    try:
-        with open(path, "rb") as fh:
-            encoded = base64.b64encode(fh.read()).decode("ascii")
-        return f"data:image/png;base64,{encoded}"
-    except Exception:
-        return None
+def icon_image_for_id(w_id, store):
+    # Colour-corrected RGB icon sliced from the packed atlas (`store` is ICON_STORE, resolved once per rerun).
+    return store.image(icon_stem_for_id(w_id))
+
+def icon_data_url_for_id(w_id, store):
+    return store.data_url(icon_stem_for_id(w_id))
 
 def get_role(r):
     cls_raw = str(r.get('class', '')).lower()
@@ -377,13 +480,214 @@ def get_role(r):
         return "Power"
     return "Workhorse"
 
+# 🐗 Mutant Killer logic: any of these ammo types or any shotgun
+MUTANT_CALIBERS = ['5.45', '5.56', '.45', '9x19']
+
+def is_mutant_killer(row):
+    ammo_str = str(row.get('ammo', '')).lower()
+    cls_str = str(row.get('class', '')).lower()
+    if 'shotgun' in cls_str:
+        return True
+    for cal in MUTANT_CALIBERS:
+        if cal in ammo_str:
+            return True
+    return False
+
+# --- vectorized column builders ---------------------------------------------------
+# Column-at-a-time equivalents of the row functions above, used by load_data so a
+# session start doesn't pay for several df.apply(axis=1) passes. They mirror the row
+# versions exactly (str() of NaN is 'nan', first matching pattern wins, NaN never
+# compares true); tests/test_scoring.py holds them to that.
+def _lower_str(df_local, column, default=''):
+    if column not in df_local.columns:
+        return pd.Series(str(default).lower(), index=df_local.index, dtype=object)
+    return df_local[column].map(str).str.lower()
+
+def _float_col(df_local, column, default):
+    if column not in df_local.columns:
+        return pd.Series(float(default), index=df_local.index)
+    return df_local[column].astype(float)
+
+def _contains_any(text, patterns):
+    mask = pd.Series(False, index=text.index)
+    for pattern in patterns:
+        mask |= text.str.contains(pattern, regex=False)
+    return mask
+
+def get_mutant_killers(df_local):
+    ammo = _lower_str(df_local, 'ammo')
+    cls = _lower_str(df_local, 'class')
+    return (cls.str.contains('shotgun', regex=False) | _contains_any(ammo, MUTANT_CALIBERS)).astype(bool)
+
+def compute_scores(df_local):
+    hit = _float_col(df_local, 'hit', 0)
+    rpm = _float_col(df_local, 'rpm', 0)
+    rec = np.maximum(_float_col(df_local, 'rec', 0), 0.01)
+    mag = _float_col(df_local, 'mag', 0)
+    return (hit * rpm) / rec + (mag * 0.5)
+
+def get_caliber_weights(ammo):
+    ammo_l = ammo.map(str).str.lower()
+    conditions = [ammo_l.str.contains(pattern, regex=False) for pattern, _ in CALIBER_WEIGHT_PATTERNS]
+    weights = np.select(conditions, [weight for _, weight in CALIBER_WEIGHT_PATTERNS], default=1.0)
+    return pd.Series(weights, index=ammo.index)
+
+def compute_adjusted_scores(df_local):
+    hit = _float_col(df_local, 'hit', 0)
+    rpm = _float_col(df_local, 'rpm', 0)
+    rec = np.maximum(_float_col(df_local, 'rec', 0), 0.01)
+    rec_hor = df_local['rec_hor'].astype(float) if 'rec_hor' in df_local.columns else rec
+    handling = _float_col(df_local, 'handling', 1)
+    mag = _float_col(df_local, 'mag', 0)
+    ammo = df_local['ammo'] if 'ammo' in df_local.columns else pd.Series('', index=df_local.index)
+    adjusted_hit = hit * get_caliber_weights(ammo)
+
+    base = (adjusted_hit * rpm) / (rec * 0.75 + rec_hor * 0.25)
+    base *= 1.0 + (handling - 1.0) * 0.1
+    return base + (mag * 0.5)
+
+def get_score_buckets(df_local):
+    cls = _lower_str(df_local, 'class')
+    rpm = _float_col(df_local, 'rpm', 0)
+    fallback = df_local['class'].map(str) if 'class' in df_local.columns else pd.Series('Unknown', index=df_local.index)
+    sniper = cls.str.contains('sniper/dmr', regex=False)
+    rules = [
+        (sniper & (rpm >= 120), 'DMR'),
+        (sniper, 'Bolt-Action Sniper'),
+        (cls.str.contains('smg/pdw', regex=False), 'SMG/PDW'),
+        (cls.str.contains('battle rifle', regex=False), 'Battle Rifle'),
+        (cls.str.contains('assault rifle', regex=False), 'Assault Rifle'),
+        (cls.str.contains('shotgun', regex=False), 'Shotgun'),
+        (cls.str.contains('lmg', regex=False), 'LMG'),
+        (cls.str.contains('sidearm heavy', regex=False), 'Sidearm Heavy'),
+        (cls.str.contains('pistol', regex=False), 'Pistol'),
+        (cls.str.contains('smg', regex=False), 'SMG'),
+    ]
+    buckets = np.select([c for c, _ in rules], [label for _, label in rules], default=fallback.to_numpy(dtype=object))
+    return pd.Series(buckets, index=df_local.index)
+
+def get_roles(df_local):
+    cls = _lower_str(df_local, 'class')
+    ammo = _lower_str(df_local, 'ammo')
+    wpn_id = _lower_str(df_local, 'id')
+    slot = np.trunc(_float_col(df_local, 'slot', 0))
+    rules = [
+        (wpn_id.str.startswith(SIDEARM_SMG_PREFIXES), "Sidearm"),
+        ((slot == 1) & (cls == "pistol"), "Sidearm"),
+        (cls.str.contains("sniper", regex=False) | cls.str.contains("dmr", regex=False), "Power"),
+        (_contains_any(ammo, ["6.8x51"] + POWER_AMMO), "Power"),
+    ]
+    return pd.Series(np.select([c for c, _ in rules], [label for _, label in rules], default="Workhorse"), index=df_local.index)
+
+# --- enriched weapon table cache ---------------------------------------------------
+# load_data() output is stored in a typed binary file (Feather when pyarrow is
+# installed, otherwise an uncompressed .npz) next to a small JSON sidecar holding the
+# cache key. The key hashes the stats CSV, ingame_stats_overrides.json,
+# balance_config.json and app.py itself, so any data, override, hook or scoring-code
+# change recomputes the table. Failures anywhere just fall back to the CSV path.
+WEAPON_CACHE_VERSION = 1
+DATA_LOAD_INFO = {"source": None, "seconds": None, "key": None}
+
+try:
+    import pyarrow.feather as _feather
+except ImportError:
+    _feather = None
+
+def weapon_cache_key(stats_file):
+    digest = hashlib.sha256()
+    digest.update(f"v{WEAPON_CACHE_VERSION}|pandas {pd.__version__}|numpy {np.__version__}".encode())
+    with open(stats_file, "rb") as fh:
+        digest.update(fh.read())
+    for extra in (INGAME_OVERRIDES_FILE, BALANCE_CFG_PATH, os.path.abspath(__file__)):
+        digest.update(f"|{os.path.basename(extra)}|".encode())
+        try:
+            with open(extra, "rb") as fh:
+                digest.update(fh.read())
+        except FileNotFoundError:
+            digest.update(b"<missing>")
+    return digest.hexdigest()
+
+def _frame_to_npz(frame, path):
+    arrays, columns = {}, []
+    for i, name in enumerate(frame.columns):
+        col = frame[name]
+        if col.dtype.kind in "biuf":
+            arrays[f"c{i}"] = col.to_numpy()
+        elif pd.api.types.is_string_dtype(col):
+            mask = col.isna().to_numpy()
+            arrays[f"c{i}"] = col.where(~mask, "").to_numpy(dtype=str)
+            arrays[f"m{i}"] = mask
+        else:
+            raise TypeError(f"column {name!r} has no binary encoding ({col.dtype})")
+        columns.append([name, str(col.dtype)])
+    arrays["__columns__"] = np.array(json.dumps(columns))
+    with open(path, "wb") as fh:
+        np.savez(fh, **arrays)
+
+def _frame_from_npz(path):
+    with np.load(path, allow_pickle=False) as data:
+        columns = json.loads(str(data["__columns__"]))
+        frame = {}
+        for i, (name, dtype) in enumerate(columns):
+            col = pd.Series(data[f"c{i}"], dtype=dtype)
+            if f"m{i}" in data:
+                col[data[f"m{i}"]] = np.nan
+            frame[name] = col
+    return pd.DataFrame(frame)
+
+def load_weapon_cache(key):
+    try:
+        with open(WEAPON_CACHE_META, "r", encoding="utf-8") as fh:
+            meta = json.load(fh)
+        if meta.get("key") != key:
+            return None
+        path = os.path.join(DATA_DIR, meta["file"])
+        if meta["format"] == "feather" and _feather is not None:
+            return _feather.read_table(path, memory_map=True).to_pandas()
+        if meta["format"] == "npz":
+            return _frame_from_npz(path)
+    except Exception:
+        pass
+    return None
+
+def save_weapon_cache(key, frame):
+    fmt, name = ("feather", "weapons_cache.feather") if _feather is not None else ("npz", "weapons_cache.npz")
+    path = os.path.join(DATA_DIR, name)
+    try:
+        if fmt == "feather":
+            _feather.write_feather(frame, path + ".tmp", compression="uncompressed")
+        else:
+            _frame_to_npz(frame, path + ".tmp")
+        os.replace(path + ".tmp", path)
+        with open(WEAPON_CACHE_META + ".tmp", "w", encoding="utf-8") as fh:
+            json.dump({"key": key, "format": fmt, "file": name, "rows": len(frame)}, fh)
+        os.replace(WEAPON_CACHE_META + ".tmp", WEAPON_CACHE_META)
+    except Exception as e:
+        logger.warning("Could not write weapon cache: %s", e)
+
 def load_data():
+    started = time.perf_counter()
     stats_file = os.path.join(DATA_DIR, "weapons_stats.csv")
     if not os.path.exists(stats_file):
         st.error("Missing loadout_lab_data/weapons_stats.csv. Run: python3 scraper.py")
         st.stop()
-    df = pd.read_csv(stats_file)
-    
+    try:
+        # No binary cache under TESTING_ENV, so tests never touch a real weapons_cache.*.
+        cache_key = weapon_cache_key(stats_file) if WEAPON_CACHE_META else None
+    except Exception:
+        cache_key = None
+    if cache_key:
+        cached = load_weapon_cache(cache_key)
+        if cached is not None:
+            DATA_LOAD_INFO.update(source="cache", seconds=time.perf_counter() - started, key=cache_key)
+            return cached
+    df = enrich_weapon_table(pd.read_csv(stats_file))
+    if cache_key:
+        save_weapon_cache(cache_key, df)
+    DATA_LOAD_INFO.update(source="csv", seconds=time.perf_counter() - started, key=cache_key)
+    return df
+
+def enrich_weapon_table(df):
     # Manual Data Overrides
     df.loc[df['id'] == 'wpn_fn2000_nimble', 'real_name'] = 'FN F2000 "Competitor"'
     # Remington 700 chassis variants inherit the wrong ammo class in some configs.
@@ -402,38 +706,45 @@ def load_data():
     df['pretty_name'] = df.get('real_name', df['id'])
     df['ammo_display'] = df['ammo'].apply(prettify_ammo)
     
-    # 🐗 Mutant Killer logic: any of these ammo types or any shotgun
-    mutant_calibers = ['5.45', '5.56', '.45', '9x19']
-    
-    def is_mutant_killer(row):
-        ammo_str = str(row.get('ammo', '')).lower()
-        cls_str = str(row.get('class', '')).lower()
-        if 'shotgun' in cls_str:
-            return True
-        for cal in mutant_calibers:
-            if cal in ammo_str:
-                return True
-        return False
-
-    df['mutant_killer'] = df.apply(is_mutant_killer, axis=1)
-    df['raw_score'] = df.apply(compute_score, axis=1)
-    df['raw_adjusted'] = df.apply(compute_adjusted_score, axis=1)
+    df['mutant_killer'] = get_mutant_killers(df)
+    df['raw_score'] = compute_scores(df)
+    df['raw_adjusted'] = compute_adjusted_scores(df)
     df['recoil_rating'] = (1.0 - df['rec'].rank(method='average', pct=True).fillna(0.5)) * 100.0
-    df['score_bucket'] = df.apply(get_score_bucket, axis=1)
+    df['score_bucket'] = get_score_buckets(df)
     df['class_norm_score'] = compute_class_normalized_scores(df)
     df['final_score'] = df['raw_adjusted']
     df['global_norm_score'] = df['raw_adjusted'].rank(method='average', pct=True).fillna(0.0) * 100.0
-    df['role_label'] = df.apply(get_role, axis=1)
+    df['role_label'] = get_roles(df)
     df['role_norm_score'] = (
         df.groupby('role_label')['raw_adjusted']
         .rank(method='average', pct=True)
         .fillna(0.0) * 100.0
     )
-    # UI display score: stable and readable 0-100 scale
+    # UI display score: stable and readable 0-100 scale (draft logic uses final_score)
     df['score'] = df['global_norm_score']
+    # Search tab ranks, precomputed so the shared table is never written to by the UI.
+    df['global_rank'] = df['score'].rank(ascending=False, method='min')
+    df['class_rank'] = df.groupby('class')['score'].rank(ascending=False, method='min')
     return df
 
-df = load_data()
+def weapons_csv_stamp():
+    try:
+        stat = os.stat(os.path.join(DATA_DIR, "weapons_stats.csv"))
+        return (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+@st.cache_resource(show_spinner="Loading weapon data...", max_entries=1)
+def shared_weapon_table(csv_stamp):
+    # One weapons table per server process, shared read-only by every session and
+    # rerun; a re-scraped CSV (new mtime/size) builds a fresh one. Per-session state
+    # (locker, prefs) stays in st.session_state. Never assign into the returned frame.
+    table = load_data()
+    return table, dict(DATA_LOAD_INFO)
+
+df, WEAPON_TABLE_INFO = shared_weapon_table(weapons_csv_stamp())
+# Identifies the table contents for caches of derived results (draft sets).
+DATA_VERSION = WEAPON_TABLE_INFO.get("key") or str(weapons_csv_stamp())
 
 if 'locker' not in st.session_state:
     st.session_state.locker = load_locker()
@@ -443,7 +754,6 @@ if 'last_import_msg' not in st.session_state:
     st.session_state.last_import_msg = ""
 
 init_ui_prefs()
-apply_unified_score_to_df()
 
 def is_ammo_conflict(w1, w2):
     if not w1 or not w2:
@@ -471,11 +781,199 @@ def is_valid_set(s, p, wh):
         return False
     return is_valid_pair(s, p) and is_valid_pair(s, wh) and is_valid_pair(p, wh)
 
+# Vectorized counterparts of the checks above. Each weapon is reduced once to an
+# ammo code (identical ammo strings share a code), an ammo-group bit field
+# (1 = light, 2 = heavy) and a mutant-killer bit, so pair validity becomes a
+# boolean matrix and whole triple grids can be checked in one broadcast.
+AMMO_GROUP_LIGHT = 1
+AMMO_GROUP_HEAVY = 2
+
+def build_compat_index(weapons):
+    """Precompute ammo compatibility for one inventory.
+
+    Returns ``(positions, valid_pairs, mutant_killer)``: ``positions`` maps a weapon
+    id to its row/column in the boolean ``valid_pairs`` matrix and ``mutant_killer``
+    holds the per-weapon mutant-killer bit in the same order.
+    """
+    positions = {}
+    ammo_codes = {}
+    ammo_code = np.zeros(len(weapons), dtype=np.int32)
+    ammo_group = np.zeros(len(weapons), dtype=np.uint8)
+    mutant_killer = np.zeros(len(weapons), dtype=bool)
+    for i, w in enumerate(weapons):
+        positions[w.get('id')] = i
+        ammo = str(w.get('ammo', '')).lower()
+        ammo_code[i] = ammo_codes.setdefault(ammo, len(ammo_codes))
+        if any(g in ammo for g in GROUP_LIGHT):
+            ammo_group[i] |= AMMO_GROUP_LIGHT
+        if any(g in ammo for g in GROUP_HEAVY):
+            ammo_group[i] |= AMMO_GROUP_HEAVY
+        mutant_killer[i] = bool(w.get('mutant_killer'))
+
+    conflict = ammo_code[:, None] == ammo_code[None, :]
+    conflict |= (ammo_group[:, None] & ammo_group[None, :]) != 0
+    return positions, ~conflict, mutant_killer
+
+def triple_validity_mask(compat, powers, workhorses, sidearms):
+    """Boolean ``(power, workhorse, sidearm)`` grid equivalent to ``is_valid_set``."""
+    positions, valid_pairs, mutant_killer = compat
+    p = np.array([positions[w['id']] for w in powers], dtype=np.intp)[:, None, None]
+    wh = np.array([positions[w['id']] for w in workhorses], dtype=np.intp)[None, :, None]
+    s = np.array([positions[w['id']] for w in sidearms], dtype=np.intp)[None, None, :]
+    has_mutant_killer = mutant_killer[p] | mutant_killer[wh] | mutant_killer[s]
+    return has_mutant_killer & valid_pairs[s, p] & valid_pairs[s, wh] & valid_pairs[p, wh]
+
+# --- optimal flawless-set solver ------------------------------------------------
+# The greedy drafts take the locally best triple each round. The "optimal" draft mode
+# first solves for the largest collection of weapon-disjoint valid triples (ties broken
+# by total fitness) with a depth-first branch-and-bound over sidearms; every set needs
+# exactly one sidearm, so each sidearm is either matched to one of its still-free
+# triples or left out. The usual greedy loop then covers whatever is left.
+OPTIMAL_DRAFT_TIME_BUDGET = 2.0  # seconds; the best solution so far is used on timeout
+
+def solve_disjoint_triples(triples, fitness, time_budget=OPTIMAL_DRAFT_TIME_BUDGET, weapon_scores=None,
+                           on_progress=None):
+    """Picks weapon-disjoint ``(power, workhorse, sidearm)`` id triples maximizing ``(count, total fitness)``.
+
+    Pass ``weapon_scores`` when each fitness is the sum of its weapons' scores (Maxxed);
+    it enables a much tighter bound. ``on_progress(nodes)`` is called every 256 nodes and
+    may raise to abandon the solve. Returns ``(chosen triple indices, stats)``.
+    """
+    started = time.perf_counter()
+    deadline = started + time_budget
+    by_sidearm = {}
+    kinds = {}
+    for idx, (p, wh, s) in enumerate(triples):
+        by_sidearm.setdefault(s, []).append(idx)
+        kinds.setdefault(p, set()).add('p')
+        kinds.setdefault(wh, set()).add('w')
+    for options in by_sidearm.values():
+        options.sort(key=lambda i: (-fitness[i], i))
+    # Most constrained sidearms first.
+    sidearm_order = sorted(by_sidearm, key=lambda s: (len(by_sidearm[s]), s))
+
+    used = set()
+    counts = {
+        'p': sum(1 for k in kinds.values() if 'p' in k),
+        'w': sum(1 for k in kinds.values() if 'w' in k),
+        'any': len(kinds),
+    }
+
+    def take(w_id, delta):
+        for kind in kinds[w_id]:
+            counts[kind] += delta
+        counts['any'] += delta
+
+    def bounds(pos):
+        # Each remaining sidearm adds at most its best still-free triple, and only
+        # if the free power/workhorse pool can still fill the other two slots.
+        live_best = []
+        live_sidearms = []
+        for s in sidearm_order[pos:]:
+            for idx in by_sidearm[s]:
+                p, wh, _ = triples[idx]
+                if p not in used and wh not in used:
+                    live_best.append(fitness[idx])
+                    live_sidearms.append(s)
+                    break
+        count = min(len(live_best), counts['p'], counts['w'], counts['any'] // 2)
+        live_best.sort(reverse=True)
+        fit_bound = sum(live_best[:count])
+        if weapon_scores is not None and count:
+            # Additive fitness: best `count` sidearms plus best 2*`count` free other weapons.
+            side = sorted((weapon_scores[s] for s in live_sidearms), reverse=True)[:count]
+            rest = heapq.nlargest(2 * count, (weapon_scores[w] for w in kinds if w not in used))
+            fit_bound = min(fit_bound, sum(side) + sum(rest))
+        return count, fit_bound
+
+    # Incumbent: one fitness-ordered greedy pass, so a timeout still returns something sane.
+    best = []
+    for idx in sorted(range(len(triples)), key=lambda i: (-fitness[i], i)):
+        if not any(w in used for w in triples[idx]):
+            best.append(idx)
+            used.update(triples[idx])
+    used.clear()
+    best_value = [len(best), float(sum(fitness[i] for i in best))]
+    # Count-only bound on disjoint flawless triples, taken at the root (reported on timeout).
+    flawless_bound = bounds(0)[0]
+    chosen = []
+    state = {"nodes": 0, "timed_out": False}
+
+    def search(pos, fit):
+        state["nodes"] += 1
+        if state["nodes"] % 256 == 0:
+            if on_progress is not None:
+                on_progress(state["nodes"])
+            if time.perf_counter() > deadline:
+                state["timed_out"] = True
+        if state["timed_out"]:
+            return
+        count = len(chosen)
+        if (count, fit) > tuple(best_value):
+            best[:] = chosen
+            best_value[:] = [count, fit]
+        if pos == len(sidearm_order):
+            return
+        bound, fit_bound = bounds(pos)
+        if count + bound < best_value[0]:
+            return
+        if count + bound == best_value[0] and fit + fit_bound <= best_value[1] + 1e-9:
+            return
+        for idx in by_sidearm[sidearm_order[pos]]:
+            p, wh, _ = triples[idx]
+            if p in used or wh in used:
+                continue
+            used.update((p, wh))
+            take(p, -1)
+            take(wh, -1)
+            chosen.append(idx)
+            search(pos + 1, fit + float(fitness[idx]))
+            chosen.pop()
+            take(p, 1)
+            take(wh, 1)
+            used.difference_update((p, wh))
+            if state["timed_out"]:
+                return
+        search(pos + 1, fit)
+
+    if triples:
+        search(0, 0.0)
+    return list(best), {
+        "flawless_sets": len(best),
+        "flawless_fitness": best_value[1],
+        "flawless_bound": flawless_bound,
+        "proven_optimal": not state["timed_out"],
+        "nodes": state["nodes"],
+        "seconds": time.perf_counter() - started,
+    }
+
+def draft_summary(sets):
+    """Flawless-set count/score, total sets and reused weapon slots of a finished draft.
+
+    ``min_redundant_slots`` is a lower bound on reuse for any draft covering the same weapons:
+    every set holds one sidearm and one power-slot weapon (Power, or a light Workhorse), so it
+    needs at least max(sidearms, powers, ceil((powers + workhorses) / 2)) sets.
+    """
+    flawless = [s for s in sets if s.get('tier_val', 99) < 20]
+    slots = sum(len(s['weapons']) for s in sets)
+    roles = {w['id']: w.get('role_label') for s in sets for w in s['weapons']}
+    distinct = len(roles)
+    n_side = sum(1 for r in roles.values() if r == 'Sidearm')
+    n_power = sum(1 for r in roles.values() if r == 'Power')
+    n_other = distinct - n_side
+    min_sets = max(n_side, n_power, -(-n_other // 2))
+    return {
+        "flawless_sets": len(flawless),
+        "flawless_score": float(sum(w['draft_score_raw'] for s in flawless for w in s['weapons'])),
+        "total_sets": len(sets),
+        "redundant_slots": slots - distinct,
+        "min_redundant_slots": max(0, 3 * min_sets - distinct),
+    }
+
 # --- pluggable scoring / role hooks ------------------------------------------------
 # Users may optionally specify custom functions via a JSON config file. The
 # values must be dotted paths to callables, e.g. "my_mod.balance.compute_score".
-import json, importlib
-BALANCE_CFG_PATH = "balance_config.json"
+import importlib
 if os.path.exists(BALANCE_CFG_PATH):
     try:
         cfg = json.load(open(BALANCE_CFG_PATH))
@@ -488,25 +986,137 @@ if os.path.exists(BALANCE_CFG_PATH):
     except Exception as e:
         st.warning(f"Failed loading balance_config.json: {e}")
 
-# Internal caching to speed up repeated drafts with identical inventory/strategy
-from functools import lru_cache
-
-@lru_cache(maxsize=128)
-def _cached_sets(inventory_tuple, strategy, draft_mode):
-    # convert back to list; perform full calculation here
-    return _raw_calculate_all_sets(list(inventory_tuple), strategy, draft_mode)
-
-def calculate_all_sets(inventory_ids, strategy, draft_mode="classic"):
-    return _cached_sets(tuple(inventory_ids), strategy, draft_mode)
+# --- DRAFT RESULT CACHE ---
+# Drafts are keyed by a hash of the sorted, de-duplicated locker (the engines only use
+# it as a membership filter, so order never matters), strategy, mode, seed, DATA_VERSION
+# (weapon data + scoring code) and DRAFT_ENGINE_VERSION. Two levels: a process-wide
+# in-memory cache, then an SQLite file that survives restarts, trimmed to the most
+# recently used DRAFT_CACHE_MAX_ENTRIES rows. Any failure just recomputes.
+DRAFT_ENGINE_VERSION = 4
+DRAFT_CACHE_MAX_ENTRIES = 256
+
+def draft_cache_key(inventory_ids, strategy, draft_mode, seed, data_version):
+    payload = json.dumps({
+        "inventory": sorted({str(i) for i in inventory_ids}), "strategy": strategy,
+        "mode": draft_mode, "seed": seed, "data": data_version, "engine": DRAFT_ENGINE_VERSION,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _open_draft_cache():
+    conn = sqlite3.connect(DRAFT_CACHE_FILE, timeout=5)
+    conn.execute("CREATE TABLE IF NOT EXISTS drafts (key TEXT PRIMARY KEY, payload TEXT NOT NULL, used REAL NOT NULL)")
+    return conn
+
+def _draft_json_default(value):
+    # Weapon records can carry numpy scalars; store them as plain numbers/bools.
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def load_draft_result(key):
+    if not DRAFT_CACHE_FILE or not os.path.exists(DRAFT_CACHE_FILE):
+        return None
+    try:
+        with closing(_open_draft_cache()) as conn, conn:
+            row = conn.execute("SELECT payload FROM drafts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE drafts SET used = ? WHERE key = ?", (time.time(), key))
+        sets = json.loads(row[0])
+        return sets if isinstance(sets, list) else None
+    except Exception:
+        return None
 
-def _raw_calculate_all_sets(inventory_ids, strategy, draft_mode):
+def save_draft_result(key, sets):
+    if not DRAFT_CACHE_FILE:
+        return
+    try:
+        payload = json.dumps(sets, separators=(",", ":"), default=_draft_json_default)
+        with closing(_open_draft_cache()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO drafts (key, payload, used) VALUES (?, ?, ?)", (key, payload, time.time()))
+            conn.execute(
+                "DELETE FROM drafts WHERE key NOT IN (SELECT key FROM drafts ORDER BY used DESC LIMIT ?)",
+                (DRAFT_CACHE_MAX_ENTRIES,),
+            )
+    except Exception as e:
+        logger.warning("Could not write draft cache: %s", e)
+
+DRAFT_MEMORY_ENTRIES = 128
+
+@st.cache_resource(show_spinner=False)
+def _draft_memory():
+    # Process-wide LRU in front of the SQLite file (shared by sessions, kept across reruns).
+    return {"lock": threading.Lock(), "entries": OrderedDict()}
+
+def lookup_draft(key):
+    """Finished draft for ``key`` from memory or disk, or None; never drafts."""
+    memory = _draft_memory()
+    with memory["lock"]:
+        sets = memory["entries"].get(key)
+        if sets is not None:
+            memory["entries"].move_to_end(key)
+            return sets
+    sets = load_draft_result(key)
+    if sets is not None:
+        remember_draft(key, sets, persist=False)
+    return sets
+
+def remember_draft(key, sets, persist=True):
+    memory = _draft_memory()
+    with memory["lock"]:
+        memory["entries"][key] = sets
+        memory["entries"].move_to_end(key)
+        while len(memory["entries"]) > DRAFT_MEMORY_ENTRIES:
+            memory["entries"].popitem(last=False)
+    if persist:
+        save_draft_result(key, sets)
+
+def draft_request(inventory_ids, strategy, draft_mode, seed):
+    inventory = tuple(sorted(set(inventory_ids)))
+    return inventory, draft_cache_key(inventory, strategy, draft_mode, seed, DATA_VERSION)
+
+def calculate_all_sets(inventory_ids, strategy, draft_mode="classic", seed=DEFAULT_DRAFT_SEED):
+    # Same locker + strategy + mode + seed always drafts the same sets.
+    inventory, key = draft_request(inventory_ids, strategy, draft_mode, seed)
+    sets = lookup_draft(key)
+    if sets is None:
+        sets = _raw_calculate_all_sets(list(inventory), strategy, draft_mode, seed)
+        remember_draft(key, sets)
+    return sets
+
+def iter_draft_sets(inventory_ids, strategy, draft_mode, seed=DEFAULT_DRAFT_SEED, on_solver_progress=None):
+    """Yields each set as the engine commits it (draft order; see finish_draft)."""
+    # Every tie-break draws from this local RNG, never the global `random` state.
+    rng = random.Random(seed)
     if draft_mode == "diversity":
-        return _raw_calculate_all_sets_diversity(inventory_ids, strategy)
-    return _raw_calculate_all_sets_classic(inventory_ids, strategy)
+        yield from iter_sets_diversity(inventory_ids, strategy, rng)
+        return
+    budget = OPTIMAL_DRAFT_TIME_BUDGET if draft_mode == "optimal" else None
+    yield from iter_sets_classic(inventory_ids, strategy, rng, optimal_budget=budget,
+                                 on_solver_progress=on_solver_progress)
+
+def finish_draft(inventory_ids, strategy, draft_mode, seed, sets, complete=True):
+    # Display order (classic/optimal: tier, then fitness) plus the optimal-mode summary.
+    if draft_mode != "diversity":
+        sets.sort(key=lambda x: (x.get('tier_val', 5), -x['fitness']))
+    if draft_mode == "optimal" and sets and complete:
+        sets[0]['solver']["optimal"] = draft_summary(sets)
+    return sets
+
+def _raw_calculate_all_sets(inventory_ids, strategy, draft_mode, seed=DEFAULT_DRAFT_SEED):
+    sets = list(iter_draft_sets(inventory_ids, strategy, draft_mode, seed))
+    return finish_draft(inventory_ids, strategy, draft_mode, seed, sets)
 
 # move the previous body into _raw_calculate_all_sets_classic
 
-def _raw_calculate_all_sets_classic(inventory_ids, strategy):
+def _raw_calculate_all_sets_classic(inventory_ids, strategy, rng=None, optimal_budget=None):
+    sets = list(iter_sets_classic(inventory_ids, strategy, rng, optimal_budget))
+    # Final sorting by tier, then fitness
+    sets.sort(key=lambda x: (x.get('tier_val', 5), -x['fitness']))
+    return sets
+
+def iter_sets_classic(inventory_ids, strategy, rng=None, optimal_budget=None, on_solver_progress=None):
+    rng = rng if rng is not None else random.Random()
     all_w_df = df[df['id'].isin(inventory_ids)].copy()
     all_w_df['role_label'] = all_w_df.apply(get_role, axis=1)
 
@@ -547,9 +1157,9 @@ def _raw_calculate_all_sets_classic(inventory_ids, strategy):
     flex_light_ids = {w['id'] for w in flex_light_powers}
 
     if not all_w:
-        return []
+        return
     if not sidearms or not powers or not workhorses:
-        return []
+        return
 
     avg_s = all_sidearms_df[score_field].mean() if not all_sidearms_df.empty else 0
     avg_p = all_w_df[all_w_df['role_label'] == 'Power'][score_field].mean() if not all_w_df[all_w_df['role_label'] == 'Power'].empty else 0
@@ -558,6 +1168,7 @@ def _raw_calculate_all_sets_classic(inventory_ids, strategy):
 
     usage = {w_id: 0 for w_id in inventory_ids}
     final_sets = []
+    solver_stats = None
 
     def get_tier_info(triple):
         p, wh, s = triple
@@ -616,6 +1227,8 @@ def _raw_calculate_all_sets_classic(inventory_ids, strategy):
             "avg_score": (sum(display_scores) / len(display_scores)) if display_scores else 0.0,
             "avg_score_raw": (sum(raw_scores) / len(raw_scores)) if raw_scores else 0.0,
         })
+        if solver_stats is not None:
+            final_sets[-1]['solver'] = solver_stats
 
     def triple_total(triple):
         # when maximizing, redundant weapons (usage>0) should not contribute
@@ -634,68 +1247,125 @@ def _raw_calculate_all_sets_classic(inventory_ids, strategy):
             return total
         return -abs(target_average_score - total)
 
+    def choose_from_tier(tv, group, f_scores):
+        # Green Tiers (11, 12, 13) and Maxxed redundant tiers: uniform pick among the best
+        if tv < 20 or strategy == "Maxxed":
+            best_f = max(f_scores)
+            top = [t for t, f in zip(group, f_scores) if f == best_f]
+            return rng.choice(top)
+
+        # Balanced redundant tiers (Blue: 20+, Orange: 30+)
+        max_f = max(f_scores)
+        min_f = min(f_scores)
+        threshold = max_f - (max_f - min_f) * 0.4
+        balanced_group = [t for t, f in zip(group, f_scores) if f >= threshold]
+        return rng.choice(balanced_group)
+
     def choose_best(candidates):
         if not candidates:
             return None
-        
+
         tier_groups = {}
         for t in candidates:
             tv, _, _ = get_tier_info(t)
             tier_groups.setdefault(tv, []).append(t)
-        
-        for tv in sorted(tier_groups.keys()):
-            group = tier_groups[tv]
-            
-            # Green Tiers (11, 12, 13)
-            if tv < 20:
-                best_f = max(triple_fitness(t) for t in group)
-                top = [t for t in group if triple_fitness(t) == best_f]
-                return random.choice(top)
-            
-            # Redundant tiers (Blue: 20+, Orange: 30+)
-            if strategy == "Maxxed":
-                best_f = max(triple_fitness(t) for t in group)
-                top = [t for t in group if triple_fitness(t) == best_f]
-                return random.choice(top)
-            
-            f_scores = [triple_fitness(t) for t in group]
-            max_f = max(f_scores)
-            min_f = min(f_scores)
-            threshold = max_f - (max_f - min_f) * 0.4
-            balanced_group = [t for t in group if triple_fitness(t) >= threshold]
-            return random.choice(balanced_group)
+
+        tv = min(tier_groups)
+        group = tier_groups[tv]
+        return choose_from_tier(tv, group, [triple_fitness(t) for t in group])
+
+    # Candidate engine: every triple that can ever be drafted is enumerated once,
+    # in the order the draft has always used (normal sets first, then hybrids).
+    # np.nonzero walks the validity grid in C order, i.e. the same order as product().
+    compat = build_compat_index(all_w)
+
+    # 1. Normal sets (Heavy + Light)
+    static_triples = []
+    light_wh = np.array([is_light_weapon(w) for w in workhorses], dtype=bool)
+    normal_mask = triple_validity_mask(compat, powers, workhorses, sidearms)
+    normal_mask &= light_wh[None, :, None] # Strict pure mode check
+    for pi, wi, si in zip(*np.nonzero(normal_mask)):
+        static_triples.append((powers[pi], workhorses[wi], sidearms[si]))
+
+    # 2. Hybrid sets (Heavy/Light + MP/Shotgun)
+    # Note: powers contains heavy, flex_light_powers contains light
+    all_potential_p = list({w['id']: w for w in powers + flex_light_powers}.values())
+    hybrid_mask = triple_validity_mask(compat, all_potential_p, hybrid_workhorses, sidearms)
+    for pi, wi, si in zip(*np.nonzero(hybrid_mask)):
+        static_triples.append((all_potential_p[pi], hybrid_workhorses[wi], sidearms[si]))
+
+    # Each triple sits in exactly one tier bucket keyed by its tier value; its
+    # fitness is cached and only recomputed when one of its weapons gets used.
+    # Triples whose three weapons are all used drop out (they cannot make progress).
+    triples_by_weapon = {}
+    triple_red = []
+    triple_sub = []
+    triple_fit = []
+    tier_buckets = {}
+    for idx, t in enumerate(static_triples):
+        tv, _, _ = get_tier_info(t)
+        triple_red.append(0)
+        triple_sub.append(tv - 10)
+        triple_fit.append(triple_fitness(t))
+        tier_buckets.setdefault(tv, set()).add(idx)
+        for w in t:
+            triples_by_weapon.setdefault(w['id'], []).append(idx)
+
+    def tier_of(red_count, sub_val):
+        if red_count == 0:
+            return 10 + sub_val
+        if red_count == 1:
+            return 20 + sub_val
+        return 30 + sub_val
+
+    def mark_used(newly_used):
+        for w_id in newly_used:
+            for idx in triples_by_weapon.get(w_id, ()):
+                red = triple_red[idx]
+                tier_buckets[tier_of(red, triple_sub[idx])].discard(idx)
+                triple_red[idx] = red + 1
+                if red + 1 < 3:
+                    tier_buckets.setdefault(tier_of(red + 1, triple_sub[idx]), set()).add(idx)
+                    triple_fit[idx] = triple_fitness(static_triples[idx])
+
+    def choose_best_static():
+        for tv in sorted(tier_buckets):
+            bucket = tier_buckets[tv]
+            if not bucket:
+                continue
+            order = sorted(bucket)
+            group = [static_triples[idx] for idx in order]
+            return choose_from_tier(tv, group, [triple_fit[idx] for idx in order])
         return None
 
-    # Draft loop: Continue as long as we can find ANY valid set 
+    # Optimal mode: draft the solver's flawless sets first (best fitness first); the
+    # loop below then only has redundant sets left to pick.
+    if optimal_budget is not None:
+        chosen, solver_stats = solve_disjoint_triples(
+            [tuple(w['id'] for w in t) for t in static_triples], list(triple_fit), optimal_budget,
+            weapon_scores={w['id']: score_of(w) for w in all_w} if strategy == "Maxxed" else None,
+            on_progress=on_solver_progress,
+        )
+        for idx in sorted(chosen, key=lambda i: (-triple_fit[i], i)):
+            best = static_triples[idx]
+            add_set(best, f"T{10 + triple_sub[idx]}")
+            mark_used([w['id'] for w in best])
+            yield final_sets[-1]
+
+    # Draft loop: Continue as long as we can find ANY valid set
     # that uses at least one new weapon (to ensure progress).
     # The tiers will naturally guide the order via choose_best.
     while True:
         unused_ids = [w_id for w_id, count in usage.items() if count == 0]
         if not unused_ids:
             break
-            
+
         candidate_triples = []
-        
-        # 1. Normal sets (Heavy + Light)
-        for p, wh, s in product(powers, workhorses, sidearms):
-            if not is_valid_set(s, p, wh): continue
-            if not is_light_weapon(wh): continue # Strict pure mode check
-            
-            # To ensure we finish drafting, we must use at least one unused weapon
-            if any(w['id'] in unused_ids for w in (p, wh, s)):
-                candidate_triples.append((p, wh, s))
-                
-        # 2. Hybrid sets (Heavy/Light + MP/Shotgun)
-        # Note: powers contains heavy, flex_light_powers contains light
-        all_potential_p = list({w['id']: w for w in powers + flex_light_powers}.values())
-        for p, wh, s in product(all_potential_p, hybrid_workhorses, sidearms):
-            if not is_valid_set(s, p, wh): continue
-            if any(w['id'] in unused_ids for w in (p, wh, s)):
-                candidate_triples.append((p, wh, s))
+        best = choose_best_static()
 
         # 3. Orange Tier / Absolute Failsafe:
         # If no standard or hybrid set fits because we just have 13 snipers left, we just jam them into a set.
-        if not candidate_triples:
+        if best is None:
             unused = [w for w in all_w if w['id'] in unused_ids]
             if unused:
                 # To strictly obey slot rules (Power, Workhorse, Sidearm), grab available unused items by class
@@ -703,29 +1373,31 @@ def _raw_calculate_all_sets_classic(inventory_ids, strategy):
                 u_w = [w for w in unused if w.get('role_label') == 'Workhorse']
                 u_s = [w for w in unused if w.get('role_label') == 'Sidearm']
 
-                p = random.choice(u_p) if u_p else random.choice(powers)
-                wh = random.choice(u_w) if u_w else random.choice(workhorses)
-                s = random.choice(u_s) if u_s else random.choice(sidearms)
+                p = rng.choice(u_p) if u_p else rng.choice(powers)
+                wh = rng.choice(u_w) if u_w else rng.choice(workhorses)
+                s = rng.choice(u_s) if u_s else rng.choice(sidearms)
 
                 candidate_triples.append((p, wh, s))
 
-        best = choose_best(candidate_triples)
+            best = choose_best(candidate_triples)
         if not best:
             # If no set uses an unused weapon, we might have weird orphaned weapons.
             # Mark them as "used" to exit loop.
             for uid in unused_ids:
                 usage[uid] += 1
             break
-            
+
         tv, _, _ = get_tier_info(best)
+        newly_used = [w['id'] for w in best if usage.get(w['id'], 0) == 0]
         add_set(best, f"T{tv}")
+        mark_used(newly_used)
+        yield final_sets[-1]
 
-    # Final sorting by tier, then fitness
-    final_sets.sort(key=lambda x: (x.get('tier_val', 5), -x['fitness']))
+def _raw_calculate_all_sets_diversity(inventory_ids, strategy, rng=None):
+    return list(iter_sets_diversity(inventory_ids, strategy, rng))
 
-    return final_sets
-
-def _raw_calculate_all_sets_diversity(inventory_ids, strategy):
+def iter_sets_diversity(inventory_ids, strategy, rng=None):
+    rng = rng if rng is not None else random.Random()
     all_w_df = df[df['id'].isin(inventory_ids)].copy()
     all_w_df['role_label'] = all_w_df.apply(get_role, axis=1)
 
@@ -741,7 +1413,7 @@ def _raw_calculate_all_sets_diversity(inventory_ids, strategy):
     workhorses = [w for w in all_w if w['role_label'] == 'Workhorse']
 
     if not all_w or not sidearms or not powers or not workhorses:
-        return []
+        return
 
     usage = {w_id: 0 for w_id in inventory_ids}
     final_sets = []
@@ -779,24 +1451,26 @@ def _raw_calculate_all_sets_diversity(inventory_ids, strategy):
         top = [t for t in candidates if triple_fitness(t) == best_f]
         min_red = min(redundancy_count(t) for t in top)
         top = [t for t in top if redundancy_count(t) == min_red]
-        return random.choice(top)
+        return rng.choice(top)
+
+    # Valid triples never change during a draft; compute them once in product order.
+    valid_mask = triple_validity_mask(build_compat_index(all_w), powers, workhorses, sidearms)
+    valid_triples = [
+        (powers[pi], workhorses[wi], sidearms[si]) for pi, wi, si in zip(*np.nonzero(valid_mask))
+    ]
 
     def build_candidates(allow_reuse_sidearm, allow_reuse_power, allow_reuse_workhorse, require_unused=True):
         candidates = []
-        for p in powers:
+        for p, wh, s in valid_triples:
             if not allow_reuse_power and usage.get(p.get('id'), 0) > 0:
                 continue
-            for wh in workhorses:
-                if not allow_reuse_workhorse and usage.get(wh.get('id'), 0) > 0:
-                    continue
-                for s in sidearms:
-                    if not allow_reuse_sidearm and usage.get(s.get('id'), 0) > 0:
-                        continue
-                    if not is_valid_set(s, p, wh):
-                        continue
-                    if require_unused and all(usage.get(w.get('id'), 0) > 0 for w in (p, wh, s)):
-                        continue
-                    candidates.append((p, wh, s))
+            if not allow_reuse_workhorse and usage.get(wh.get('id'), 0) > 0:
+                continue
+            if not allow_reuse_sidearm and usage.get(s.get('id'), 0) > 0:
+                continue
+            if require_unused and all(usage.get(w.get('id'), 0) > 0 for w in (p, wh, s)):
+                continue
+            candidates.append((p, wh, s))
         return candidates
 
     def add_set(triple, phase):
@@ -861,11 +1535,12 @@ def _raw_calculate_all_sets_diversity(inventory_ids, strategy):
         if not best:
             break
         add_set(best, phase)
-
-    return final_sets
+        yield final_sets[-1]
 
 
 # --- UI SIDEBAR ---
+# Resolved once per rerun (scrape-stamp check + icon dir signature), then passed to every icon lookup.
+ICON_STORE = load_icon_store(ICON_DIR)
 render_startup_health()
 st.sidebar.title("🎒 Locker Controls")
 # new filtering options
@@ -948,7 +1623,6 @@ if st.sidebar.button("🎲 Load 50 random weapons"):
 st.sidebar.divider()
 st.sidebar.subheader("📈 Scoring")
 st.sidebar.caption("Unified score active: caliber-adjusted weapon score for all modes.")
-apply_unified_score_to_df()
 save_ui_prefs()
 
 st.sidebar.divider()
@@ -961,7 +1635,8 @@ if saves:
     if col_sync1.button("📥 Add all"):
         with st.spinner("Scanning savegame..."):
             all_ids = df['id'].unique().tolist()
-            found = extract_weapons_from_scop(os.path.join(SAVE_DIR, selected_save), all_ids)
+            scan = scan_save(os.path.join(SAVE_DIR, selected_save), all_ids)
+            found = scan.known
             if found:
                 before = set(st.session_state.locker)
                 unique_found = list(dict.fromkeys(found))
@@ -972,9 +1647,7 @@ if saves:
                 st.session_state.last_import_msg = (
                     f"Import summary: {new_count} new, {already_count} already present (found: {len(unique_found)})."
                 )
-                st.session_state.last_unknown = extract_unknown_weapon_tokens(
-                    os.path.join(SAVE_DIR, selected_save), all_ids
-                )
+                st.session_state.last_unknown = scan.unknown[:UNKNOWN_TOKEN_LIMIT]
                 st.rerun()
             else:
                 st.sidebar.warning("No known weapons found in this savegame.")
@@ -982,7 +1655,8 @@ if saves:
     if col_sync2.button("🔄 Replace all"):
         with st.spinner("Scanning savegame..."):
             all_ids = df['id'].unique().tolist()
-            found = extract_weapons_from_scop(os.path.join(SAVE_DIR, selected_save), all_ids)
+            scan = scan_save(os.path.join(SAVE_DIR, selected_save), all_ids)
+            found = scan.known
             if found:
                 previous_count = len(st.session_state.locker)
                 unique_found = list(dict.fromkeys(found))
@@ -991,9 +1665,7 @@ if saves:
                 st.session_state.last_import_msg = (
                     f"Replace summary: now {len(unique_found)} weapons (previously {previous_count})."
                 )
-                st.session_state.last_unknown = extract_unknown_weapon_tokens(
-                    os.path.join(SAVE_DIR, selected_save), all_ids
-                )
+                st.session_state.last_unknown = scan.unknown[:UNKNOWN_TOKEN_LIMIT]
                 st.rerun()
             else:
                 st.sidebar.warning("No known weapons found in this savegame.")
@@ -1001,7 +1673,9 @@ if saves:
     # Selective import
     with st.sidebar.expander("🔍 Import selected weapons"):
         all_ids = df['id'].unique().tolist()
-        found_in_save = extract_weapons_from_scop(os.path.join(SAVE_DIR, selected_save), all_ids)
+        # Cached per save mtime/size, so rerenders do not rescan the file.
+        selected_scan = scan_save(os.path.join(SAVE_DIR, selected_save), all_ids)
+        found_in_save = selected_scan.known
         if found_in_save:
             # Only show weapons not already present in locker
             new_options = [w_id for w_id in found_in_save if w_id not in st.session_state.locker]
@@ -1048,10 +1722,72 @@ if saves:
             else:
                 st.write("All weapons from this save are already in your locker.")
         if st.button("🧪 Scan unknown IDs", key=f"scan_unknown_{selected_save}"):
-            with st.spinner("Scanning unknown weapon IDs..."):
-                st.session_state.last_unknown = extract_unknown_weapon_tokens(
-                    os.path.join(SAVE_DIR, selected_save), all_ids
+            st.session_state.last_unknown = selected_scan.unknown[:UNKNOWN_TOKEN_LIMIT]
+
+    # Bulk import: rebuild a locker from every save of a playthrough
+    with st.sidebar.expander("📚 Scan all saves"):
+        st.caption("Scans every savegame in parallel. Unchanged saves come from the scan cache.")
+        merge_modes = {
+            "Union (seen in any save)": "union",
+            "Intersection (in every save)": "intersection",
+            "First-seen timeline": "timeline",
+        }
+        merge_label = st.radio("Merge mode", list(merge_modes), key="bulk_merge_mode")
+        merge_mode = merge_modes.get(merge_label, "union")
+        if st.button("📚 Scan all saves", key="bulk_scan_all"):
+            all_ids = df['id'].unique().tolist()
+            progress = st.progress(0.0, text="Scanning savegames...")
+            bulk_results = {}
+            bulk_failed = []
+            for event in scan_all_saves(SAVE_DIR, all_ids, cache_file=BULK_SCAN_CACHE_FILE):
+                if event.scan is None:
+                    bulk_failed.append(event.name)
+                else:
+                    bulk_results[event.name] = event.scan
+                source = "cached" if event.cached else "scanned"
+                progress.progress(event.done / event.total, text=f"{event.done}/{event.total} {source}: {event.name}")
+            # Oldest save first, so the timeline reflects the playthrough order.
+            st.session_state.bulk_scans = [
+                (name, bulk_results[name]) for name in reversed(get_savegames(SAVE_DIR)) if name in bulk_results
+            ]
+            st.session_state.bulk_failed = bulk_failed
+
+        bulk_scans = st.session_state.get("bulk_scans")
+        if st.session_state.get("bulk_failed"):
+            st.warning("Could not read: " + ", ".join(st.session_state.bulk_failed))
+        if bulk_scans:
+            merged_ids = merge_save_scans(bulk_scans, merge_mode)
+            st.write(f"{len(bulk_scans)} saves scanned, {len(merged_ids)} weapons after merge.")
+            if merge_mode == "timeline" and merged_ids:
+                first_seen = first_seen_timeline(bulk_scans)
+                name_by_id = dict(zip(df['id'], df['pretty_name']))
+                st.dataframe(
+                    pd.DataFrame([
+                        {"Name": name_by_id.get(w_id, w_id), "First seen": first_seen[w_id]}
+                        for w_id in merged_ids
+                    ]),
+                    hide_index=True,
+                )
+            col_bulk1, col_bulk2 = st.columns(2)
+            if col_bulk1.button("📥 Add merged", key="bulk_add"):
+                before = set(st.session_state.locker)
+                new_count = sum(1 for item in merged_ids if item not in before)
+                st.session_state.locker = list(before.union(merged_ids))
+                save_l()
+                st.session_state.last_import_msg = (
+                    f"Bulk import: {new_count} new, {len(merged_ids) - new_count} already present "
+                    f"({len(bulk_scans)} saves, {merge_mode})."
                 )
+                st.rerun()
+            if col_bulk2.button("🔄 Replace with merged", key="bulk_replace"):
+                previous_count = len(st.session_state.locker)
+                st.session_state.locker = list(merged_ids)
+                save_l()
+                st.session_state.last_import_msg = (
+                    f"Bulk replace: now {len(merged_ids)} weapons (previously {previous_count}, "
+                    f"{len(bulk_scans)} saves, {merge_mode})."
+                )
+                st.rerun()
 
     if st.session_state.last_import_msg:
         st.sidebar.success(st.session_state.last_import_msg)
@@ -1075,7 +1811,7 @@ with t0:
                 quick_save = st.selectbox("Quick import from savegame", saves, key="quick_empty_save")
                 if st.button("📥 Import all from selected save", key="quick_empty_import"):
                     all_ids = df['id'].unique().tolist()
-                    found_quick = extract_weapons_from_scop(os.path.join(SAVE_DIR, quick_save), all_ids)
+                    found_quick = scan_save(os.path.join(SAVE_DIR, quick_save), all_ids).known
                     if found_quick:
                         unique_found = list(dict.fromkeys(found_quick))
                         st.session_state.locker = list(set(st.session_state.locker + unique_found))
@@ -1110,11 +1846,7 @@ with t0:
             
             if show_locker_icons:
                 # Icons for ImageColumn
-                def get_icon_path(w_id):
-                    p = icon_path_for_id(w_id)
-                    return p if p and os.path.exists(p) else None
-
-                locker_df['Icon'] = locker_df['id'].apply(lambda w_id: icon_data_url(get_icon_path(w_id)))
+                locker_df['Icon'] = locker_df['id'].apply(icon_data_url_for_id, args=(ICON_STORE,))
                 display_df = locker_df[['Remove', 'Icon', 'id', 'pretty_name', 'class', 'hit', 'rpm', 'rec', 'mag', 'score']].copy()
             else:
                 display_df = locker_df[['Remove', 'id', 'pretty_name', 'class', 'hit', 'rpm', 'rec', 'mag', 'score']].copy()
@@ -1209,21 +1941,13 @@ with t1:
         
         # Prepare table for search results
         if not hits.empty:
-            # Compute global rank
-            df['global_rank'] = df['score'].rank(ascending=False, method='min')
-            
-            # Compute class rank
-            df['class_rank'] = df.groupby('class')['score'].rank(ascending=False, method='min')
-            
-            # Update hits with rank columns
-            hits = df.loc[hits.index]
+            # global_rank / class_rank are precomputed in enrich_weapon_table
             render_hits = hits.head(result_limit)
             
             # Show top-N detailed rows with add/remove buttons
             for _, r in render_hits.iterrows():
                 c_img, c_txt, c_btn = st.columns([1, 4, 1])
-                img_path = f"loadout_lab_data/icons/{r['id']}.png"
-                img = load_icon_image(icon_path_for_id(r['id']))
+                img = icon_image_for_id(r['id'], ICON_STORE)
                 if img is not None:
                     c_img.image(img, width=80)
                 m = "🐗 " if r['mutant_killer'] else ""
@@ -1291,7 +2015,33 @@ with t2:
             value=st.session_state.get("diversity_draft_mode", False),
             help="Prioritizes unused weapons and minimizes redundancies before reusing items.",
         )
-        draft_key = (locker_hash, strat, diversity_mode)
+        optimal_mode = st.checkbox(
+            "Use optimal draft (exact solver)",
+            key="optimal_draft_mode",
+            value=st.session_state.get("optimal_draft_mode", False),
+            disabled=bool(diversity_mode),
+            help=f"Finds the largest possible number of flawless sets (then the best total) before reusing weapons. Gives up after {OPTIMAL_DRAFT_TIME_BUDGET:.0f} s with the best draft found so far.",
+        )
+        seed_col, reroll_col = st.columns([3, 1])
+        with seed_col:
+            draft_seed = int(st.number_input(
+                "Draft seed",
+                min_value=0,
+                max_value=DRAFT_SEED_MAX,
+                step=1,
+                key="draft_seed",
+                help="Tie-breaks between equally good sets use this seed, so the same locker and seed always draft the same loadouts.",
+            ))
+        with reroll_col:
+            st.button("🎲 Reroll", on_click=reroll_draft_seed, help="Pick a new random seed.")
+        draft_first_n = int(st.number_input(
+            "Stop after first N sets (0 = all)",
+            min_value=0,
+            step=1,
+            key="draft_first_n",
+            help="Sets are drafted best tier first, so a small N gives the top tiers quickly. Partial drafts are not cached.",
+        ))
+        draft_key = (locker_hash, strat, diversity_mode, optimal_mode, draft_seed, draft_first_n)
         if auto_generate:
             st.session_state.sets_ready = True
             st.session_state.sets_locker_hash = draft_key
@@ -1299,6 +2049,7 @@ with t2:
             if st.button("Generate sets"):
                 st.session_state.sets_ready = True
                 st.session_state.sets_locker_hash = draft_key
+                st.session_state.draft_partial = None
                 st.rerun()
             if not st.session_state.get("sets_ready") or st.session_state.get("sets_locker_hash") != draft_key:
                 st.info("Click 'Generate sets' to compute loadouts.")
@@ -1313,8 +2064,12 @@ with t2:
             st.caption("Maxxed label: P1 strict unique draft, then P2 (Light→Power only with MP/Shotgun Workhorse), then redundant phase R with uniform sampling.")
         else:
             st.caption("Balanced label: same P1/P2/R draft model, but set fitness targets balanced totals.")
-        draft_mode = "diversity" if diversity_mode else "classic"
-        res_sets = calculate_all_sets(st.session_state.locker, strat, draft_mode)
+        draft_mode = "diversity" if diversity_mode else ("optimal" if optimal_mode else "classic")
+        res_sets = stream_draft_sets(st.session_state.locker, strat, draft_mode, draft_seed, draft_first_n, draft_key)
+        if draft_mode == "optimal" and res_sets and (res_sets[0].get('solver') or {}).get("optimal"):
+            # The greedy side of the comparison is the (cached) classic draft for the same inputs.
+            greedy_sets = calculate_all_sets(st.session_state.locker, strat, "classic", draft_seed)
+            render_solver_report(res_sets[0]['solver'], draft_summary(greedy_sets))
         if diversity_mode and not res_sets:
             st.warning("No valid sets found in diversity mode. Try disabling it or ensure you have a mutant-killer and mixed ammo groups.")
         # cache usage counts for filter and scoring purposes
@@ -1522,8 +2277,7 @@ with t2:
                     if w is None:
                         continue
                     with cols[i]:
-                        img_path = f"loadout_lab_data/icons/{w['id']}.png"
-                        img = load_icon_image(icon_path_for_id(w['id']))
+                        img = icon_image_for_id(w['id'], ICON_STORE)
                         if img is not None:
                             st.image(img, width='content')
                         st.write(f"*{labels[i]}*")
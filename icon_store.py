@@ -0,0 +1,327 @@
+import os, io, json, time, base64, threading
+from collections import OrderedDict
+from PIL import Image
+
+# Packed icon atlas: every visible icons/*.png is colour-corrected once (alpha check,
+# R/B swap heuristic, flattened on black) and shelf-packed into a single RGB PNG.
+# A JSON index maps icon stems to rectangles. The UI then slices the atlas instead of
+# re-opening and re-correcting PNGs on every rerun, and `_cw`/custom fallbacks are
+# resolved against the index once per stem.
+ATLAS_VERSION = 2
+ATLAS_IMAGE_NAME = "icon_atlas.png"
+ATLAS_INDEX_NAME = "icon_atlas.json"
+ATLAS_MAX_WIDTH = 2048
+ICON_MANIFEST_NAME = "manifest.json"
+SCRAPE_STAMP_NAME = "scrape_finished.json"
+ICON_CACHE_BUDGET_MB = 64
+
+ICON_NO_CW_FALLBACK_PREFIXES = (
+    "wpn_spas12",
+)
+
+def open_visible_rgba(path):
+    if not os.path.exists(path):
+        return None
+    rgba = Image.open(path).convert("RGBA")
+    alpha_max = rgba.getchannel("A").getextrema()[1]
+    if alpha_max == 0:
+        return None
+    return rgba
+
+def icon_fallback_candidates(stem):
+    candidates = []
+
+    # Manual fix: Base SPAS-12 icon often extracts as invisible. Fall back to custom variant.
+    if stem == "wpn_spas12":
+        candidates.append("wpn_spas12_custom")
+
+    allow_cw_fallback = not any(stem.startswith(prefix) for prefix in ICON_NO_CW_FALLBACK_PREFIXES)
+
+    if allow_cw_fallback and not stem.endswith("_cw"):
+        candidates.append(f"{stem}_cw")
+
+    parts = stem.split("_")
+    for i in range(len(parts) - 1, 1, -1):
+        base = "_".join(parts[:i])
+        if allow_cw_fallback:
+            candidates.append(f"{base}_cw")
+
+    return list(dict.fromkeys(candidates))
+
+def correct_icon_colors(rgba):
+    r, g, b, a = rgba.split()
+
+    orig_rgba = Image.merge("RGBA", (r, g, b, a))
+    swap_rgba = Image.merge("RGBA", (b, g, r, a))
+
+    def to_rgb_on_black(img_rgba):
+        bg = Image.new("RGBA", img_rgba.size, (0, 0, 0, 255))
+        bg.paste(img_rgba, mask=img_rgba.split()[-1])
+        return bg.convert("RGB")
+
+    orig_rgb = to_rgb_on_black(orig_rgba)
+
+    # Some DDS->PNG exports have swapped R/B channels, others do not.
+    # Choose the more plausible variant per icon via a simple color-balance heuristic.
+    o_stat = orig_rgb.resize((1, 1), Image.BOX).getpixel((0, 0))
+    use_swapped = o_stat[2] > (o_stat[0] * 1.02)
+
+    return to_rgb_on_black(swap_rgba) if use_swapped else orig_rgb
+
+def load_icon_image(path):
+    # Uncached single-icon path (own PNG, then fallbacks); the atlas bakes the same result.
+    rgba = open_visible_rgba(path)
+    if rgba is None:
+        root, ext = os.path.splitext(path)
+        folder = os.path.dirname(path)
+        for candidate in icon_fallback_candidates(os.path.basename(root)):
+            rgba = open_visible_rgba(os.path.join(folder, f"{candidate}{ext}"))
+            if rgba is not None:
+                break
+    if rgba is None:
+        return None
+    return correct_icon_colors(rgba)
+
+def icon_dir_signature(icon_dir):
+    # Adding/removing PNGs bumps the directory mtime; the scraper rewrites the
+    # manifest whenever it re-cuts icons in place. Two stats instead of one per icon.
+    try:
+        dir_stamp = os.stat(icon_dir).st_mtime_ns
+    except OSError:
+        return None
+    try:
+        manifest_stamp = os.stat(os.path.join(icon_dir, ICON_MANIFEST_NAME)).st_mtime_ns
+    except OSError:
+        manifest_stamp = None
+    return [dir_stamp, manifest_stamp]
+
+def pack_shelves(sizes, max_width=ATLAS_MAX_WIDTH):
+    # Simple shelf packer: tallest first, fill rows left to right.
+    # sizes: {stem: (w, h)} -> ({stem: [x, y, w, h]}, (atlas_w, atlas_h))
+    order = sorted(sizes, key=lambda s: (-sizes[s][1], -sizes[s][0], s))
+    width = max([max_width] + [w for w, _ in sizes.values()])
+    rects = {}
+    x = y = shelf_h = used_w = 0
+    for stem in order:
+        w, h = sizes[stem]
+        if x + w > width:
+            y += shelf_h
+            x = shelf_h = 0
+        rects[stem] = [x, y, w, h]
+        x += w
+        shelf_h = max(shelf_h, h)
+        used_w = max(used_w, x)
+    return rects, (max(used_w, 1), max(y + shelf_h, 1))
+
+# --- SHARED ICON CACHE ---
+# One process-wide LRU for sliced PIL images and their base64 data URLs, bounded by an
+# approximate memory budget. Keys carry the resolved source PNG and its mtime, so a
+# re-cut icon never serves a stale entry; the scraper additionally drops a stamp file
+# when it finishes, which clears the cache on the next rerun.
+def _approx_nbytes(value):
+    if isinstance(value, Image.Image):
+        return value.width * value.height * len(value.getbands())
+    return len(value)
+
+class IconCache:
+    def __init__(self, budget_mb=ICON_CACHE_BUDGET_MB):
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self._entries = OrderedDict()  # key -> (value, nbytes)
+        self._lock = threading.Lock()
+        self._stamp = None
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def get(self, key, build):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        value = build()
+        if value is None:
+            return None
+        nbytes = _approx_nbytes(value)
+        with self._lock:
+            if key not in self._entries and nbytes <= self.budget_bytes:
+                self._entries[key] = (value, nbytes)
+                self.bytes += nbytes
+                while self.bytes > self.budget_bytes:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self.bytes -= evicted
+                    self.evictions += 1
+        return value
+
+    def _clear(self):
+        # Caller holds self._lock.
+        self._entries.clear()
+        self.bytes = 0
+        self.invalidations += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._clear()
+
+    def sync_scrape_stamp(self, data_dir):
+        # Clears the cache once per finished scraper run (first call only records the stamp).
+        try:
+            stamp = os.stat(os.path.join(data_dir, SCRAPE_STAMP_NAME)).st_mtime_ns
+        except OSError:
+            stamp = None
+        with self._lock:
+            if stamp != self._stamp:
+                if self._stamp is not None or (stamp is not None and self.bytes):
+                    self._clear()
+                self._stamp = stamp
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries), "mb": self.bytes / (1024 * 1024),
+                "budget_mb": self.budget_bytes / (1024 * 1024),
+                "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "invalidations": self.invalidations,
+            }
+
+icon_cache = IconCache()
+
+def write_scrape_stamp(data_dir):
+    try:
+        with open(os.path.join(data_dir, SCRAPE_STAMP_NAME), "w", encoding="utf-8") as fh:
+            json.dump({"finished": time.time()}, fh)
+    except Exception as e:
+        print(f"Could not write scrape stamp: {e}")
+
+class IconStore:
+    def __init__(self, atlas, rects, signature=None, icon_dir=None, sources=None, cache=None):
+        self.atlas = atlas
+        self.rects = rects
+        self.signature = signature
+        self.icon_dir = icon_dir or ""
+        self.sources = sources or {}  # stem -> source PNG mtime_ns
+        self.cache = cache or icon_cache
+        self._resolved = {}
+
+    def __len__(self):
+        return len(self.rects)
+
+    def resolve(self, stem):
+        if stem in self._resolved:
+            return self._resolved[stem]
+        found = None
+        if stem in self.rects:
+            found = stem
+        else:
+            for candidate in icon_fallback_candidates(stem):
+                if candidate in self.rects:
+                    found = candidate
+                    break
+        self._resolved[stem] = found
+        return found
+
+    def _cache_key(self, key, kind):
+        return (os.path.join(self.icon_dir, f"{key}.png"), self.sources.get(key), kind)
+
+    def _crop(self, key):
+        x, y, w, h = self.rects[key]
+        return self.atlas.crop((x, y, x + w, y + h))
+
+    def _encode(self, key):
+        buf = io.BytesIO()
+        self.image(key).save(buf, format="PNG")
+        return "data:image/png;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+
+    def image(self, stem):
+        key = self.resolve(stem) if stem else None
+        if key is None:
+            return None
+        return self.cache.get(self._cache_key(key, "image"), lambda: self._crop(key))
+
+    def data_url(self, stem):
+        key = self.resolve(stem) if stem else None
+        if key is None:
+            return None
+        return self.cache.get(self._cache_key(key, "data_url"), lambda: self._encode(key))
+
+EMPTY_STORE = IconStore(None, {})
+
+def _atlas_paths(icon_dir, data_dir):
+    data_dir = data_dir or os.path.dirname(os.path.abspath(icon_dir))
+    return os.path.join(data_dir, ATLAS_IMAGE_NAME), os.path.join(data_dir, ATLAS_INDEX_NAME)
+
+def build_icon_atlas(icon_dir, data_dir=None):
+    signature = icon_dir_signature(icon_dir)
+    if signature is None:
+        return EMPTY_STORE
+
+    icons = {}
+    sources = {}
+    for name in sorted(os.listdir(icon_dir)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() != ".png":
+            continue
+        path = os.path.join(icon_dir, name)
+        try:
+            rgba = open_visible_rgba(path)
+            if rgba is not None:
+                sources[stem] = os.stat(path).st_mtime_ns
+                icons[stem] = correct_icon_colors(rgba)
+        except Exception:
+            continue
+
+    rects, size = pack_shelves({stem: img.size for stem, img in icons.items()})
+    atlas = Image.new("RGB", size, (0, 0, 0))
+    for stem, (x, y, _, _) in rects.items():
+        atlas.paste(icons[stem], (x, y))
+
+    image_path, index_path = _atlas_paths(icon_dir, data_dir)
+    try:
+        atlas.save(image_path + ".tmp", format="PNG")
+        with open(index_path + ".tmp", "w", encoding="utf-8") as fh:
+            json.dump({"version": ATLAS_VERSION, "signature": signature, "size": list(size),
+                       "icons": rects, "sources": sources}, fh)
+        os.replace(image_path + ".tmp", image_path)
+        os.replace(index_path + ".tmp", index_path)
+    except Exception as e:
+        # Read-only data dir: still serve the in-memory atlas for this process.
+        print(f"Could not write icon atlas: {e}")
+    return IconStore(atlas, rects, signature, icon_dir, sources)
+
+_stores = {}
+# Sessions run on separate threads; one lock keeps two of them from rebuilding (and writing
+# the same .tmp files for) one atlas at once. Rebuilds are rare, so holding it is cheap.
+_stores_lock = threading.Lock()
+
+def load_icon_store(icon_dir, data_dir=None):
+    """Returns the IconStore for icon_dir, rebuilding the atlas when the icons changed."""
+    _, index_path = _atlas_paths(icon_dir, data_dir)
+    icon_cache.sync_scrape_stamp(os.path.dirname(index_path))
+    signature = icon_dir_signature(icon_dir)
+    if signature is None:
+        return EMPTY_STORE
+
+    key = os.path.abspath(icon_dir)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is not None and store.signature == signature:
+            return store
+        store = _load_or_build_store(icon_dir, data_dir, signature)
+        _stores[key] = store
+        return store
+
+def _load_or_build_store(icon_dir, data_dir, signature):
+    image_path, index_path = _atlas_paths(icon_dir, data_dir)
+    store = None
+    try:
+        with open(index_path, "r", encoding="utf-8") as fh:
+            index = json.load(fh)
+        if index.get("version") == ATLAS_VERSION and index.get("signature") == signature:
+            with Image.open(image_path) as atlas:
+                store = IconStore(atlas.convert("RGB"), index["icons"], signature, icon_dir, index.get("sources"))
+    except Exception:
+        store = None
+    if store is None:
+        store = build_icon_atlas(icon_dir, data_dir)
+    return store
@@ -1,4 +1,6 @@
 import json
+import threading
+import time
 from pathlib import Path
 from typing import Any
 
@@ -21,13 +23,17 @@ DEFAULT_PATHS_CONFIG = {
 }
 
 
-def load_paths_config() -> dict[str, Any]:
+PATH_LIST_KEYS = ("scan_paths", "text_paths", "texture_paths")
+
+
+def load_paths_config(config_file: Path | None = None) -> dict[str, Any]:
+    config_file = Path(config_file or CONFIG_FILE)
     config = dict(DEFAULT_PATHS_CONFIG)
-    if not CONFIG_FILE.exists():
+    if not config_file.exists():
         return config
 
     try:
-        with open(CONFIG_FILE, "r", encoding="utf-8") as fh:
+        with open(config_file, "r", encoding="utf-8") as fh:
             user_cfg = json.load(fh)
     except Exception:
         return config
@@ -44,49 +50,159 @@ def load_paths_config() -> dict[str, Any]:
     return config
 
 
-def get_path(key: str, fallback: str = "") -> Path:
-    cfg = load_paths_config()
-    value = cfg.get(key, fallback)
-    return Path(str(value))
+def _mtime_ns(path: Path) -> int | None:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
 
 
-def get_path_list(key: str) -> list[Path]:
-    cfg = load_paths_config()
-    values = cfg.get(key, [])
-    if not isinstance(values, list):
-        return []
-    
-    result = []
-    for item in values:
-        p = Path(str(item))
-        if p.name == "mods" and p.parent.name == "MO2":
-            profiles_dir = p.parent / "profiles"
-            best_modlist = None
-            if profiles_dir.exists():
-                modlists = [ml for prof in profiles_dir.iterdir() if (ml := prof / "modlist.txt").exists() and ml.is_file()]
-                if modlists:
-                    best_modlist = max(modlists, key=lambda x: x.stat().st_mtime)
-            if best_modlist:
+def _is_mo2_mods(p: Path) -> bool:
+    return p.name == "mods" and p.parent.name == "MO2"
+
+
+def newest_modlist(mods_dir: Path) -> Path | None:
+    """The most recently written profiles/*/modlist.txt next to an MO2 mods folder."""
+    profiles_dir = mods_dir.parent / "profiles"
+    if not profiles_dir.exists():
+        return None
+    modlists = [ml for prof in profiles_dir.iterdir() if (ml := prof / "modlist.txt").exists() and ml.is_file()]
+    if not modlists:
+        return None
+    return max(modlists, key=lambda x: x.stat().st_mtime)
+
+
+def _mod_subdir(mod_path: Path, key: str) -> Path | None:
+    append_p = mod_path
+    if key == "text_paths":
+        append_p = mod_path / "gamedata/configs/text/eng"
+        if not append_p.exists():
+            append_p = mod_path / "gamedata/configs/text"
+    elif key == "scan_paths":
+        append_p = mod_path / "gamedata/configs"
+    elif key == "texture_paths":
+        append_p = mod_path / "gamedata/textures"
+    return append_p if append_p.exists() else None
+
+
+class ResolvedPaths:
+    """paths_config.json with MO2 `mods` folders expanded into the enabled mods (highest priority
+    first). Resolved once and reused; `refresh()` re-resolves when the config file or the active
+    modlist.txt has been modified since."""
+
+    def __init__(self, config_file: Path | None = None):
+        self.config_file = Path(config_file or CONFIG_FILE)
+        self._lock = threading.RLock()
+        self._config: dict[str, Any] | None = None
+        self._config_stamp: int | None = None
+        self._mods: dict[Path, tuple[Path, int | None, list[Path]] | None] = {}
+        self._lists: dict[str, list[Path]] = {}
+        self.timings = {"config": 0.0, "modlists": 0.0, "lists": 0.0}
+        self.refreshes = 0
+
+    def config(self) -> dict[str, Any]:
+        with self._lock:
+            if self._config is None:
+                t0 = time.perf_counter()
+                self._config_stamp = _mtime_ns(self.config_file)
+                self._config = load_paths_config(self.config_file)
+                self.timings["config"] = time.perf_counter() - t0
+            return self._config
+
+    def get(self, key: str, fallback: str = "") -> Path:
+        return Path(str(self.config().get(key, fallback)))
+
+    def path_list(self, key: str) -> list[Path]:
+        with self._lock:
+            if key not in self._lists:
+                t0 = time.perf_counter()
+                self._lists[key] = self._resolve_list(key)
+                self.timings["lists"] += time.perf_counter() - t0
+            return list(self._lists[key])
+
+    def _enabled_mods(self, mods_dir: Path) -> list[Path] | None:
+        # modlist.txt is read and every `+mod` folder stat'ed once per mods folder, not per key.
+        if mods_dir not in self._mods:
+            t0 = time.perf_counter()
+            entry = None
+            modlist = newest_modlist(mods_dir)
+            if modlist:
                 try:
-                    lines = best_modlist.read_text(encoding='utf-8', errors='ignore').splitlines()
-                    for line in reversed(lines):
-                        if line.startswith('+'):
-                            mod_path = p / line[1:].strip()
-                            if mod_path.exists():
-                                append_p = mod_path
-                                if key == "text_paths":
-                                    append_p = mod_path / "gamedata/configs/text/eng"
-                                    if not append_p.exists():
-                                        append_p = mod_path / "gamedata/configs/text"
-                                elif key == "scan_paths":
-                                    append_p = mod_path / "gamedata/configs"
-                                elif key == "texture_paths":
-                                    append_p = mod_path / "gamedata/textures"
-                                
-                                if append_p.exists():
-                                    result.append(append_p)
-                    continue
+                    lines = modlist.read_text(encoding='utf-8', errors='ignore').splitlines()
+                    mods = [mods_dir / line[1:].strip() for line in reversed(lines) if line.startswith('+')]
+                    entry = (modlist, _mtime_ns(modlist), [m for m in mods if m.exists()])
                 except Exception:
-                    pass
-        result.append(p)
-    return result
+                    entry = None
+            self._mods[mods_dir] = entry
+            self.timings["modlists"] += time.perf_counter() - t0
+        entry = self._mods[mods_dir]
+        return entry[2] if entry else None
+
+    def _resolve_list(self, key: str) -> list[Path]:
+        values = self.config().get(key, [])
+        if not isinstance(values, list):
+            return []
+
+        result = []
+        for item in values:
+            p = Path(str(item))
+            if _is_mo2_mods(p):
+                mods = self._enabled_mods(p)
+                if mods is not None:
+                    result.extend(sub for mod_path in mods if (sub := _mod_subdir(mod_path, key)) is not None)
+                    continue
+            result.append(p)
+        return result
+
+    def is_stale(self) -> bool:
+        with self._lock:
+            if self._config is None:
+                return False
+            if _mtime_ns(self.config_file) != self._config_stamp:
+                return True
+            for mods_dir, entry in self._mods.items():
+                modlist = newest_modlist(mods_dir)
+                if (entry is None) != (modlist is None):
+                    return True
+                if entry is not None and (entry[0] != modlist or entry[1] != _mtime_ns(modlist)):
+                    return True
+            return False
+
+    def refresh(self, force: bool = False) -> bool:
+        """Drops the resolved paths if the config or a modlist changed (or `force`); True if dropped.
+        Lists that had been resolved are resolved again right away so timings stay current."""
+        with self._lock:
+            if not (force or self.is_stale()):
+                return False
+            keys = list(self._lists)
+            self._config = None
+            self._mods.clear()
+            self._lists.clear()
+            self.timings = {"config": 0.0, "modlists": 0.0, "lists": 0.0}
+            self.refreshes += 1
+            self.config()
+            for key in keys:
+                self.path_list(key)
+            return True
+
+    def info(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "config_found": self._config_stamp is not None,
+                "modlists": {str(d): str(e[0]) for d, e in self._mods.items() if e},
+                "mods": sum(len(e[2]) for e in self._mods.values() if e),
+                "lists": {key: len(paths) for key, paths in self._lists.items()},
+                "seconds": sum(self.timings.values()),
+                "refreshes": self.refreshes,
+            }
+
+
+PATHS = ResolvedPaths()
+
+
+def get_path(key: str, fallback: str = "") -> Path:
+    return PATHS.get(key, fallback)
+
+
+def get_path_list(key: str) -> list[Path]:
+    return PATHS.path_list(key)
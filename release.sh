@@ -55,7 +55,9 @@ files = [
     'paths_config.json',
     'app.py',
     'save_reader.py',
+    'icon_store.py',
     'scraper.py',
+    'scraper_rules.py',
     'release.sh',
     'release.ps1',
     'start_gamma_locker.sh',
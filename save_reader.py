@@ -1,4 +1,7 @@
-import os, re
+import os, re, json, hashlib, threading
+from bisect import bisect_left
+from collections import Counter, OrderedDict, namedtuple
+from functools import lru_cache
 
 def get_savegames(save_dir):
     if not os.path.exists(save_dir): return []
@@ -6,25 +9,41 @@ def get_savegames(save_dir):
     files.sort(key=lambda x: os.path.getmtime(os.path.join(save_dir, x)), reverse=True)
     return files
 
-def _best_known_match(token, known_sorted, known_set):
+class KnownWeaponIndex:
+    # Lookup structures over the known weapon IDs: a set for exact hits and a sorted
+    # list for prefix queries via bisect. Built once per ID set and shared by scans.
+    def __init__(self, known_ids):
+        self.known_set = frozenset(known_ids)
+        self.sorted_ids = sorted(self.known_set)
+
+@lru_cache(maxsize=4)
+def _build_known_index(known_key):
+    return KnownWeaponIndex(known_key)
+
+def get_known_index(all_known_weapons):
+    if isinstance(all_known_weapons, KnownWeaponIndex):
+        return all_known_weapons
+    return _build_known_index(frozenset(all_known_weapons))
+
+def _best_known_match(token, index):
+    known_set = index.known_set
     if token in known_set:
         return token
 
-    best_match = None
-    for w_id in known_sorted:
-        if token.startswith(w_id):
-            suffix = token[len(w_id):]
-            if not suffix or suffix.isdigit():
-                if best_match is None or len(w_id) > len(best_match):
-                    best_match = w_id
-
-    if best_match:
-        return best_match
+    # Longest known ID that the token only extends by digits (e.g. wpn_ak74 -> wpn_ak742).
+    # Such an ID must end inside the token's trailing digit run, so probe those cut points.
+    digits_start = len(token.rstrip("0123456789"))
+    for end in range(len(token) - 1, max(digits_start, 1) - 1, -1):
+        if token[:end] in known_set:
+            return token[:end]
 
     # If the token is a shorter base and only one known ID extends it, map to that.
-    prefix_candidates = [w_id for w_id in known_set if w_id.startswith(token) and w_id != token]
-    if len(prefix_candidates) == 1:
-        return prefix_candidates[0]
+    # IDs extending the token form a contiguous run right after its sort position.
+    sorted_ids = index.sorted_ids
+    pos = bisect_left(sorted_ids, token)
+    if pos < len(sorted_ids) and sorted_ids[pos].startswith(token):
+        if pos + 1 == len(sorted_ids) or not sorted_ids[pos + 1].startswith(token):
+            return sorted_ids[pos]
 
     # Fallback: trim underscore suffixes to find a base weapon ID.
     parts = token.split('_')
@@ -34,80 +53,248 @@ def _best_known_match(token, known_sorted, known_set):
             return base
     return None
 
-def extract_weapons_from_scop(file_path, all_known_weapons):
+# Result of one pass over a save: matched known IDs, unmatched base tokens and
+# how often each (non-junk) weapon token occurs in the file.
+SaveScan = namedtuple("SaveScan", ["known", "unknown", "token_counts"])
+EMPTY_SCAN = SaveScan([], [], {})
+
+JUNK_IDS = ('wpn_binoc', 'wpn_knife', 'wpn_grenade', 'wpn_bolt')
+SCAN_CACHE_SIZE = 8
+UNKNOWN_TOKEN_LIMIT = 50
+_scan_cache = OrderedDict()
+# Streamlit runs sessions on separate threads; the file scan itself stays outside the lock.
+_scan_cache_lock = threading.Lock()
+
+def _save_source_path(file_path):
+    # The .scoc companion holds the full object data when present.
+    scoc_path = file_path[:-5] + ".scoc" if file_path.lower().endswith(".scop") else file_path
+    return scoc_path if os.path.exists(scoc_path) else file_path
+
+# Bytes pattern so the regex can run straight over the mmap. IGNORECASE on a bytes
+# pattern only folds ASCII, which matches lowercasing the latin-1 decoded text.
+WEAPON_TOKEN_RE = re.compile(rb"wpn_[a-z0-9_]+", re.IGNORECASE)
+
+def _count_weapon_tokens(buffer):
+    # Only the matched tokens are copied out of the buffer and lowercased, so peak
+    # memory tracks the token set instead of several copies of the whole save.
+    raw_counts = Counter(WEAPON_TOKEN_RE.findall(buffer))
+    token_counts = Counter()
+    for raw, count in raw_counts.items():
+        token_counts[raw.lower().decode("ascii")] += count
+    return token_counts
+
+def _scan_save_file(source_path, index):
+    import mmap
+    with open(source_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            token_counts = _count_weapon_tokens(mm)
+
+    found = set()
+    unknown = set()
+    for token in list(token_counts):
+        if any(j in token for j in JUNK_IDS) or "_hud" in token:
+            del token_counts[token]
+            continue
+
+        base_token = re.sub(r"[0-9]+$", "", token)
+        if not base_token: continue
+
+        best_match = _best_known_match(token, index)
+        if best_match:
+            found.add(best_match)
+        else:
+            unknown.add(base_token)
+
+    return SaveScan(sorted(found), sorted(unknown), dict(token_counts))
+
+def scan_save(file_path, all_known_weapons):
+    # Single pass over a save for known matches, unknown tokens and token counts.
+    # Results are cached per (source path, mtime, size, known-ID set), so Streamlit
+    # reruns on an unchanged save never touch the file again.
     if not os.path.exists(file_path):
-        return []
+        return EMPTY_SCAN
     try:
-        known_set = set(all_known_weapons)
-        known = sorted(known_set, key=len, reverse=True)
-        junk_ids = {'wpn_binoc', 'wpn_knife', 'wpn_grenade', 'wpn_bolt'}
-
-        scoc_path = file_path[:-5] + ".scoc" if file_path.lower().endswith(".scop") else file_path
-        source_path = scoc_path if os.path.exists(scoc_path) else file_path
-
-        import mmap
-        with open(source_path, 'rb') as f:
-            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
-                content = mm[:]
-
-        text = content.decode("latin-1", errors="ignore").lower()
-        tokens = re.findall(r"(wpn_[a-z0-9_]+)", text)
-        
-        found = set()
-        for token in tokens:
-            if any(j in token for j in junk_ids) or "_hud" in token: continue
-            
-            base_token = re.sub(r"[0-9]+$", "", token)
-            if not base_token: continue
-            
-            best_match = _best_known_match(token, known, known_set)
-            if best_match:
-                found.add(best_match)
-
-        return sorted(list(found))
+        index = get_known_index(all_known_weapons)
+        source_path = _save_source_path(file_path)
+        st = os.stat(source_path)
+        key = (os.path.abspath(source_path), st.st_mtime_ns, st.st_size, index.known_set)
+        with _scan_cache_lock:
+            cached = _scan_cache.get(key)
+            if cached is not None:
+                _scan_cache.move_to_end(key)
+                return cached
+
+        result = _scan_save_file(source_path, index)
+        with _scan_cache_lock:
+            _scan_cache[key] = result
+            _scan_cache.move_to_end(key)
+            while len(_scan_cache) > SCAN_CACHE_SIZE:
+                _scan_cache.popitem(last=False)
+        return result
     except Exception as e:
         print(f"Error reading save: {e}")
-        return []
+        return EMPTY_SCAN
 
-def extract_unknown_weapon_tokens(file_path, all_known_weapons, limit=50):
-    if not os.path.exists(file_path):
-        return []
+def extract_weapons_from_scop(file_path, all_known_weapons):
+    return list(scan_save(file_path, all_known_weapons).known)
+
+def extract_unknown_weapon_tokens(file_path, all_known_weapons, limit=UNKNOWN_TOKEN_LIMIT):
+    res = scan_save(file_path, all_known_weapons).unknown
+    return res[:max(0, int(limit))]
+
+def extract_refined_weapons(file_path, all_known_weapons):
+    # Fallback that just puts everything in "Inventory" so nothing breaks
+    res = extract_weapons_from_scop(file_path, all_known_weapons)
+    return {"Inventory": res, "Stashes": res, "Racks": res}
+
+# --- Bulk scan over every save in SAVE_DIR ---
+# Each save is scanned in a worker process; finished scans are persisted in a JSON
+# cache keyed by the save's source path, mtime and size (plus a fingerprint of the
+# known-ID set), so unchanged saves are never read again.
+BULK_SCAN_CACHE_VERSION = 1
+BULK_MERGE_MODES = ("union", "intersection", "timeline")
+
+# One finished save: done/total let callers drive a progress bar. scan is None
+# when the save could not be read (error holds the message).
+BulkScanProgress = namedtuple("BulkScanProgress", ["name", "scan", "cached", "error", "done", "total"])
+
+def _known_fingerprint(index):
+    return hashlib.sha1("\n".join(index.sorted_ids).encode("utf-8")).hexdigest()
+
+def _scan_save_job(file_path, known_ids):
+    # Runs inside a worker process; exceptions travel back through the future.
+    return _scan_save_file(_save_source_path(file_path), get_known_index(known_ids))
+
+def _load_bulk_cache(cache_file, fingerprint):
+    if not cache_file or not os.path.exists(cache_file):
+        return {}
+    try:
+        with open(cache_file, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+    except Exception:
+        return {}
+    if not isinstance(data, dict) or data.get("version") != BULK_SCAN_CACHE_VERSION:
+        return {}
+    if data.get("known_fingerprint") != fingerprint:
+        return {}
+    saves = data.get("saves")
+    return saves if isinstance(saves, dict) else {}
+
+def _write_bulk_cache(cache_file, fingerprint, entries):
+    if not cache_file:
+        return
+    payload = {"version": BULK_SCAN_CACHE_VERSION, "known_fingerprint": fingerprint, "saves": entries}
+    tmp_file = cache_file + ".tmp"
     try:
-        known_set = set(all_known_weapons)
-        known = sorted(known_set, key=len, reverse=True)
-        junk_ids = {'wpn_binoc', 'wpn_knife', 'wpn_grenade', 'wpn_bolt'}
+        with open(tmp_file, "w", encoding="utf-8") as fh:
+            json.dump(payload, fh)
+        os.replace(tmp_file, cache_file)
+    except Exception as e:
+        print(f"Error writing save scan cache: {e}")
 
-        scoc_path = file_path[:-5] + ".scoc" if file_path.lower().endswith(".scop") else file_path
-        source_path = scoc_path if os.path.exists(scoc_path) else file_path
+def scan_all_saves(save_dir, all_known_weapons, cache_file=None, max_workers=None):
+    # Generator: yields a BulkScanProgress per save as soon as it is finished.
+    # Cached saves come first, the rest stream in from the process pool in
+    # completion order.
+    names = get_savegames(save_dir)
+    total = len(names)
+    if not total:
+        return
 
-        import mmap
-        with open(source_path, 'rb') as f:
-            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
-                content = mm[:]
+    index = get_known_index(all_known_weapons)
+    fingerprint = _known_fingerprint(index)
+    cached_entries = _load_bulk_cache(cache_file, fingerprint)
+    entries = {}
+    pending = {}
+    done = 0
 
-        text = content.decode("latin-1", errors="ignore").lower()
-        tokens = re.findall(r"(wpn_[a-z0-9_]+)", text)
+    for name in names:
+        file_path = os.path.join(save_dir, name)
+        source_path = _save_source_path(file_path)
+        try:
+            st = os.stat(source_path)
+        except OSError as e:
+            done += 1
+            yield BulkScanProgress(name, None, False, str(e), done, total)
+            continue
+        key = os.path.abspath(source_path)
+        stamp = {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+        entry = cached_entries.get(key)
+        if entry and entry.get("mtime_ns") == stamp["mtime_ns"] and entry.get("size") == stamp["size"]:
+            entries[key] = entry
+            done += 1
+            scan = SaveScan(entry["known"], entry["unknown"], entry["token_counts"])
+            yield BulkScanProgress(name, scan, True, None, done, total)
+        else:
+            pending[name] = (file_path, key, stamp)
 
-        unknown = set()
-        for token in tokens:
-            if any(j in token for j in junk_ids) or "_hud" in token:
+    try:
+        jobs = {name: file_path for name, (file_path, _, _) in pending.items()}
+        for name, scan, error in _run_scan_jobs(jobs, index.sorted_ids, max_workers):
+            _, key, stamp = pending[name]
+            done += 1
+            if scan is None:
+                yield BulkScanProgress(name, None, False, error, done, total)
                 continue
+            entries[key] = dict(stamp, known=scan.known, unknown=scan.unknown,
+                                token_counts=scan.token_counts)
+            yield BulkScanProgress(name, scan, False, None, done, total)
+    finally:
+        # Only saves seen in this run are written back, so deleted saves drop out.
+        _write_bulk_cache(cache_file, fingerprint, entries)
 
-            base_token = re.sub(r"[0-9]+$", "", token)
-            if not base_token:
-                continue
+def _run_scan_jobs(jobs, known_ids, max_workers=None):
+    # Yields (name, scan, error) in completion order. Falls back to scanning in
+    # this process when no worker pool can be started (e.g. restricted sandboxes).
+    if not jobs:
+        return
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    try:
+        pool = ProcessPoolExecutor(max_workers=max_workers)
+    except (OSError, NotImplementedError, ImportError):
+        pool = None
 
-            best_match = _best_known_match(token, known, known_set)
-            if not best_match:
-                unknown.add(base_token)
+    if pool is None:
+        for name, file_path in jobs.items():
+            try:
+                yield name, _scan_save_job(file_path, known_ids), None
+            except Exception as e:
+                yield name, None, str(e)
+        return
 
-        res = sorted(list(unknown))
-        return res[:max(0, int(limit))]
-    except Exception as e:
-        print(f"Error reading save (unknown tokens): {e}")
+    try:
+        futures = {pool.submit(_scan_save_job, file_path, known_ids): name for name, file_path in jobs.items()}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, str(e)
+    finally:
+        # An abandoned generator must not keep the remaining saves queued.
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def merge_save_scans(ordered_scans, mode="union"):
+    # ordered_scans: [(save_name, SaveScan), ...] from oldest to newest save.
+    #   union        - every weapon seen in any save (sorted)
+    #   intersection - weapons present in every save (sorted)
+    #   timeline     - every weapon, ordered by the first save it appeared in
+    if mode not in BULK_MERGE_MODES:
+        raise ValueError(f"Unknown merge mode: {mode}")
+    if not ordered_scans:
         return []
+    if mode == "union":
+        return sorted(set().union(*(scan.known for _, scan in ordered_scans)))
+    if mode == "intersection":
+        common = set(ordered_scans[0][1].known)
+        for _, scan in ordered_scans[1:]:
+            common &= set(scan.known)
+        return sorted(common)
+    return list(first_seen_timeline(ordered_scans))
 
-def extract_refined_weapons(file_path, all_known_weapons):
-    # Fallback that just puts everything in "Inventory" so nothing breaks
-    res = extract_weapons_from_scop(file_path, all_known_weapons)
-    return {"Inventory": res, "Stashes": res, "Racks": res}
+def first_seen_timeline(ordered_scans):
+    # Maps weapon ID -> name of the oldest save that contains it, in first-seen order.
+    first_seen = {}
+    for name, scan in ordered_scans:
+        for w_id in scan.known:
+            first_seen.setdefault(w_id, name)
+    return first_seen
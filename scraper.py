@@ -1,6 +1,10 @@
-import os, re, pandas as pd, tqdm
+import os, re, io, stat, time, pickle, subprocess, argparse, pandas as pd, tqdm
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
-from paths_config import get_path_list
+from PIL import Image
+from paths_config import PATHS, get_path_list
+import icon_store
+from scraper_rules import JUNK_PATTERNS, JUNK_SECTIONS, classify_weapon, base_id_and_originality
 
 # --- CONFIGURATION ---
 SCAN_PATHS = get_path_list("scan_paths")
@@ -10,11 +14,19 @@ OUT_DIR = Path(__file__).parent / "loadout_lab_data"
 os.makedirs(OUT_DIR, exist_ok=True)
 
 # --- TRANSLATION LOADING ---
-print("📝 Loading translations...")
+# Resolved on demand after weapon discovery: only the inv_name/inv_name_short ids of
+# surviving weapons are looked up. Files are scanned newest-load-order first (so the
+# first hit is the definition a full load would have kept), files whose bytes cannot
+# contain a missing id are skipped without parsing, and the scan stops once every id
+# is resolved. Results are cached per file list + mtimes/sizes.
 translations = {}
+import json
 import xml.etree.ElementTree as ET
 
-def load_strings_via_regex(file_path):
+TRANSLATION_CACHE_FILE = OUT_DIR / "translations_cache.json"
+TRANSLATION_CACHE_VERSION = 1
+
+def load_strings_via_regex(file_path, into):
     try:
         raw = Path(file_path).read_text(encoding='utf-8', errors='ignore')
     except Exception:
@@ -23,287 +35,586 @@ def load_strings_via_regex(file_path):
         s_id = (m.group(1) or '').strip().lower()
         s_text = (m.group(2) or '').strip()
         if s_id and s_text:
-            translations[s_id] = s_text
-
-for t_path in TEXT_PATHS:
-    if not t_path.exists(): continue
-    for root, dirs, files in os.walk(t_path):
-        rel = Path(root).relative_to(t_path)
-        rel_parts = [p.lower() for p in rel.parts]
-        if 'text' in rel_parts and 'eng' not in rel_parts:
-            # We enforce English if sibling languages exist.
-            continue
-        if 'text' in rel_parts and 'eng' not in rel_parts:
-            # We enforce English if sibling languages exist.
-            continue
+            into[s_id] = s_text
+
+def parse_translation_file(p):
+    strings = {}
+    try:
+        tree = ET.parse(p)
+        found_any = False
+        for string in tree.findall(".//string"):
+            s_id = string.get('id')
+            text_elem = string.find('text')
+            if s_id and text_elem is not None and text_elem.text:
+                strings[s_id.lower()] = text_elem.text
+                found_any = True
+        if not found_any:
+            load_strings_via_regex(p, strings)
+    except Exception:
+        # Some mod XML files are malformed; salvage strings via regex fallback.
+        load_strings_via_regex(p, strings)
+    return strings
+
+def collect_translation_files(index=None):
+    """English string tables in load order (later files override earlier ones)."""
+    index = index or build_file_index(TEXT_PATHS, cache_file=None)
+    paths = []
+    for t_path in TEXT_PATHS:
+        for root, dirs, files in index.walk(t_path):
+            rel = Path(root).relative_to(t_path)
+            rel_parts = [p.lower() for p in rel.parts]
+            if 'text' in rel_parts and 'eng' not in rel_parts:
+                # We enforce English if sibling languages exist.
+                continue
         
-        # PRIORITY: Only keep 'eng' (English).
-        # Ignore everything in language folders that are not 'eng'.
-        # Some mods may place st_*.xml directly under configs/text, so keep this conservative.
-        languages_to_skip = ['spa', 'fra', 'rus', 'lat', 'ger', 'ita', 'pol', 'ptb']
+            # PRIORITY: Only keep 'eng' (English).
+            # Ignore everything in language folders that are not 'eng'.
+            # Some mods may place st_*.xml directly under configs/text, so keep this conservative.
+            languages_to_skip = ['spa', 'fra', 'rus', 'lat', 'ger', 'ita', 'pol', 'ptb']
         
-        skip = False
-        for lang in languages_to_skip:
-            if lang in rel_parts:
-                skip = True
-                break
-        if skip: continue
+            skip = False
+            for lang in languages_to_skip:
+                if lang in rel_parts:
+                    skip = True
+                    break
+            if skip: continue
         
-        # If path contains 'text' but not 'eng', check if sibling language folders exist.
-        # Typical GAMMA structure is: .../configs/text/eng/file.xml
-        if 'text' in rel_parts and 'eng' not in rel_parts:
-            # If sibling language folders exist and current folder is not eng, skip.
-            if any(os.path.isdir(os.path.join(root, "..", l)) for l in languages_to_skip):
+            # If path contains 'text' but not 'eng', check if sibling language folders exist.
+            # Typical GAMMA structure is: .../configs/text/eng/file.xml
+            if 'text' in rel_parts and 'eng' not in rel_parts:
+                # If sibling language folders exist and current folder is not eng, skip.
+                if any(os.path.isdir(os.path.join(root, "..", l)) for l in languages_to_skip):
+                    continue
+
+            for f in files:
+                if f.endswith(".xml"):
+                    paths.append(os.path.join(root, f))
+    return paths
+
+def translation_files_signature(paths, index=None):
+    sig = []
+    for p in paths:
+        stamp = index.stamp(p) if index is not None else None
+        if stamp is None:
+            try:
+                st = os.stat(p)
+                stamp = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                stamp = (None, None)
+        sig.append([p, *stamp])
+    return sig
+
+def load_translation_cache(signature):
+    try:
+        with open(TRANSLATION_CACHE_FILE, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+        if data.get("version") == TRANSLATION_CACHE_VERSION and data.get("files") == signature:
+            return data.get("resolved", {})
+    except Exception:
+        pass
+    return {}
+
+def save_translation_cache(signature, resolved):
+    try:
+        tmp = str(TRANSLATION_CACHE_FILE) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"version": TRANSLATION_CACHE_VERSION, "files": signature, "resolved": resolved}, fh)
+        os.replace(tmp, TRANSLATION_CACHE_FILE)
+    except Exception as e:
+        print(f"Could not write translation cache: {e}")
+
+def resolve_translations(string_ids, index=None):
+    """Resolves the given string ids into `translations`; unknown ids stay missing."""
+    wanted = {str(s).lower() for s in string_ids if s}
+    print(f"📝 Resolving {len(wanted)} translations...")
+    paths = collect_translation_files(index)
+    signature = translation_files_signature(paths, index)
+    cached = load_translation_cache(signature)
+    # Cached None means "searched every file, not defined anywhere".
+    resolved = {s_id: cached[s_id] for s_id in wanted if s_id in cached}
+    missing = wanted - set(resolved)
+    from_cache = len(resolved)
+
+    parsed = 0
+    if missing:
+        for p in reversed(paths):
+            try:
+                data = Path(p).read_bytes().lower()
+            except OSError:
                 continue
+            # Byte prefilter; ids are ASCII in practice, anything else is always parsed.
+            if not any(not s_id.isascii() or s_id.encode() in data for s_id in missing):
+                continue
+            parsed += 1
+            strings = parse_translation_file(p)
+            for s_id in [s for s in missing if s in strings]:
+                resolved[s_id] = strings[s_id]
+                missing.discard(s_id)
+            if not missing:
+                break
+        for s_id in missing:
+            resolved[s_id] = None
+        cached.update(resolved)
+        save_translation_cache(signature, cached)
 
-        for f in files:
-            if f.endswith(".xml"):
-                p = os.path.join(root, f)
-                try:
-                    tree = ET.parse(p)
-                    found_any = False
-                    for string in tree.findall(".//string"):
-                        s_id = string.get('id')
-                        text_elem = string.find('text')
-                        if s_id and text_elem is not None and text_elem.text:
-                            translations[s_id.lower()] = text_elem.text
-                            found_any = True
-                    if not found_any:
-                        load_strings_via_regex(p)
-                except Exception:
-                    # Some mod XML files are malformed; salvage strings via regex fallback.
-                    load_strings_via_regex(p)
+    translations.update({s_id: text for s_id, text in resolved.items() if text is not None})
+    found = sum(1 for text in resolved.values() if text is not None)
+    print(f"   Translations: {found}/{len(wanted)} resolved ({from_cache} cached, parsed {parsed} of {len(paths)} files)")
+    return translations
 
 def translate(s_id):
     if not s_id: return None
     return translations.get(str(s_id).lower())
 
-# Aggressive list of scope/attachment/variant sections to ignore
-# If a section contains any of these patterns, it is considered a derivative variant or attachment
-# and is filtered out to keep only the pure base weapons.
-JUNK_PATTERNS = [
-    r'_acog', r'_eot', r'_e0t2', r'_ac10632', r'_specter', r'_leupold', r'_aimpoint', 
-    r'_point_aimpro', r'_ekp8', r'_pn23', r'_gauss', r'_marchf', r'_kemper', 
-    r'_mepro', r'_rakurs', r'_0kp2', r'_rmr', r'_deltapoint', r'_compm4s', r'_pka', 
-    r'_1p29', r'_kobra', r'_ps01', r'_pso', r'_1pn93', r'_triji', r'_spec', r'_mark8',
-    r'_romeo4', r'_hco', r'_t12', r'_monstrum', r'_trihawk', r'_vulcan', r'_echo1',
-    r'_n_', r'_n$', r'_cw', r'_up', r'_sk1', r'_sk2', r'_camo', r'_new', 
-    r'_rusty', r'_worn', r'_old', r'_1p', r'_ap_', r'_dot', r'_sil', r'_tgp', r'_pbs',
-    r'_kzis', r'_usp1', r'_okp', r'_1g', r'_bas', r'_1p63', r'_1p59', r'_pso1m21', r'_ekp8_02', r'_pso2', r'_1p78gs', r'_1pn93n2_1gs', r'_1p76',
-    r'_c1$', r'_c2$', r'_c3$', r'_c4$', r'_k1$', r'_k2$', r'_k3$'
-]
-
 def is_junk_section(sec):
-    sec_l = sec.lower()
-    for pat in JUNK_PATTERNS:
-        if re.search(pat, sec_l):
-            return True
-    return False
+    # Scope/attachment/variant sections (scraper_rules.JUNK_PATTERNS), one combined regex.
+    return JUNK_SECTIONS.matches(sec.lower())
 
 def clean_num(s):
     res = re.findall(r"[-+]?\d*\.\d+|\d+", str(s))
     return float(res[0]) if res else None
 
 def get_weapon_class(sec, ammo, slot, d, registry):
-    id_l, ammo, kind = sec.lower(), str(ammo).lower(), str(d.get('kind', '')).lower()
-    
-    # SNIPER Check (Higher Priority)
-    sniper_keywords = ['sniper', 'vssk', 'svd', 'dvl', 'l96', 'm24', 'trg', 'm98', 'scout', 'remington', 'sr25', 'dmr']
-    is_sniper = any(x in id_l or x in kind for x in sniper_keywords)
-    
-    # Ammo-based logic
-    if any(x in ammo for x in ['12x70', '12x76', '23x75']): 
-        return "Shotgun"
-    
-    # Heavy calibers
-    if any(x in ammo for x in ['7.62x51', '7.62x54', '308', 'magnum_300', '338_lapua', '12.7x55']):
-        if is_sniper: return "Sniper/DMR"
-        if any(x in id_l for x in ['deagle', 'rex', 'mp412', 'desert_eagle']): return "Pistol"
-        if slot == 1: return "Sidearm Heavy"
-        return "Battle Rifle"
-    
-    if is_sniper: return "Sniper/DMR"
-    
-    # Slot 1 special handling (PDWs)
-    if slot == 1:
-        if any(x in id_l for x in ['p90', 'mp7', 'mp5k', 'aps']): return "SMG/PDW"
-        return "Pistol"
-    
-    # LMG Check
-    mag_size = clean_num(d.get('ammo_mag_size', 0))
-    if mag_size and mag_size > 60: return "LMG"
-    
-    # SMG Check
-    if any(x in id_l or x in kind for x in ['mp5', 'vityaz', 'ump', 'vector', 'pp2000', 'bizon', 'mp7', 'p90']): 
-        return "SMG"
-    
-    # Sniper check for smaller calibers (e.g. VSS)
-    if any(x in id_l or x in kind for x in ['vss', 'val', 'sr3', '7.62x39_sniper']): 
-        return "Sniper/DMR"
-    
-    return "Assault Rifle"
+    # Rules live in scraper_rules.classify_weapon, which also reports the deciding pattern.
+    return classify_weapon(sec, ammo, slot, d.get('kind', ''), clean_num(d.get('ammo_mag_size', 0)))[0]
+
+# --- FILESYSTEM INDEX ---
+# SCAN_PATHS, TEXT_PATHS and TEXTURE_PATHS mostly point into the same MO2 mod trees,
+# so they are walked once: a threaded os.scandir BFS over all roots (each directory is
+# visited once, however many roots contain it) records sub-directories plus the
+# .ltx/.xml/.dds files with mtime/size. The listing is kept in fs_index.pkl; a directory
+# whose mtime is unchanged reuses its listing instead of being re-read (its files are
+# still re-stat'ed, since editing a file does not touch the directory mtime).
+FS_INDEX_FILE = OUT_DIR / "fs_index.pkl"
+FS_INDEX_VERSION = 1
+FS_INDEX_EXTS = ('.ltx', '.xml', '.dds')
+FS_SKIP_DIRS = ('.git', '.svn')
+
+class FileIndex:
+    def __init__(self, dirs):
+        self.dirs = dirs  # dir path -> (mtime_ns, [subdir names], [(file name, mtime_ns, size)])
+        self._stamps = None
+
+    def walk(self, top):
+        """(dirpath, subdirs, file names) top-down like os.walk, names sorted."""
+        stack = [os.fspath(top)]
+        while stack:
+            path = stack.pop()
+            entry = self.dirs.get(path)
+            if entry is None: continue
+            _, subdirs, files = entry
+            yield path, subdirs, [f[0] for f in files]
+            stack.extend(os.path.join(path, d) for d in reversed(subdirs))
+
+    def stamp(self, path):
+        """(mtime_ns, size) recorded for an indexed file, or None."""
+        if self._stamps is None:
+            self._stamps = {
+                os.path.join(d, name): (mtime, size)
+                for d, (_, _, files) in self.dirs.items() for name, mtime, size in files
+            }
+        return self._stamps.get(path)
+
+    def file_count(self):
+        return sum(len(entry[2]) for entry in self.dirs.values())
+
+def scan_index_dir(path, cached):
+    """Returns ((mtime_ns, subdirs, files), reused) for one directory, or (None, False)."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None, False
+    if not stat.S_ISDIR(st.st_mode):
+        return None, False
+    reused = cached is not None and cached[0] == st.st_mtime_ns
+    if reused:
+        subdirs, names = cached[1], [f[0] for f in cached[2]]
+    else:
+        subdirs, names = [], []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        # Like os.walk(followlinks=False): symlinked dirs are not descended.
+                        if not entry.is_symlink() and entry.name.lower() not in FS_SKIP_DIRS:
+                            subdirs.append(entry.name)
+                    elif entry.name.lower().endswith(FS_INDEX_EXTS):
+                        names.append(entry.name)
+        except OSError:
+            return None, False
+        subdirs.sort()
+        names.sort()
+    files = []
+    for name in names:
+        try:
+            fst = os.stat(os.path.join(path, name))
+        except OSError:
+            continue
+        files.append((name, fst.st_mtime_ns, fst.st_size))
+    return (st.st_mtime_ns, subdirs, files), reused
+
+def load_file_index_cache(cache_file):
+    try:
+        with open(cache_file, "rb") as fh:
+            data = pickle.load(fh)
+        if data.get("version") == FS_INDEX_VERSION:
+            return data.get("dirs", {})
+    except Exception:
+        pass
+    return {}
+
+def save_file_index_cache(cache_file, dirs):
+    try:
+        tmp = str(cache_file) + ".tmp"
+        with open(tmp, "wb") as fh:
+            pickle.dump({"version": FS_INDEX_VERSION, "dirs": dirs}, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_file)
+    except Exception as e:
+        print(f"Could not write file index: {e}")
+
+def build_file_index(roots, jobs=1, cache_file=FS_INDEX_FILE):
+    cached = load_file_index_cache(cache_file) if cache_file else {}
+    dirs = {}
+    reused = 0
+    frontier = [os.fspath(r) for r in roots]
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while frontier:
+            batch = [p for p in dict.fromkeys(frontier) if p not in dirs]
+            frontier = []
+            for path, (entry, was_reused) in zip(batch, pool.map(lambda p: scan_index_dir(p, cached.get(p)), batch)):
+                if entry is None: continue
+                dirs[path] = entry
+                reused += was_reused
+                frontier.extend(os.path.join(path, d) for d in entry[1])
+    if cache_file:
+        save_file_index_cache(cache_file, dirs)
+    index = FileIndex(dirs)
+    if cache_file:
+        print(f"   File index: {len(dirs)} dirs ({reused} unchanged), {index.file_count()} files")
+    return index
+
+def collect_ltx_files(index=None):
+    index = index or build_file_index(SCAN_PATHS, cache_file=None)
+    all_files = []
+    for scan_path in SCAN_PATHS:
+        for root, dirs, files in index.walk(scan_path):
+            for f in files:
+                if f.endswith(".ltx"):
+                    all_files.append((root, f))
+
+    # Sort to roughly enforce numbered MO2 load order (e.g. 348- overrides 001-)
+    all_files.sort()
+    return all_files
 
-print("📂 Scanning weapon data...")
-registry = {}
+# --- LTX PARSING (cached per file) ---
+# Each file is reduced to its non-junk section fragments in file order:
+# [(section, parent, [(key, value), ...]), ...]. Fragments are cached on disk keyed
+# by path + mtime + size, so a re-scrape only re-parses files that changed and then
+# replays all fragments in load order to rebuild the registry.
+LTX_CACHE_FILE = OUT_DIR / "ltx_cache.pkl"
+LTX_CACHE_VERSION = 1
 
-all_files = []
-for scan_path in SCAN_PATHS:
-    if not scan_path.exists(): continue
-    for root, dirs, files in os.walk(scan_path):
-        dirs[:] = [d for d in dirs if d.lower() not in ('.git', '.svn')]
-        dirs[:] = [d for d in dirs if d.lower() not in ('.git', '.svn')]
-        for f in files:
-            if f.endswith(".ltx"):
-                all_files.append((root, f))
+def parse_ltx_file(path):
+    fragments = []
+    curr = None
+    with open(path, 'r', encoding='utf-8', errors='ignore') as l:
+        for line in l:
+            line = line.strip()
+            if not line or line.startswith(';') or line.startswith('#'): continue
 
-# Sort to roughly enforce numbered MO2 load order (e.g. 348- overrides 001-)
-all_files.sort()
+            # STALKER LTX syntax: [section]:parent or ![section] or [section]
+            if line.startswith('['):
+                # Extract section name inside brackets [...]
+                end_bracket_idx = line.find(']')
+                if end_bracket_idx == -1: continue
 
-# Reconstruct original loops logic
-import tqdm
-for root, f in tqdm.tqdm(all_files, desc="Parsing LTX files", leave=False):
-    scan_path = root
+                sec = line[1:end_bracket_idx].strip(' !@')
+                parent = None
 
+                # Find optional parent after closing bracket
+                remainder = line[end_bracket_idx+1:].strip()
+                if remainder.startswith(':'):
+                    parent = remainder[1:].strip().split(',')[0].strip()  # first parent base only
+
+                # FILTER: skip if section ends with known scope/attachment/variant suffix
+                if is_junk_section(sec):
+                    curr = None; continue
+
+                curr = (sec, parent, [])
+                fragments.append(curr)
+                continue
+
+            if curr and '=' in line and not line.startswith('['):
+                parts = line.split('=', 1)
+                key = parts[0].strip().lower()
+                val = parts[1].split(';')[0].strip().strip('"')
+                curr[2].append((key, val))
+    return fragments
+
+def merge_ltx_fragments(registry, fragments, mod_name, root):
+    for sec, parent, items in fragments:
+        if sec not in registry:
+            registry[sec] = {'id': sec, 'mod': mod_name, 'parent': parent, 'root': root}
+
+        if parent:
+            registry[sec]['parent'] = parent
+
+        entry = registry[sec]
+        for key, val in items:
+            entry[key] = val
+
+def ltx_cache_rules_key():
+    # Fragments depend on the junk filter, so rule edits invalidate the cache.
+    return (LTX_CACHE_VERSION, tuple(JUNK_PATTERNS))
+
+def load_ltx_cache():
+    try:
+        with open(LTX_CACHE_FILE, 'rb') as fh:
+            data = pickle.load(fh)
+        if data.get('rules') == ltx_cache_rules_key():
+            return data.get('files', {})
+    except Exception:
+        pass
+    return {}
+
+def save_ltx_cache(files):
+    tmp_file = LTX_CACHE_FILE.with_suffix('.tmp')
+    try:
+        with open(tmp_file, 'wb') as fh:
+            pickle.dump({'rules': ltx_cache_rules_key(), 'files': files}, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, LTX_CACHE_FILE)
+    except Exception as e:
+        print(f"⚠️ Could not write LTX cache: {e}")
+
+def ltx_mod_name(root):
+    # Returns None for files sitting directly in the MO2 mods folder (not part of a mod).
     p_parts = Path(root).parts
-    mod_name = "Vanilla"
     if "mods" in p_parts:
         m_idx = p_parts.index("mods")
-        if len(p_parts) > m_idx + 1: mod_name = p_parts[m_idx + 1]
-        else: continue
-    
+        if len(p_parts) > m_idx + 1: return p_parts[m_idx + 1]
+        return None
+    return "Vanilla"
+
+# --- PARALLEL PARSING ---
+# Files parse independently, so cache misses are fanned out over a process pool.
+# Only the merge depends on load order: pool.map hands results back in submission
+# order and fragments are replayed in the sorted all_files order, so the registry
+# is identical to a serial run. Small batches stay in-process (pool start-up costs more).
+LTX_PARALLEL_MIN_FILES = 64
+
+def parse_ltx_job(path):
+    # Worker entry point; an unreadable file contributes nothing (None), like the serial loop.
     try:
-        with open(os.path.join(root, f), 'r', encoding='utf-8', errors='ignore') as l:
-                        curr = None
-                        for line in l:
-                            line = line.strip()
-                            if not line or line.startswith(';') or line.startswith('#'): continue
-                            
-                            # STALKER LTX syntax: [section]:parent or ![section] or [section]
-                            if line.startswith('['):
-                                # Extract section name inside brackets [...]
-                                end_bracket_idx = line.find(']')
-                                if end_bracket_idx == -1: continue
-                                
-                                sec = line[1:end_bracket_idx].strip(' !@')
-                                parent = None
-                                
-                                # Find optional parent after closing bracket
-                                remainder = line[end_bracket_idx+1:].strip()
-                                if remainder.startswith(':'):
-                                    parent = remainder[1:].strip().split(',')[0].strip()  # first parent base only
-                                
-                                # FILTER: skip if section ends with known scope/attachment/variant suffix
-                                if is_junk_section(sec):
-                                    curr = None; continue
-                                
-                                if sec not in registry: 
-                                    registry[sec] = {'id': sec, 'mod': mod_name, 'parent': parent, 'root': root}
-                                
-                                if parent: 
-                                    registry[sec]['parent'] = parent
-                                
-                                curr = sec
-                                continue
-                            
-                            if curr and '=' in line and not line.startswith('['):
-                                parts = line.split('=', 1)
-                                key = parts[0].strip().lower()
-                                val = parts[1].split(';')[0].strip().strip('"')
-                                registry[curr][key] = val
-    except: continue
-
-def get_v(sec, key, db, d=0):
-    if d > 10 or not sec or sec not in db: return None
-    if key in db[sec]: return db[sec][key]
-    return get_v(db[sec].get('parent'), key, db, d+1)
-
-final = []
-# First identify "real" weapons (have gameplay stats or inherit from valid weapon bases)
-for sec, d in tqdm.tqdm(registry.items()):
-    if not sec.startswith("wpn_") or "_hud" in sec: continue
+        return parse_ltx_file(path)
+    except Exception:
+        return None
+
+def parse_ltx_files(paths, jobs):
+    progress = dict(total=len(paths), desc="Parsing LTX files", leave=False)
+    if jobs > 1 and len(paths) >= LTX_PARALLEL_MIN_FILES:
+        chunksize = max(1, min(64, len(paths) // (jobs * 8)))
+        try:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                return list(tqdm.tqdm(pool.map(parse_ltx_job, paths, chunksize=chunksize), **progress))
+        except Exception as e:
+            print(f"⚠️ Parallel LTX parsing unavailable ({e}); parsing serially.")
+    return [parse_ltx_job(p) for p in tqdm.tqdm(paths, **progress)]
+
+def build_registry(all_files, jobs=1, index=None):
+    registry = {}
+    ltx_cache = load_ltx_cache()
+
+    # Pass 1: stat files in load order, reuse cached fragments, queue the rest for parsing.
+    plan = []
+    pending = []
+    cache_hits = 0
+    for root, f in all_files:
+        mod_name = ltx_mod_name(root)
+        if mod_name is None: continue
+
+        path = os.path.join(root, f)
+        stamp = index.stamp(path) if index is not None else None
+        if stamp is None:
+            try:
+                st = os.stat(path)
+            except Exception: continue
+            stamp = (st.st_mtime_ns, st.st_size)
+        cached = ltx_cache.get(path)
+        if cached and cached[0] == stamp:
+            plan.append([root, mod_name, path, stamp, cached[1]])
+            cache_hits += 1
+        else:
+            plan.append([root, mod_name, path, stamp, None])
+            pending.append(len(plan) - 1)
+
+    parsed = parse_ltx_files([plan[i][2] for i in pending], jobs)
+    for i, fragments in zip(pending, parsed):
+        plan[i][4] = fragments
+
+    # Pass 2: merge strictly in load order.
+    new_ltx_cache = {}
+    for root, mod_name, path, stamp, fragments in plan:
+        if fragments is None: continue
+        new_ltx_cache[path] = (stamp, fragments)
+        merge_ltx_fragments(registry, fragments, mod_name, root)
+
+    save_ltx_cache(new_ltx_cache)
+    print(f"   LTX cache: {cache_hits} cached, {len(new_ltx_cache) - cache_hits} parsed")
+    return registry
+
+# --- INHERITANCE RESOLUTION ---
+# A section's effective keys are its own entry layered over its parent chain.
+# Each section is flattened once (iteratively, top-down) and memoized, so shared
+# bases like wpn_ak74 are merged a single time no matter how many children they have.
+# Chains stop at a missing parent or at the first section that repeats (a cycle);
+# both are recorded for the report instead of being cut off silently.
+class SectionResolver:
+    def __init__(self, registry):
+        self.registry = registry
+        self.flat = {}
+        self.missing_parents = {}  # section -> parent name that isn't in the registry
+        self.cyclic = set()        # sections that are part of a parent cycle
+
+    def resolve(self, sec):
+        if sec in self.flat: return self.flat[sec]
+        if sec not in self.registry: return {}
+
+        chain, seen = [], {}
+        base, cycle_at = {}, None
+        cur = sec
+        while cur:
+            if cur in self.flat:
+                base = self.flat[cur]; break
+            if cur in seen:
+                cycle_at = seen[cur]; break
+            if cur not in self.registry:
+                self.missing_parents[chain[-1]] = cur; break
+            seen[cur] = len(chain)
+            chain.append(cur)
+            cur = self.registry[cur].get('parent')
+
+        if cycle_at is not None:
+            # Every cycle member sees the rest of the loop as its ancestors, in its own order.
+            cycle = chain[cycle_at:]
+            self.cyclic.update(cycle)
+            for i, member in enumerate(cycle):
+                merged = {}
+                for s in reversed(cycle[i:] + cycle[:i]):
+                    merged.update(self.registry[s])
+                self.flat[member] = merged
+            base = self.flat[cycle[0]]
+            chain = chain[:cycle_at]
+
+        for s in reversed(chain):
+            merged = dict(base)
+            merged.update(self.registry[s])
+            self.flat[s] = base = merged
+        return self.flat[sec]
+
+    def report(self, limit=5):
+        if self.missing_parents:
+            junk = sum(1 for parent in self.missing_parents.values() if is_junk_section(parent))
+            print(f"   ⚠️ {len(self.missing_parents)} sections inherit from a missing parent ({junk} dropped by the junk filter):")
+            for sec, parent in sorted(self.missing_parents.items())[:limit]:
+                print(f"      {sec} -> {parent}")
+        if self.cyclic:
+            print(f"   ⚠️ {len(self.cyclic)} sections are part of a parent cycle:")
+            for sec in sorted(self.cyclic)[:limit]:
+                print(f"      {sec} -> {self.registry[sec].get('parent')}")
+
+# --- Derivative Stripping (wpn_xxx_yyy -> wpn_xxx) ---
+# Group weapons by their base model name and only keep the "original" one
+# to eliminate scope-derived and NV-derived duplicates.
+get_base_id_and_originality = base_id_and_originality
+
+def resolve_weapons(registry, index=None):
+    """Rows for every section that resolves to a real weapon, names translated; 'class' is left to classify_weapons."""
+    final = []
+    resolver = SectionResolver(registry)
+    # First identify "real" weapons (have gameplay stats or inherit from valid weapon bases)
+    for sec, d in tqdm.tqdm(registry.items()):
+        if not sec.startswith("wpn_") or "_hud" in sec: continue
     
-    # DLTX: ignore scope/attachment/variant sections
-    if is_junk_section(sec): continue
+        # DLTX: ignore scope/attachment/variant sections
+        if is_junk_section(sec): continue
     
-    # NEW: Skip derivative variants (names with suffixes like _n, _cw, or containing scope IDs)
-    # Exceptions for specialized variants that are unique/top-tier
-    special_variants = ['_kit', '_mono', '_custom', '_isg', '_nimble', '_alfa', '_tactical']
+        # NEW: Skip derivative variants (names with suffixes like _n, _cw, or containing scope IDs)
+        # Exceptions for specialized variants (scraper_rules.SPECIAL_VARIANTS) are unique/top-tier
     
-    # Identify derivative variants by looking for weapon IDs that contain a base weapon ID 
-    # plus an additional suffix (e.g., wpn_abakan_n vs wpn_abakan)
-    # We apply this logic to the FINAL DataFrame instead to catch cross-file variants
+        # Identify derivative variants by looking for weapon IDs that contain a base weapon ID 
+        # plus an additional suffix (e.g., wpn_abakan_n vs wpn_abakan)
+        # We apply this logic to the FINAL DataFrame instead to catch cross-file variants
     
-    hit = clean_num(get_v(sec, 'hit_power', registry))
-    rpm = clean_num(get_v(sec, 'rpm', registry))
-    gx = clean_num(get_v(sec, 'inv_grid_x', registry))
+        v = resolver.resolve(sec)
+        hit = clean_num(v.get('hit_power'))
+        rpm = clean_num(v.get('rpm'))
+        gx = clean_num(v.get('inv_grid_x'))
     
-    if hit and gx is not None:
-        slot = int(clean_num(get_v(sec, 'slot', registry)) or 2)
-        ammo = str(get_v(sec, 'ammo_class', registry) or 'unknown').split(',')[0].replace('ammo_', '')
+        if hit and gx is not None:
+            slot = int(clean_num(v.get('slot')) or 2)
+            ammo = str(v.get('ammo_class') or 'unknown').split(',')[0].replace('ammo_', '')
         
-        # Resolve display name from localization
-        inv_name_id = get_v(sec, 'inv_name', registry) or get_v(sec, 'inv_name_short', registry)
-        real_name = translate(inv_name_id) or sec.replace('wpn_', '').replace('_', ' ').upper()
-
-        # Icon Metadata
-        gy = clean_num(get_v(sec, 'inv_grid_y', registry)) or 0
-        gw = clean_num(get_v(sec, 'inv_grid_width', registry)) or 1
-        gh = clean_num(get_v(sec, 'inv_grid_height', registry)) or 1
-        tex = get_v(sec, 'icons_texture', registry) or "ui\\ui_icon_equipment"
+            # Display name is resolved from localization once all weapons are known
+            inv_name_id = v.get('inv_name') or v.get('inv_name_short')
+
+            # Icon Metadata
+            gy = clean_num(v.get('inv_grid_y')) or 0
+            gw = clean_num(v.get('inv_grid_width')) or 1
+            gh = clean_num(v.get('inv_grid_height')) or 1
+            tex = v.get('icons_texture') or "ui\\ui_icon_equipment"
         
-        final.append({
-            'id': sec, 'real_name': real_name, 'hit': hit, 'rpm': rpm, 'slot': slot,
-            'acc': clean_num(get_v(sec, 'fire_dispersion_base', registry)) or 0.5,
-            'rec': clean_num(get_v(sec, 'cam_dispersion', registry)) or 1.0,
-            'rec_inc': clean_num(get_v(sec, 'cam_dispersion_inc', registry)) or 0.1,
-            'rec_hor': clean_num(get_v(sec, 'cam_step_angle_horz', registry)) or 0.5,
-            'mag': int(clean_num(get_v(sec, 'ammo_mag_size', registry)) or 30),
-            'handling': clean_num(get_v(sec, 'control_inertion_factor', registry)) or 1.0,
-            'ammo': ammo,
-            'mod': d['mod'], 
-            'class': get_weapon_class(sec, ammo, slot, d, registry),
-            'gx': gx, 'gy': gy, 'gw': gw, 'gh': gh, 'tex': tex
-        })
-
-df_final = pd.DataFrame(final).drop_duplicates('id')
-
-# --- Deduplicate variants (e.g., wpn_abakan vs wpn_abakan_n) ---
-# We keep only one variant per 'real_name' + primary stats combination
-# to prevent the locker from filling up with functional duplicates.
-df_final['stat_hash'] = df_final.apply(
-    lambda r: f"{r['real_name']}_{r['hit']}_{r['rpm']}_{r['rec']}_{r['mag']}", axis=1
-)
-df_final = df_final.drop_duplicates('stat_hash').drop(columns=['stat_hash'])
+            final.append({
+                'id': sec, 'real_name': inv_name_id, 'hit': hit, 'rpm': rpm, 'slot': slot,
+                'acc': clean_num(v.get('fire_dispersion_base')) or 0.5,
+                'rec': clean_num(v.get('cam_dispersion')) or 1.0,
+                'rec_inc': clean_num(v.get('cam_dispersion_inc')) or 0.1,
+                'rec_hor': clean_num(v.get('cam_step_angle_horz')) or 0.5,
+                'mag': int(clean_num(v.get('ammo_mag_size')) or 30),
+                'handling': clean_num(v.get('control_inertion_factor')) or 1.0,
+                'ammo': ammo,
+                'mod': d['mod'], 
+                'class': None,
+                'gx': gx, 'gy': gy, 'gw': gw, 'gh': gh, 'tex': tex
+            })
 
-# --- Derivative Stripping (wpn_xxx_yyy -> wpn_xxx) ---
-# Group weapons by their base model name and only keep the "original" one
-# to eliminate scope-derived and NV-derived duplicates.
-def get_base_id_and_originality(wid):
-    wid_l = wid.lower()
-    # Specialized variants to preserve even if base ID exists
-    special = ['_kit', '_mono', '_custom', '_isg', '_nimble', '_alfa', '_tactical']
-    if any(s in wid_l for s in special):
-        return wid, 0 # Give highest priority (0) to special variants
-    
-    parts = wid_l.split('_')
-    # If it's wpn_xxx_yyy, 'wpn_xxx' is likely the base model name
-    if len(parts) > 2:
-        return "_".join(parts[:2]), 1 # Priority 1 for suspected variants
-    return wid_l, 0 # Priority 0 for likely base weapons
+    resolver.report()
+    resolve_translations((row['real_name'] for row in final), index)
+    for row in final:
+        row['real_name'] = translate(row['real_name']) or row['id'].replace('wpn_', '').replace('_', ' ').upper()
+    return final
+
+def classify_weapons(rows, registry):
+    return [{**row, 'class': get_weapon_class(row['id'], row['ammo'], row['slot'], registry[row['id']], registry)}
+            for row in rows]
+
+def dedupe_weapons(rows):
+    df_final = pd.DataFrame(rows).drop_duplicates('id')
+
+    # --- Deduplicate variants (e.g., wpn_abakan vs wpn_abakan_n) ---
+    # We keep only one variant per 'real_name' + primary stats combination
+    # to prevent the locker from filling up with functional duplicates.
+    df_final['stat_hash'] = df_final.apply(
+        lambda r: f"{r['real_name']}_{r['hit']}_{r['rpm']}_{r['rec']}_{r['mag']}", axis=1
+    )
+    df_final = df_final.drop_duplicates('stat_hash').drop(columns=['stat_hash'])
 
-df_final['base_id_group'], df_final['prio'] = zip(*df_final['id'].map(get_base_id_and_originality))
+    # Derivative stripping: keep the "original" of each base model group.
+    df_final['base_id_group'], df_final['prio'] = zip(*df_final['id'].map(get_base_id_and_originality))
 
-# Within each base group and real_name, keep the one with the highest priority (lowest prio number)
-# and shortest ID (the true root weapon)
-df_final = df_final.sort_values(by=['prio', 'id'], key=lambda x: x if x.name != 'id' else x.str.len())
-df_final = df_final.drop_duplicates(subset=['base_id_group', 'real_name'], keep='first').drop(columns=['base_id_group', 'prio'])
+    # Within each base group and real_name, keep the one with the highest priority (lowest prio number)
+    # and shortest ID (the true root weapon)
+    df_final = df_final.sort_values(by=['prio', 'id'], key=lambda x: x if x.name != 'id' else x.str.len())
+    df_final = df_final.drop_duplicates(subset=['base_id_group', 'real_name'], keep='first').drop(columns=['base_id_group', 'prio'])
+    return df_final
+
+def build_weapon_table(registry, index=None):
+    return dedupe_weapons(classify_weapons(resolve_weapons(registry, index), registry))
 
-df_final.to_csv(OUT_DIR / "weapons_stats.csv", index=False)
-# Redundant print removed
 # --- ICON EXTRACTION ---
-print("🖼️ Searching textures for icons...")
-import subprocess
-from PIL import Image
 
 def texture_priority(path_str):
     p = path_str.replace('\\', '/').lower()
@@ -327,107 +638,394 @@ def apply_icon_fixes(icon_img, weapon_id, cell_size):
         return icon_img.crop((0, 0, cell_size, cell_size))
     return icon_img
 
-tex_candidates = {}
-for start_p in TEXTURE_PATHS:
-    if not start_p.exists():
-        continue
-    for root, _, files in os.walk(start_p):
-        for f in files:
-            if not f.lower().endswith(".dds"):
-                continue
-            f_path = os.path.join(root, f)
-            name = Path(f).stem.lower()
-            tex_candidates.setdefault(name, []).append(f_path)
+# --- DDS DECODING ---
+# Atlases are decoded in-process with Pillow's DDS plugin (DXT1/3/5, BC4-7, uncompressed);
+# anything it rejects is piped through ImageMagick (`convert <dds> png:-`), so no temp
+# files are written. Each texture is decoded and cut by a thread-pool job, and only one
+# atlas per worker is held in memory at a time.
+ICON_DIR = OUT_DIR / "icons"
+ICON_CELL_SIZE = 50  # STALKER inventory grid uses 50 px per cell for inv_grid_* coordinates.
+ICON_MAX_WORKERS = 8
+ICON_TIMINGS_FILE = OUT_DIR / "icon_timings.csv"
 
-tex_map = {}
-for name, candidates in tex_candidates.items():
-    tex_map[name] = max(candidates, key=texture_priority)
+# --- ICON MANIFEST ---
+# icons/manifest.json records the inputs each tracked icon was cut from (texture path,
+# mtime, size, grid rect, decoder, fix rules). Icons whose inputs are unchanged are kept
+# as-is, so only textures with at least one changed icon get decoded. Bump
+# ICON_FIX_VERSION whenever cut_icon()/apply_icon_fixes() change their output.
+ICON_MANIFEST_FILE = ICON_DIR / icon_store.ICON_MANIFEST_NAME
+ICON_MANIFEST_VERSION = 1
+ICON_FIX_VERSION = 1
 
-ICON_DIR = OUT_DIR / "icons"
-os.makedirs(ICON_DIR, exist_ok=True)
+def decode_texture(path, decoder="auto"):
+    if decoder != "magick":
+        try:
+            with Image.open(path) as im:
+                return im.convert("RGBA"), "pillow"
+        except Exception:
+            pass
+    try:
+        proc = subprocess.run(["convert", path, "png:-"], capture_output=True)
+        if proc.stdout:
+            with Image.open(io.BytesIO(proc.stdout)) as im:
+                return im.convert("RGBA"), "magick"
+    except Exception:
+        pass
+    return None, "failed"
 
-print(f"✂️ Extracting {len(df_final)} icons...")
-converted_cache = {}
+def cut_icon(img, r, cell_size=ICON_CELL_SIZE):
+    x = int(r['gx'] * cell_size)
+    y = int(r['gy'] * cell_size)
+    w = int(r['gw'] * cell_size)
+    h = int(r['gh'] * cell_size)
 
-for _, r in tqdm.tqdm(df_final.iterrows(), total=len(df_final)):
-    tex_key = r['tex'].split('\\')[-1].lower()
-    if tex_key not in tex_map: continue
-    
-    target_icon = ICON_DIR / f"{r['id']}.png"
-    # Remove old icons to avoid stale outputs from previous extraction logic
-    if target_icon.exists(): target_icon.unlink() 
-    
-    if tex_key not in converted_cache:
-        tmp_png = OUT_DIR / f"tmp_{tex_key}.png"
-        # Use ImageMagick to convert DDS to temporary PNG
-        subprocess.run(["convert", tex_map[tex_key], str(tmp_png)], capture_output=True)
-        if tmp_png.exists():
+    # FIX: Some mods override the atlas texture with a small standalone sprite but forget to zero the original grid coords
+    if x >= img.width or y >= img.height:
+        # Standalone texture fallback - Mod changed texture to a dedicated file but left old grid coords.
+        # Crop it perfectly to its valid alpha bounding box.
+        bbox = img.getbbox()
+        if bbox:
+            icon_cropped = False
+            # SPECIAL FIX: Firebreath SPAS-12 texture has two models one above another.
+            if 'spas12' in r['id'] and bbox[3] > img.height * 0.4:
+                icon = img.crop((0, 0, img.width, img.height // 2))
+                bbox2 = icon.getbbox()
+                if bbox2:
+                    icon = icon.crop(bbox2)
+                icon_cropped = True
+            # SPECIAL FIX: MP7 has two models side-by-side
+            elif 'mp7' in r['id'] and (bbox[2] - bbox[0]) > 200:
+                icon = img.crop((bbox[0], bbox[1], bbox[0] + (bbox[2] - bbox[0]) // 2, bbox[3]))
+                bbox2 = icon.getbbox()
+                if bbox2:
+                    icon = icon.crop(bbox2)
+                icon_cropped = True
+
+            if not icon_cropped:
+                icon = img.crop(bbox)
+
+            # Fit the extracted icon into the expected game-grid boundaries (w, h) so it isn't cropped by UI
+            if icon.width > w or icon.height > h:
+                icon.thumbnail((w, h), Image.Resampling.LANCZOS)
+            elif icon.width < w * 0.5 and icon.height < h * 0.5:
+                # Upscale if it's very small
+                scale = min(w / icon.width, h / icon.height)
+                icon = icon.resize((int(icon.width * scale), int(icon.height * scale)), Image.Resampling.LANCZOS)
+
+            bg = Image.new('RGBA', (w, h), (0,0,0,0))
+            bg.paste(icon, ((w - icon.width) // 2, (h - icon.height) // 2))
+            icon = bg
+        else:
+            icon = img.crop((0, 0, w, h))
+        return apply_icon_fixes(icon, r['id'], cell_size)
+
+    icon = img.crop((x, y, x + w, y + h))
+    return apply_icon_fixes(icon, r['id'], cell_size)
+
+def extract_texture_icons(tex_path, rows, decoder="auto"):
+    started = time.perf_counter()
+    img, method = decode_texture(tex_path, decoder)
+    decoded = time.perf_counter()
+    written = []
+    if img is not None:
+        for r in rows:
             try:
-                converted_cache[tex_key] = Image.open(tmp_png).convert("RGBA")
-                tmp_png.unlink()
-            except: continue
-    
-    if tex_key in converted_cache:
-        img = converted_cache[tex_key]
-        # STALKER inventory grid uses 50 px per cell for inv_grid_* coordinates.
-        cell_size = 50
-        x = int(r['gx'] * cell_size)
-        y = int(r['gy'] * cell_size)
-        
-        # FIX: Some mods override the atlas texture with a small standalone sprite but forget to zero the original grid coords
-        if x >= img.width or y >= img.height:
-            # Standalone texture fallback - Mod changed texture to a dedicated file but left old grid coords.
-            # Crop it perfectly to its valid alpha bounding box.
-            bbox = img.getbbox()
-            w = int(r['gw'] * cell_size)
-            h = int(r['gh'] * cell_size)
-            
-            if bbox:
-                icon_cropped = False
-                # SPECIAL FIX: Firebreath SPAS-12 texture has two models one above another.
-                if 'spas12' in r['id'] and bbox[3] > img.height * 0.4:
-                    icon = img.crop((0, 0, img.width, img.height // 2))
-                    bbox2 = icon.getbbox()
-                    if bbox2:
-                        icon = icon.crop(bbox2)
-                    icon_cropped = True
-                # SPECIAL FIX: MP7 has two models side-by-side
-                elif 'mp7' in r['id'] and (bbox[2] - bbox[0]) > 200:
-                    icon = img.crop((bbox[0], bbox[1], bbox[0] + (bbox[2] - bbox[0]) // 2, bbox[3]))
-                    bbox2 = icon.getbbox()
-                    if bbox2:
-                        icon = icon.crop(bbox2)
-                    icon_cropped = True
-                
-                if not icon_cropped:
-                    icon = img.crop(bbox)
-                
-                # Fit the extracted icon into the expected game-grid boundaries (w, h) so it isn't cropped by UI
-                if icon.width > w or icon.height > h:
-                    icon.thumbnail((w, h), Image.Resampling.LANCZOS)
-                elif icon.width < w * 0.5 and icon.height < h * 0.5:
-                    # Upscale if it's very small
-                    scale = min(w / icon.width, h / icon.height)
-                    icon = icon.resize((int(icon.width * scale), int(icon.height * scale)), Image.Resampling.LANCZOS)
-                
-                bg = Image.new('RGBA', (w, h), (0,0,0,0))
-                bg.paste(icon, ((w - icon.width) // 2, (h - icon.height) // 2))
-                icon = bg
-            else:
-                icon = img.crop((0, 0, w, h))
-            
-            icon = apply_icon_fixes(icon, r['id'], cell_size)
-            icon.save(target_icon)
+                cut_icon(img, r).save(ICON_DIR / f"{r['id']}.png")
+                written.append(r['id'])
+            except Exception: pass
+    timing = {
+        'texture': tex_path, 'method': method, 'icons': len(written), 'requested': len(rows),
+        'decode_s': round(decoded - started, 4), 'crop_s': round(time.perf_counter() - decoded, 4),
+    }
+    return timing, written
+
+def load_icon_manifest():
+    try:
+        with open(ICON_MANIFEST_FILE, 'r', encoding='utf-8') as fh:
+            data = json.load(fh)
+        if data.get('version') == ICON_MANIFEST_VERSION:
+            return data.get('icons', {})
+    except Exception:
+        pass
+    return {}
+
+def save_icon_manifest(icons):
+    tmp_file = ICON_MANIFEST_FILE.with_suffix('.tmp')
+    try:
+        with open(tmp_file, 'w', encoding='utf-8') as fh:
+            json.dump({'version': ICON_MANIFEST_VERSION, 'icons': icons}, fh, indent=1, sort_keys=True)
+        os.replace(tmp_file, ICON_MANIFEST_FILE)
+    except Exception as e:
+        print(f"⚠️ Could not write icon manifest: {e}")
+
+def icon_inputs(r, tex_path, tex_stat, decoder):
+    return {
+        'texture': tex_path, 'mtime_ns': tex_stat.st_mtime_ns, 'size': tex_stat.st_size,
+        'gx': float(r['gx']), 'gy': float(r['gy']), 'gw': float(r['gw']), 'gh': float(r['gh']),
+        'decoder': decoder, 'fixes': ICON_FIX_VERSION,
+    }
+
+def report_icon_timings(timings, limit=5):
+    if not timings: return
+    df_t = pd.DataFrame(timings).sort_values('decode_s', ascending=False)
+    try:
+        df_t.to_csv(ICON_TIMINGS_FILE, index=False)
+    except Exception as e:
+        print(f"⚠️ Could not write icon timings: {e}")
+    methods = df_t['method'].value_counts().to_dict()
+    print(f"   Textures: {len(df_t)} ({', '.join(f'{k}: {v}' for k, v in sorted(methods.items()))}), "
+          f"decode {df_t['decode_s'].sum():.2f}s, crop {df_t['crop_s'].sum():.2f}s")
+    for t in df_t.head(limit).itertuples():
+        print(f"      {t.decode_s:7.3f}s  {t.method:<7} {t.icons}/{t.requested} icons  {Path(t.texture).name}")
+
+def extract_icons(df_final, jobs=1, decoder="auto", rebuild=False, index=None):
+    print("🖼️ Searching textures for icons...")
+    index = index or build_file_index(TEXTURE_PATHS, cache_file=None)
+    tex_candidates = {}
+    for start_p in TEXTURE_PATHS:
+        for root, _, files in index.walk(start_p):
+            for f in files:
+                if not f.lower().endswith(".dds"):
+                    continue
+                f_path = os.path.join(root, f)
+                name = Path(f).stem.lower()
+                tex_candidates.setdefault(name, []).append(f_path)
+
+    tex_map = {}
+    for name, candidates in tex_candidates.items():
+        tex_map[name] = max(candidates, key=texture_priority)
+
+    os.makedirs(ICON_DIR, exist_ok=True)
+
+    print(f"✂️ Extracting {len(df_final)} icons...")
+    # Always read the old manifest: --rebuild-icons only skips the "already up to date"
+    # check below; the manifest still names the icons to clean up as orphans.
+    manifest = load_icon_manifest()
+    new_manifest = {}
+    tex_stats = {}
+    rows_by_tex = {}
+    pending_inputs = {}
+    for r in df_final.to_dict('records'):
+        tex_key = r['tex'].split('\\')[-1].lower()
+        if tex_key not in tex_map: continue
+
+        tex_path = tex_map[tex_key]
+        if tex_path not in tex_stats:
+            try:
+                tex_stats[tex_path] = os.stat(tex_path)
+            except OSError:
+                tex_stats[tex_path] = None
+        if tex_stats[tex_path] is None: continue
+
+        inputs = icon_inputs(r, tex_path, tex_stats[tex_path], decoder)
+        target_icon = ICON_DIR / f"{r['id']}.png"
+        if not rebuild and manifest.get(r['id']) == inputs and target_icon.exists():
+            new_manifest[r['id']] = inputs
             continue
 
-            
-        w = int(r['gw'] * cell_size)
-        h = int(r['gh'] * cell_size)
+        # Inputs changed (or untracked): drop the old icon so a failed re-cut can't leave a stale one.
+        if target_icon.exists(): target_icon.unlink()
+        pending_inputs[r['id']] = inputs
+        rows_by_tex.setdefault(tex_key, []).append(r)
 
+    # Orphans: icons we produced earlier for weapons that are gone or lost their texture.
+    orphans = [w_id for w_id in manifest if w_id not in new_manifest and w_id not in pending_inputs]
+    for w_id in orphans:
         try:
-            icon = img.crop((x, y, x + w, y + h))
-            icon = apply_icon_fixes(icon, r['id'], cell_size)
-            icon.save(target_icon)
-        except: pass
+            (ICON_DIR / f"{w_id}.png").unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"⚠️ Could not remove orphan icon {w_id}: {e}")
+
+    unchanged = len(new_manifest)
+    timings = []
+    workers = max(1, min(jobs, ICON_MAX_WORKERS, len(rows_by_tex)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(extract_texture_icons, tex_map[k], rows, decoder) for k, rows in rows_by_tex.items()]
+        for fut in tqdm.tqdm(as_completed(futures), total=len(futures), desc="Decoding textures", leave=False):
+            timing, written = fut.result()
+            timings.append(timing)
+            for w_id in written:
+                new_manifest[w_id] = pending_inputs[w_id]
+
+    # Unchanged manifest -> keep its mtime, so the app's icon atlas stays valid.
+    if new_manifest != manifest or not ICON_MANIFEST_FILE.exists():
+        save_icon_manifest(new_manifest)
+    print(f"   Icons: {unchanged} unchanged, {len(new_manifest) - unchanged} extracted, "
+          f"{len(pending_inputs) - (len(new_manifest) - unchanged)} failed, {len(orphans)} orphans removed")
+    report_icon_timings(timings)
+
+    # Bake the colour-corrected icons into the packed atlas the app serves from.
+    atlas = icon_store.load_icon_store(ICON_DIR, OUT_DIR)
+    print(f"   Icon atlas: {len(atlas)} icons")
+
+# --- PIPELINE ---
+# discover -> parse -> resolve -> classify -> dedupe -> stats -> icons. Each stage up to
+# dedupe pickles its output under scrape_checkpoints/, so a later stage can be re-run alone
+# (`--only icons` while tuning icon fixes) without re-parsing any LTX. stats and icons
+# write their real outputs (weapons_stats.csv, icons/) instead.
+STAGES = ("discover", "parse", "resolve", "classify", "dedupe", "stats", "icons")
+STAGE_INPUTS = {
+    "discover": (), "parse": ("discover",), "resolve": ("parse",), "classify": ("resolve", "parse"),
+    "dedupe": ("classify",), "stats": ("dedupe",), "icons": ("dedupe",),
+}
+CHECKPOINT_DIR = OUT_DIR / "scrape_checkpoints"
+CHECKPOINT_VERSION = 1
+
+def checkpoint_path(stage, checkpoint_dir=CHECKPOINT_DIR):
+    return Path(checkpoint_dir) / f"{stage}.pkl"
+
+def read_checkpoint_header(path):
+    # The header is pickled ahead of the data, so checking a checkpoint doesn't load it.
+    try:
+        with open(path, "rb") as fh:
+            header = pickle.load(fh)
+        if isinstance(header, dict) and header.get("version") == CHECKPOINT_VERSION:
+            return header
+    except Exception:
+        pass
+    return None
+
+def load_checkpoint(path):
+    try:
+        with open(path, "rb") as fh:
+            header = pickle.load(fh)
+            if isinstance(header, dict) and header.get("version") == CHECKPOINT_VERSION:
+                return pickle.load(fh)
+    except Exception:
+        pass
+    return None
+
+def save_checkpoint(path, stage, data):
+    try:
+        os.makedirs(path.parent, exist_ok=True)
+        tmp = str(path) + ".tmp"
+        with open(tmp, "wb") as fh:
+            pickle.dump({"version": CHECKPOINT_VERSION, "stage": stage, "created": time.time()}, fh)
+            pickle.dump(data, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"Could not write {stage} checkpoint: {e}")
+
+def available_checkpoints(checkpoint_dir=CHECKPOINT_DIR):
+    return {s for s in STAGES if read_checkpoint_header(checkpoint_path(s, checkpoint_dir)) is not None}
+
+def plan_stages(stages, available):
+    """The requested stages plus any upstream stage whose checkpoint is missing, in pipeline order."""
+    wanted = set(stages)
+    todo = list(wanted)
+    while todo:
+        for dep in STAGE_INPUTS[todo.pop()]:
+            if dep not in wanted and dep not in available:
+                wanted.add(dep)
+                todo.append(dep)
+    return [s for s in STAGES if s in wanted]
+
+class ScrapeRun:
+    """State shared by the stages of one scraper invocation."""
+
+    def __init__(self, args, checkpoint_dir=CHECKPOINT_DIR):
+        self.args = args
+        self.jobs = max(1, args.jobs)
+        self.checkpoint_dir = Path(checkpoint_dir)
+        self.outputs = {}
+        self._index = None
+
+    def index(self):
+        if self._index is None:
+            print("🗂️ Indexing mod folders...")
+            self._index = build_file_index(SCAN_PATHS + TEXT_PATHS + TEXTURE_PATHS, jobs=self.jobs,
+                                           cache_file=FS_INDEX_FILE)
+        return self._index
+
+    def load(self, stage):
+        if stage not in self.outputs:
+            data = load_checkpoint(checkpoint_path(stage, self.checkpoint_dir))
+            if data is None:
+                raise RuntimeError(f"No usable {stage} checkpoint; re-run with --from {stage}")
+            self.outputs[stage] = data
+        return self.outputs[stage]
+
+    def save(self, stage, data):
+        self.outputs[stage] = data
+        save_checkpoint(checkpoint_path(stage, self.checkpoint_dir), stage, data)
+
+def stage_discover(run):
+    run.save("discover", collect_ltx_files(run.index()))
+
+def stage_parse(run):
+    print("📂 Scanning weapon data...")
+    run.save("parse", build_registry(run.load("discover"), jobs=run.jobs, index=run.index()))
+
+def stage_resolve(run):
+    run.save("resolve", resolve_weapons(run.load("parse"), run.index()))
+
+def stage_classify(run):
+    run.save("classify", classify_weapons(run.load("resolve"), run.load("parse")))
+
+def stage_dedupe(run):
+    run.save("dedupe", dedupe_weapons(run.load("classify")))
+
+def stage_stats(run):
+    run.load("dedupe").to_csv(OUT_DIR / "weapons_stats.csv", index=False)
+
+def stage_icons(run):
+    extract_icons(run.load("dedupe"), jobs=run.jobs, decoder=run.args.icon_decoder,
+                  rebuild=run.args.rebuild_icons, index=run.index())
+
+STAGE_FUNCS = {
+    "discover": stage_discover, "parse": stage_parse, "resolve": stage_resolve, "classify": stage_classify,
+    "dedupe": stage_dedupe, "stats": stage_stats, "icons": stage_icons,
+}
+
+def run_pipeline(args, stages=STAGES, checkpoint_dir=CHECKPOINT_DIR):
+    run = ScrapeRun(args, checkpoint_dir)
+    plan = plan_stages(stages, available_checkpoints(checkpoint_dir))
+    added = [s for s in plan if s not in stages]
+    if added:
+        print(f"ℹ️ No checkpoint for {', '.join(added)}; running {'it' if len(added) == 1 else 'them'} first.")
+    for stage in plan:
+        t0 = time.perf_counter()
+        STAGE_FUNCS[stage](run)
+        print(f"   ⏱️ {stage}: {time.perf_counter() - t0:.2f}s")
+    if "icons" in plan:
+        # Tells a running app to drop its cached icons on the next rerun.
+        icon_store.write_scrape_stamp(OUT_DIR)
+    return run
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Extract weapon stats and icons from a STALKER Anomaly/GAMMA install.")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="worker processes for LTX parsing (default: CPU count, 1 = serial)")
+    parser.add_argument("--icon-decoder", choices=["auto", "magick"], default="auto",
+                        help="DDS decoding: Pillow with ImageMagick fallback (auto) or ImageMagick only (magick)")
+    parser.add_argument("--rebuild-icons", action="store_true",
+                        help="ignore the icon manifest and re-extract every icon")
+    stages = parser.add_mutually_exclusive_group()
+    stages.add_argument("--only", nargs="+", choices=STAGES, metavar="STAGE",
+                        help=f"run just these stages from the previous run's checkpoints ({', '.join(STAGES)})")
+    stages.add_argument("--from", dest="from_stage", choices=STAGES, metavar="STAGE",
+                        help="resume at this stage, reusing the checkpoints of the stages before it")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    paths = PATHS.info()
+    print(f"📁 Paths resolved in {paths['seconds'] * 1000:.0f} ms "
+          f"({paths['mods']} enabled mods from {len(paths['modlists'])} modlist(s))")
+    if args.only:
+        stages = args.only
+    elif args.from_stage:
+        stages = STAGES[STAGES.index(args.from_stage):]
+    else:
+        stages = STAGES
+    run = run_pipeline(args, stages)
+    if "dedupe" in run.outputs:
+        print(f"✅ Done! Processed {len(run.outputs['dedupe'])} weapons.")
+    else:
+        print("✅ Done!")
 
-print(f"✅ Done! Processed {len(df_final)} weapons.")
+if __name__ == "__main__":
+    main()
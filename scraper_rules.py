@@ -0,0 +1,176 @@
+import re
+import sys
+
+# Section filtering and weapon classification rules used by scraper.py.
+# Each keyword list is compiled once into a single regex with shared prefixes factored
+# out (a trie, e.g. `_(?:1(?:g|p)|a(?:cog|...))`), so a lookup is one scan instead of one
+# re.search / substring test per pattern. Matches report which pattern fired, which
+# keeps rule edits debuggable:
+#   python scraper_rules.py wpn_ak74_kobra wpn_svd_custom
+
+_PLAIN = re.compile(r"[^\\.^$*+?{}\[\]|()]*\$?")
+
+def _trie_regex(words):
+    # words: [(text, anchored)] -> one regex with shared prefixes factored out, so the
+    # engine walks a trie instead of retrying every alternative at each position.
+    trie = {}
+    for text, anchored in words:
+        node = trie
+        for ch in text:
+            node = node.setdefault(ch, {})
+        node[1 if anchored else 0] = True
+
+    def emit(node):
+        if 0 in node:
+            return ""  # a shorter word already matches here
+        alts = ["$" if key == 1 else re.escape(key) + emit(node[key]) for key in sorted(node, key=str)]
+        return alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+
+    return emit(trie) if trie else "(?!)"
+
+class RuleSet:
+    """Ordered pattern list compiled into one regex; `literal=True` escapes plain keywords."""
+
+    def __init__(self, name, patterns, literal=False):
+        self.name = name
+        self.patterns = tuple(patterns)
+        self._sources = [re.escape(p) if literal else p for p in self.patterns]
+        self._each = [re.compile(src) for src in self._sources]
+        if literal:
+            combined = _trie_regex([(p, False) for p in self.patterns])
+        elif all(_PLAIN.fullmatch(p) for p in self.patterns):
+            combined = _trie_regex([(p.rstrip("$"), p.endswith("$")) for p in self.patterns])
+        else:
+            combined = "|".join(f"(?:{src})" for src in self._sources) or "(?!)"
+        self._regex = re.compile(combined)
+
+    def __iter__(self):
+        return iter(self.patterns)
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def search(self, text):
+        """The pattern matching leftmost in `text` (earliest listed on ties), or None."""
+        m = self._regex.search(text)
+        if m is None:
+            return None
+        pos = m.start()
+        for pattern, compiled in zip(self.patterns, self._each):
+            if compiled.match(text, pos):
+                return pattern
+        return None
+
+    def matches(self, text):
+        """Fast boolean test; same answer as `search(text) is not None`."""
+        return self._regex.search(text) is not None
+
+    def search_any(self, *texts):
+        for text in texts:
+            hit = self.search(text)
+            if hit is not None:
+                return hit
+        return None
+
+    def all_matches(self, text):
+        """Every pattern that matches `text`, in list order (slow path, for debugging)."""
+        return [p for p, compiled in zip(self.patterns, self._each) if compiled.search(text)]
+
+# Aggressive list of scope/attachment/variant sections to ignore
+# If a section contains any of these patterns, it is considered a derivative variant or attachment
+# and is filtered out to keep only the pure base weapons.
+JUNK_PATTERNS = [
+    r'_acog', r'_eot', r'_e0t2', r'_ac10632', r'_specter', r'_leupold', r'_aimpoint',
+    r'_point_aimpro', r'_ekp8', r'_pn23', r'_gauss', r'_marchf', r'_kemper',
+    r'_mepro', r'_rakurs', r'_0kp2', r'_rmr', r'_deltapoint', r'_compm4s', r'_pka',
+    r'_1p29', r'_kobra', r'_ps01', r'_pso', r'_1pn93', r'_triji', r'_spec', r'_mark8',
+    r'_romeo4', r'_hco', r'_t12', r'_monstrum', r'_trihawk', r'_vulcan', r'_echo1',
+    r'_n_', r'_n$', r'_cw', r'_up', r'_sk1', r'_sk2', r'_camo', r'_new',
+    r'_rusty', r'_worn', r'_old', r'_1p', r'_ap_', r'_dot', r'_sil', r'_tgp', r'_pbs',
+    r'_kzis', r'_usp1', r'_okp', r'_1g', r'_bas', r'_1p63', r'_1p59', r'_pso1m21', r'_ekp8_02', r'_pso2', r'_1p78gs', r'_1pn93n2_1gs', r'_1p76',
+    r'_c1$', r'_c2$', r'_c3$', r'_c4$', r'_k1$', r'_k2$', r'_k3$'
+]
+JUNK_SECTIONS = RuleSet("junk_section", JUNK_PATTERNS)
+
+# Weapon classification keywords (substrings of the section id, `kind` or ammo).
+SNIPER_KEYWORDS = RuleSet("sniper", ['sniper', 'vssk', 'svd', 'dvl', 'l96', 'm24', 'trg', 'm98', 'scout', 'remington', 'sr25', 'dmr'], literal=True)
+SHOTGUN_AMMO = RuleSet("shotgun_ammo", ['12x70', '12x76', '23x75'], literal=True)
+HEAVY_AMMO = RuleSet("heavy_ammo", ['7.62x51', '7.62x54', '308', 'magnum_300', '338_lapua', '12.7x55'], literal=True)
+HEAVY_PISTOLS = RuleSet("heavy_pistol", ['deagle', 'rex', 'mp412', 'desert_eagle'], literal=True)
+SLOT1_PDWS = RuleSet("slot1_pdw", ['p90', 'mp7', 'mp5k', 'aps'], literal=True)
+SMG_KEYWORDS = RuleSet("smg", ['mp5', 'vityaz', 'ump', 'vector', 'pp2000', 'bizon', 'mp7', 'p90'], literal=True)
+SMALL_CALIBER_SNIPERS = RuleSet("small_caliber_sniper", ['vss', 'val', 'sr3', '7.62x39_sniper'], literal=True)
+LMG_MIN_MAG = 60
+
+# Specialized variants to preserve even if base ID exists
+SPECIAL_VARIANTS = RuleSet("special_variant", ['_kit', '_mono', '_custom', '_isg', '_nimble', '_alfa', '_tactical'], literal=True)
+
+def classify_weapon(sec, ammo, slot, kind, mag_size):
+    """Returns (class, reason); reason names the rule and pattern that decided it."""
+    id_l, ammo, kind = sec.lower(), str(ammo).lower(), str(kind).lower()
+
+    # SNIPER Check (Higher Priority)
+    sniper = SNIPER_KEYWORDS.search_any(id_l, kind)
+
+    # Ammo-based logic
+    hit = SHOTGUN_AMMO.search(ammo)
+    if hit:
+        return "Shotgun", f"shotgun_ammo:{hit}"
+
+    # Heavy calibers
+    hit = HEAVY_AMMO.search(ammo)
+    if hit:
+        if sniper: return "Sniper/DMR", f"heavy_ammo:{hit}+sniper:{sniper}"
+        pistol = HEAVY_PISTOLS.search(id_l)
+        if pistol: return "Pistol", f"heavy_ammo:{hit}+heavy_pistol:{pistol}"
+        if slot == 1: return "Sidearm Heavy", f"heavy_ammo:{hit}+slot1"
+        return "Battle Rifle", f"heavy_ammo:{hit}"
+
+    if sniper: return "Sniper/DMR", f"sniper:{sniper}"
+
+    # Slot 1 special handling (PDWs)
+    if slot == 1:
+        hit = SLOT1_PDWS.search(id_l)
+        if hit: return "SMG/PDW", f"slot1_pdw:{hit}"
+        return "Pistol", "slot1"
+
+    # LMG Check
+    if mag_size and mag_size > LMG_MIN_MAG: return "LMG", f"mag>{LMG_MIN_MAG}"
+
+    # SMG Check
+    hit = SMG_KEYWORDS.search_any(id_l, kind)
+    if hit:
+        return "SMG", f"smg:{hit}"
+
+    # Sniper check for smaller calibers (e.g. VSS)
+    hit = SMALL_CALIBER_SNIPERS.search_any(id_l, kind)
+    if hit:
+        return "Sniper/DMR", f"small_caliber_sniper:{hit}"
+
+    return "Assault Rifle", "default"
+
+def base_id_and_originality(wid):
+    """(base model id, priority); priority 0 keeps the weapon ahead of its derivatives."""
+    wid_l = wid.lower()
+    if SPECIAL_VARIANTS.search(wid_l):
+        return wid, 0 # Give highest priority (0) to special variants
+
+    parts = wid_l.split('_')
+    # If it's wpn_xxx_yyy, 'wpn_xxx' is likely the base model name
+    if len(parts) > 2:
+        return "_".join(parts[:2]), 1 # Priority 1 for suspected variants
+    return wid_l, 0 # Priority 0 for likely base weapons
+
+def explain_section(sec):
+    sec_l = sec.lower()
+    junk = JUNK_SECTIONS.all_matches(sec_l)
+    special = SPECIAL_VARIANTS.search(sec_l)
+    base, prio = base_id_and_originality(sec)
+    print(f"{sec}")
+    print(f"  junk:      {', '.join(junk) if junk else '-'}")
+    print(f"  variant:   {special or '-'} (base {base}, priority {prio})")
+    print(f"  class:     {' / '.join(classify_weapon(sec, '', 2, '', None))} (id keywords only, slot 2)")
+
+if __name__ == "__main__":
+    for arg in sys.argv[1:]:
+        explain_section(arg)
@@ -0,0 +1,69 @@
+"""Micro-benchmark: compiled scraper_rules matchers vs. the original per-pattern loops.
+
+Run from the project root:  python tests/bench_rules.py [--sections 20000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import timeit
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import scraper_rules
+
+def legacy_is_junk(sec):
+    sec_l = sec.lower()
+    for pat in scraper_rules.JUNK_PATTERNS:
+        if re.search(pat, sec_l):
+            return True
+    return False
+
+def legacy_is_sniper(id_l, kind):
+    return any(x in id_l or x in kind for x in scraper_rules.SNIPER_KEYWORDS)
+
+def compiled_is_junk(sec):
+    return scraper_rules.JUNK_SECTIONS.matches(sec.lower())
+
+def compiled_is_sniper(id_l, kind):
+    return scraper_rules.SNIPER_KEYWORDS.matches(id_l) or scraper_rules.SNIPER_KEYWORDS.matches(kind)
+
+def sample_sections(count, seed=0):
+    # Mix of clean base ids and scope/variant suffixes, roughly like a GAMMA registry.
+    rng = random.Random(seed)
+    stems = ["wpn_ak74", "wpn_svd", "wpn_mp5", "wpn_groza", "wpn_pkm", "wpn_val", "wpn_m4a1", "wpn_sr25_mk11",
+             "wpn_desert_eagle", "wpn_toz34", "wpn_vector", "wpn_l96", "ammo_5.45x39_fmj", "af_medusa"]
+    suffixes = [p.strip("_$") for p in scraper_rules.JUNK_PATTERNS] + ["hud", "kit", "custom", "tactical", "alt"]
+    return ["_".join([rng.choice(stems)] + rng.sample(suffixes, rng.choice([0, 0, 1, 2])))
+            for _ in range(count)]
+
+def bench(label, fn, args_list, repeat):
+    for args in args_list[:200]:
+        fn(*args)
+    best = min(timeit.repeat(lambda: [fn(*a) for a in args_list], number=1, repeat=repeat))
+    print(f"  {label:<10} {best * 1000:8.1f} ms  ({best / len(args_list) * 1e6:.2f} us/call)")
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compiled scraper rules against per-pattern loops.")
+    parser.add_argument("--sections", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    sections = sample_sections(args.sections)
+    assert [legacy_is_junk(s) for s in sections] == [compiled_is_junk(s) for s in sections]
+
+    print(f"Junk filter ({len(scraper_rules.JUNK_SECTIONS)} patterns, {len(sections)} sections):")
+    old = bench("loop", legacy_is_junk, [(s,) for s in sections], args.repeat)
+    new = bench("compiled", compiled_is_junk, [(s,) for s in sections], args.repeat)
+    print(f"  speedup    {old / new:8.1f}x")
+
+    pairs = [(s.lower(), "w_rifle") for s in sections]
+    print(f"Sniper keywords ({len(scraper_rules.SNIPER_KEYWORDS)} keywords, id + kind):")
+    old = bench("loop", legacy_is_sniper, pairs, args.repeat)
+    new = bench("compiled", compiled_is_sniper, pairs, args.repeat)
+    print(f"  speedup    {old / new:8.1f}x")
+
+if __name__ == "__main__":
+    main()
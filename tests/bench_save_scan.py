@@ -0,0 +1,83 @@
+"""Memory/time benchmark: legacy full-copy save scan vs. bytes regex over the mmap.
+
+Run from the project root:  python tests/bench_save_scan.py [size_mb]
+
+Builds a synthetic save (random binary noise with weapon tokens sprinkled in),
+then reports tracemalloc peak memory and wall time for both scan strategies.
+"""
+import mmap
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import save_reader
+
+TOKENS = [
+    b"wpn_ak74", b"WPN_AK74M", b"wpn_svd", b"wpn_spas12_custom", b"wpn_groza",
+    b"wpn_mp5k", b"wpn_fn2000_nimble", b"wpn_binoc", b"wpn_pkm_hud", b"wpn_mystery_gun",
+]
+
+
+def build_synthetic_save(path, size_mb, seed=1):
+    rng = random.Random(seed)
+    chunk = 1024 * 1024
+    with open(path, "wb") as fh:
+        for _ in range(size_mb):
+            block = bytearray(rng.randbytes(chunk))
+            # Roughly one weapon token per 4 KB, similar to a late-game save.
+            for _ in range(chunk // 4096):
+                token = rng.choice(TOKENS) + str(rng.randrange(100)).encode("ascii")
+                pos = rng.randrange(0, chunk - len(token) - 2)
+                block[pos:pos + len(token) + 2] = b"\x00" + token + b"\x00"
+            fh.write(block)
+
+
+def legacy_scan(path):
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            content = mm[:]
+    text = content.decode("latin-1", errors="ignore").lower()
+    return Counter(re.findall(r"(wpn_[a-z0-9_]+)", text))
+
+
+def mmap_scan(path):
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return save_reader._count_weapon_tokens(mm)
+
+
+def measure(fn, path):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn(path)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak, elapsed
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.scoc")
+        build_synthetic_save(path, size_mb)
+        print(f"Synthetic save: {os.path.getsize(path) / 1e6:.1f} MB")
+
+        legacy, legacy_peak, legacy_time = measure(legacy_scan, path)
+        current, current_peak, current_time = measure(mmap_scan, path)
+        assert legacy == current, "token counts differ between scan strategies"
+
+        print(f"{len(current)} distinct tokens, {sum(current.values())} occurrences")
+        print(f"legacy copy+decode+lower : peak {legacy_peak / 1e6:8.1f} MB  {legacy_time:6.2f} s")
+        print(f"bytes regex over mmap    : peak {current_peak / 1e6:8.1f} MB  {current_time:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ import os
 os.environ["TESTING_ENV"] = "1"
 
 import pandas as pd
+import pickle
 import pytest
 import os
 import sys
@@ -25,6 +26,15 @@ mock_st.radio.return_value = "Balanced"
 mock_st.checkbox.return_value = False
 mock_st.text_input.return_value = ""
 
+# st.cache_resource memoizes per process; mimic it with lru_cache (bare or called form).
+from functools import lru_cache
+def mock_cache_resource(func=None, **kwargs):
+    if func is None:
+        return lambda f: lru_cache(maxsize=None)(f)
+    return lru_cache(maxsize=None)(func)
+
+mock_st.cache_resource.side_effect = mock_cache_resource
+
 # Prevent JSON serialization errors of MagicMocks in save_ui_prefs
 class MockSessionState(dict):
     def __getattr__(self, name):
@@ -271,3 +281,204 @@ def test_mutant_killer_constraint():
         w_list = [w for w in s_entry['weapons'] if w]
         has_mk = any(w.get('mutant_killer', False) for w in w_list)
         assert has_mk, f"Set drafted without a mutant killer! {s_entry}"
+
+# Sets drafted from the fixture locker by the original classic loop (before the incremental
+# candidate engine), with random.seed(123); listed in draft order as (ids, tier_val).
+BASELINE_CLASSIC_SETS = {
+    "Maxxed": [
+        (('wpn_sig_spear', 'wpn_fn2000', 'wpn_mp7'), 11),
+        (('wpn_ash12', 'wpn_g36', 'wpn_p90'), 11),
+        (('wpn_pkm', 'wpn_m4a1', 'wpn_sr2_veresk'), 11),
+        (('wpn_saiga', 'wpn_groza', 'wpn_mp5k'), 11),
+        (('wpn_m110', 'wpn_l85', 'wpn_colt'), 11),
+        (('wpn_svd', 'wpn_akm', 'wpn_glock'), 11),
+        (('wpn_ks23', 'wpn_ak74', 'wpn_beretta'), 11),
+        (('wpn_lapua', 'wpn_ak105', 'wpn_pm'), 11),
+        (('wpn_mosin', 'wpn_mp5', 'wpn_mp7'), 22),
+        (('wpn_ks23', 'wpn_ump45', 'wpn_pm'), 32),
+        (('wpn_ks23', 'wpn_spas12', 'wpn_beretta'), 32),
+        (('wpn_ks23', 'wpn_mp133', 'wpn_mp5k'), 32),
+        (('wpn_svd', 'wpn_toz34', 'wpn_colt'), 32),
+    ],
+    "Balanced": [
+        (('wpn_m110', 'wpn_groza', 'wpn_beretta'), 11),
+        (('wpn_pkm', 'wpn_ak74', 'wpn_colt'), 11),
+        (('wpn_mosin', 'wpn_ak105', 'wpn_p90'), 11),
+        (('wpn_lapua', 'wpn_l85', 'wpn_sr2_veresk'), 11),
+        (('wpn_svd', 'wpn_fn2000', 'wpn_glock'), 11),
+        (('wpn_saiga', 'wpn_m4a1', 'wpn_pm'), 11),
+        (('wpn_ks23', 'wpn_g36', 'wpn_mp5k'), 11),
+        (('wpn_ash12', 'wpn_toz34', 'wpn_mp7'), 12),
+        (('wpn_sig_spear', 'wpn_akm', 'wpn_mp5k'), 21),
+        (('wpn_lapua', 'wpn_ump45', 'wpn_beretta'), 32),
+        (('wpn_svd', 'wpn_mp5', 'wpn_colt'), 32),
+        (('wpn_ash12', 'wpn_spas12', 'wpn_p90'), 32),
+        (('wpn_ash12', 'wpn_mp133', 'wpn_glock'), 32),
+    ],
+}
+
+def test_classic_draft_matches_baseline_for_fixed_seed():
+    """The incremental candidate engine must draft exactly the sets the original loop did."""
+    locker = df['id'].tolist()
+    for mode, expected in BASELINE_CLASSIC_SETS.items():
+        sets = sorted(app._raw_calculate_all_sets_classic(locker, mode, random.Random(123)), key=lambda s: s['order'])
+        assert [(tuple(w['id'] for w in s['weapons']), s['tier_val']) for s in sets] == expected
+
+def test_seeded_drafts_ignore_global_random_state():
+    locker = df['id'].tolist()
+    ids = lambda sets: [[w['id'] for w in s['weapons']] for s in sets]
+    for mode in ("classic", "diversity"):
+        random.seed(1)
+        first = app._raw_calculate_all_sets(locker, "Balanced", mode, seed=42)
+        random.seed(2)
+        state = random.getstate()
+        second = app._raw_calculate_all_sets(list(reversed(locker)), "Balanced", mode, seed=42)
+        assert random.getstate() == state
+        assert ids(first) == ids(second)
+        assert ids(calculate_all_sets(locker, "Balanced", mode, seed=42)) == ids(first)
+
+def test_compat_index_matches_pair_and_set_checks():
+    """The vectorized compatibility matrix and triple mask must agree with the scalar checks."""
+    records = df.to_dict('records')
+    compat = app.build_compat_index(records)
+    positions, valid_pairs, _ = compat
+    for w1 in records:
+        for w2 in records:
+            assert valid_pairs[positions[w1['id']], positions[w2['id']]] == app.is_valid_pair(w1, w2)
+
+    powers = [w for w in records if w['role_label'] == 'Power']
+    workhorses = [w for w in records if w['role_label'] == 'Workhorse']
+    sidearms = [w for w in records if w['role_label'] == 'Sidearm']
+    mask = app.triple_validity_mask(compat, powers, workhorses, sidearms)
+    assert mask.shape == (len(powers), len(workhorses), len(sidearms))
+    for pi, p in enumerate(powers):
+        for wi, wh in enumerate(workhorses):
+            for si, s in enumerate(sidearms):
+                assert mask[pi, wi, si] == app.is_valid_set(s, p, wh)
+
+def test_draft_cache_is_order_insensitive_and_persistent(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "DRAFT_CACHE_FILE", str(tmp_path / "drafts.sqlite"))
+    monkeypatch.setattr(app, "DRAFT_CACHE_MAX_ENTRIES", 2)
+    locker = df['id'].tolist()[:20]
+    key = app.draft_cache_key(locker, "Balanced", "classic", None, "v1")
+    assert key == app.draft_cache_key(list(reversed(locker)) + locker[:3], "Balanced", "classic", None, "v1")
+    assert key != app.draft_cache_key(locker, "Balanced", "classic", 7, "v1")
+    assert key != app.draft_cache_key(locker, "Balanced", "classic", None, "v2")
+
+    sets = app._raw_calculate_all_sets(locker, "Balanced", "classic")
+    app.save_draft_result(key, sets)
+    restored = app.load_draft_result(key)
+    assert [[w['id'] for w in s['weapons']] for s in restored] == \
+        [[w['id'] for w in s['weapons']] for s in sets]
+
+    # Only the most recently used entries are kept.
+    app.save_draft_result("b", [])
+    app.load_draft_result(key)
+    app.save_draft_result("c", [])
+    assert app.load_draft_result("b") is None
+    assert app.load_draft_result(key) is not None
+
+    # Stored as JSON: every draft mode round-trips exactly, and a pickle payload is never loaded.
+    for mode in ("classic", "diversity", "optimal"):
+        drafted = app._raw_calculate_all_sets(locker, "Maxxed", mode, seed=3)
+        app.save_draft_result(mode, drafted)
+        assert app.load_draft_result(mode) == drafted
+    with app.closing(app._open_draft_cache()) as conn, conn:
+        conn.execute("UPDATE drafts SET payload = ? WHERE key = ?", (pickle.dumps([{"x": 1}]), "optimal"))
+    assert app.load_draft_result("optimal") is None
+
+def test_draft_cache_write_failure_is_logged_not_raised(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(app, "DRAFT_CACHE_FILE", str(tmp_path / "missing" / "drafts.sqlite"))
+    with caplog.at_level("WARNING", logger=app.logger.name):
+        app.save_draft_result("k", [])
+    assert "Could not write draft cache" in caplog.text
+
+def _best_disjoint_by_brute_force(triples, fitness):
+    import itertools
+    best = (0, 0.0)
+    for r in range(len(triples) + 1):
+        for comb in itertools.combinations(range(len(triples)), r):
+            ids = [w for i in comb for w in triples[i]]
+            if len(ids) == len(set(ids)):
+                best = max(best, (r, sum(fitness[i] for i in comb)))
+    return best
+
+def test_disjoint_triple_solver_matches_brute_force():
+    rng = random.Random(5)
+    for _ in range(150):
+        triples = list(dict.fromkeys(
+            (f"p{rng.randrange(4)}", f"w{rng.randrange(4)}", f"s{rng.randrange(4)}")
+            for _ in range(rng.randrange(1, 12))
+        ))
+        scores = {w: rng.choice([0.5, 1.0, 2.5, 4.0]) for t in triples for w in t}
+        for additive in (False, True):
+            fitness = [sum(scores[w] for w in t) if additive else rng.uniform(-3, 3) for t in triples]
+            chosen, stats = app.solve_disjoint_triples(triples, fitness, 5, scores if additive else None)
+            ids = [w for i in chosen for w in triples[i]]
+            assert len(ids) == len(set(ids))
+            expected = _best_disjoint_by_brute_force(triples, fitness)
+            assert len(chosen) == expected[0]
+            assert abs(sum(fitness[i] for i in chosen) - expected[1]) < 1e-9
+            assert stats["proven_optimal"]
+
+def test_disjoint_triple_solver_can_be_abandoned_from_progress_callback():
+    rng = random.Random(9)
+    triples = list(dict.fromkeys(
+        (f"p{rng.randrange(14)}", f"w{rng.randrange(14)}", f"s{rng.randrange(14)}") for _ in range(220)
+    ))
+    fitness = [rng.uniform(-3, 3) for _ in triples]
+    seen = []
+
+    class Cancelled(Exception):
+        pass
+
+    def on_progress(nodes):
+        seen.append(nodes)
+        raise Cancelled
+
+    with pytest.raises(Cancelled):
+        app.solve_disjoint_triples(triples, fitness, 30, on_progress=on_progress)
+    assert seen == [256]
+
+def test_optimal_draft_covers_locker_and_beats_greedy():
+    locker = df['id'].tolist()
+    for strat in ("Maxxed", "Balanced"):
+        sets = calculate_all_sets(locker, strat, "optimal", seed=1)
+        drafted = {w['id'] for s in sets for w in s['weapons']}
+        assert set(locker) <= drafted
+        report = sets[0]['solver']
+        assert report["proven_optimal"]
+        # The solver maximizes flawless sets only; reuse in the greedy tail is not bounded.
+        greedy = app.draft_summary(calculate_all_sets(locker, strat, "classic", seed=1))
+        assert report["optimal"]["flawless_sets"] >= greedy["flawless_sets"]
+        assert report["optimal"]["flawless_sets"] <= report["flawless_bound"]
+        for summary in (report["optimal"], greedy):
+            assert 0 <= summary["min_redundant_slots"] <= summary["redundant_slots"]
+        for s in sets:
+            if s['tier_val'] < 20:
+                p, wh, side = s['weapons']
+                assert app.is_valid_set(side, p, wh)
+
+def test_streamed_draft_matches_full_draft_and_stops_early(monkeypatch):
+    locker = df['id'].tolist()
+    ids = lambda sets: [[w['id'] for w in s['weapons']] for s in sets]
+    full = app._raw_calculate_all_sets(locker, "Balanced", "classic", seed=4)
+    streamed = list(app.iter_draft_sets(locker, "Balanced", "classic", seed=4))
+    assert ids(streamed) == ids(sorted(full, key=lambda s: s['order']))
+
+    remembered = []
+    monkeypatch.setattr(app, "lookup_draft", lambda key: None)
+    monkeypatch.setattr(app, "remember_draft", lambda key, sets, persist=True: remembered.append(key))
+    top = app.stream_draft_sets(locker, "Balanced", "classic", 4, 3, "run-top")
+    assert sorted(ids(top)) == sorted(ids(streamed[:3]))
+    assert not remembered  # partial drafts are never cached
+    whole = app.stream_draft_sets(locker, "Balanced", "classic", 4, 0, "run-all")
+    assert ids(whole) == ids(full)
+    assert len(remembered) == 1
+
+    # A cache hit keeps the first N sets in draft order, not the first N in display order.
+    monkeypatch.setattr(app, "lookup_draft", lambda key: full)
+    assert ids(app.stream_draft_sets(locker, "Balanced", "classic", 4, 3, "run-top")) == ids(top)
+    reordered = [dict(s, order=len(full) - 1 - i) for i, s in enumerate(full)]
+    monkeypatch.setattr(app, "lookup_draft", lambda key: reordered)
+    assert sorted(ids(app.stream_draft_sets(locker, "Balanced", "classic", 4, 3, "run-top"))) == sorted(ids(full[-3:]))
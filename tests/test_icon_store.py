@@ -0,0 +1,118 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PIL import Image
+
+import icon_store
+
+
+def _write_icons(icon_dir):
+    icon_dir.mkdir()
+    specs = {
+        "wpn_ak74": ((100, 50), (180, 40, 40, 255)),
+        "wpn_svd": ((200, 50), (40, 40, 200, 255)),       # blue-heavy -> R/B swapped
+        "wpn_groza_cw": ((100, 100), (60, 160, 60, 255)),
+        "wpn_groza": ((100, 100), (0, 0, 0, 0)),          # invisible -> _cw fallback
+        "wpn_spas12": ((150, 50), (0, 0, 0, 0)),          # invisible, no _cw fallback
+        "wpn_spas12_custom": ((150, 50), (120, 100, 80, 200)),
+        "wpn_val": ((50, 50), (200, 200, 200, 128)),
+    }
+    for stem, (size, color) in specs.items():
+        img = Image.new("RGBA", size, (0, 0, 0, 0))
+        img.paste(color, (5, 5, size[0] - 5, size[1] - 5))
+        img.save(icon_dir / f"{stem}.png")
+    return specs
+
+
+def test_atlas_slices_match_direct_icon_loading(tmp_path):
+    icon_dir = tmp_path / "icons"
+    specs = _write_icons(icon_dir)
+    store = icon_store.build_icon_atlas(str(icon_dir), str(tmp_path))
+    assert len(store) == len(specs) - 2
+
+    for stem in list(specs) + ["wpn_groza_gold", "wpn_ak74_tactical", "wpn_missing"]:
+        expected = icon_store.load_icon_image(str(icon_dir / f"{stem}.png"))
+        got = store.image(stem)
+        if expected is None:
+            assert got is None, stem
+        else:
+            assert got.tobytes() == expected.tobytes(), stem
+    assert store.resolve("wpn_spas12") == "wpn_spas12_custom"
+    assert store.resolve("wpn_groza_gold") == "wpn_groza_cw"
+    assert store.data_url("wpn_ak74").startswith("data:image/png;base64,")
+
+
+def test_icon_store_reuses_index_until_icons_change(tmp_path):
+    icon_dir = tmp_path / "icons"
+    _write_icons(icon_dir)
+    first = icon_store.load_icon_store(str(icon_dir), str(tmp_path))
+    assert icon_store.load_icon_store(str(icon_dir), str(tmp_path)) is first
+
+    # A fresh process reads the saved atlas + index instead of re-baking.
+    icon_store._stores.clear()
+    reloaded = icon_store.load_icon_store(str(icon_dir), str(tmp_path))
+    assert reloaded.rects == first.rects
+    assert reloaded.image("wpn_svd").tobytes() == first.image("wpn_svd").tobytes()
+
+    Image.new("RGBA", (50, 50), (90, 90, 90, 255)).save(icon_dir / "wpn_pm.png")
+    os.utime(icon_dir, ns=(1, first.signature[0] + 1_000_000_000))
+    rebuilt = icon_store.load_icon_store(str(icon_dir), str(tmp_path))
+    assert rebuilt is not reloaded
+    assert rebuilt.resolve("wpn_pm") == "wpn_pm"
+    assert icon_store.load_icon_store(str(tmp_path / "nope")) is icon_store.EMPTY_STORE
+
+
+def test_icon_cache_budget_counters_and_scrape_stamp(tmp_path):
+    cache = icon_store.IconCache(budget_mb=1)
+    tile = lambda: Image.new("RGB", (256, 256))  # ~192 KB each
+    for i in range(6):
+        cache.get(("a.png", i, "image"), tile)
+    stats = cache.stats()
+    assert stats["misses"] == 6 and stats["evictions"] == 1
+    assert stats["mb"] <= stats["budget_mb"]
+
+    assert cache.get(("a.png", 5, "image"), lambda: None) is not None
+    assert cache.get(("a.png", 0, "image"), lambda: None) is None  # evicted (LRU)
+    assert cache.stats()["hits"] == 1
+
+    # A new source mtime is a different key, so stale entries are never served.
+    assert cache.get(("a.png", 99, "image"), lambda: "fresh") == "fresh"
+
+    cache.sync_scrape_stamp(str(tmp_path))
+    icon_store.write_scrape_stamp(str(tmp_path))
+    cache.sync_scrape_stamp(str(tmp_path))
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_scrape_stamp_sync_waits_for_the_cache_lock(tmp_path):
+    import threading
+
+    cache = icon_store.IconCache(budget_mb=1)
+    cache.sync_scrape_stamp(str(tmp_path))
+    cache.get(("a.png", 1, "image"), lambda: b"x" * 10)
+    icon_store.write_scrape_stamp(str(tmp_path))
+    with cache._lock:
+        syncing = threading.Thread(target=cache.sync_scrape_stamp, args=(str(tmp_path),))
+        syncing.start()
+        syncing.join(0.1)
+        assert syncing.is_alive()  # blocked: no clear while another thread holds the lock
+        assert cache._entries
+    syncing.join()
+    assert cache.stats()["entries"] == 0 and cache.invalidations == 1
+
+
+def test_concurrent_sessions_build_the_atlas_once(tmp_path, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    icon_dir = tmp_path / "icons"
+    _write_icons(icon_dir)
+    builds = []
+    real_build = icon_store.build_icon_atlas
+    monkeypatch.setattr(icon_store, "build_icon_atlas", lambda *a: builds.append(a) or real_build(*a))
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        stores = list(pool.map(lambda _: icon_store.load_icon_store(str(icon_dir), str(tmp_path)), range(16)))
+    assert len(builds) == 1
+    assert all(store is stores[0] for store in stores)
@@ -0,0 +1,89 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import paths_config
+from paths_config import ResolvedPaths
+
+
+def legacy_get_path_list(config_file, key):
+    """Reference copy of the original per-call resolution."""
+    values = paths_config.load_paths_config(config_file).get(key, [])
+    if not isinstance(values, list):
+        return []
+    result = []
+    for item in values:
+        p = paths_config.Path(str(item))
+        if p.name == "mods" and p.parent.name == "MO2":
+            best_modlist = paths_config.newest_modlist(p)
+            if best_modlist:
+                lines = best_modlist.read_text(encoding='utf-8', errors='ignore').splitlines()
+                for line in reversed(lines):
+                    if line.startswith('+'):
+                        mod_path = p / line[1:].strip()
+                        if mod_path.exists():
+                            append_p = mod_path
+                            if key == "text_paths":
+                                append_p = mod_path / "gamedata/configs/text/eng"
+                                if not append_p.exists():
+                                    append_p = mod_path / "gamedata/configs/text"
+                            elif key == "scan_paths":
+                                append_p = mod_path / "gamedata/configs"
+                            elif key == "texture_paths":
+                                append_p = mod_path / "gamedata/textures"
+                            if append_p.exists():
+                                result.append(append_p)
+                continue
+        result.append(p)
+    return result
+
+
+def _write_tree(root):
+    mods = root / "MO2" / "mods"
+    for rel in ["a/gamedata/configs/text/eng", "b/gamedata/configs/text", "b/gamedata/textures", "c/gamedata/configs"]:
+        (mods / rel).mkdir(parents=True)
+    for profile in ("Default", "Old"):
+        (root / "MO2" / "profiles" / profile).mkdir(parents=True)
+    (root / "MO2" / "profiles" / "Old" / "modlist.txt").write_text("+c\n")
+    os.utime(root / "MO2" / "profiles" / "Old" / "modlist.txt", (1, 1))
+    (root / "MO2" / "profiles" / "Default" / "modlist.txt").write_text("# header\n+c\n-b\n+a\n+b\n+missing\n")
+    config = root / "paths_config.json"
+    config.write_text(json.dumps({
+        "save_dir": str(root / "saves"),
+        "scan_paths": [str(root / "vanilla"), str(mods)],
+        "text_paths": [str(mods)],
+        "texture_paths": [str(mods), str(root / "vanilla_tex")],
+        "extra_paths": [str(mods)],
+    }))
+    return config
+
+
+def test_resolved_paths_match_per_call_resolution_and_refresh(tmp_path):
+    config = _write_tree(tmp_path)
+    paths = ResolvedPaths(config)
+    for key in ("scan_paths", "text_paths", "texture_paths", "extra_paths", "save_dir"):
+        assert paths.path_list(key) == legacy_get_path_list(config, key)
+    assert paths.get("save_dir") == tmp_path / "saves"
+    info = paths.info()
+    assert info["mods"] == 3 and len(info["modlists"]) == 1 and info["config_found"]
+
+    # Memoized: an on-disk change is only picked up through refresh().
+    modlist = tmp_path / "MO2" / "profiles" / "Default" / "modlist.txt"
+    before = paths.path_list("scan_paths")
+    assert paths.refresh() is False
+    modlist.write_text("+a\n")
+    stamp = modlist.stat().st_mtime_ns + 10**9
+    os.utime(modlist, ns=(stamp, stamp))
+    assert paths.path_list("scan_paths") == before
+    assert paths.is_stale()
+    assert paths.refresh() is True
+    assert paths.path_list("scan_paths") == legacy_get_path_list(config, "scan_paths")
+    assert paths.info()["mods"] == 1 and paths.refreshes == 1
+
+    config.write_text(json.dumps({"save_dir": str(tmp_path / "other")}))
+    os.utime(config, ns=(stamp, stamp))
+    assert paths.refresh() is True
+    assert paths.get("save_dir") == tmp_path / "other"
+    assert paths.path_list("text_paths") == [paths_config.Path(p) for p in paths_config.DEFAULT_PATHS_CONFIG["text_paths"]]
@@ -0,0 +1,186 @@
+import os
+import random
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import save_reader
+
+KNOWN_IDS = [
+    "wpn_ak74", "wpn_ak74u", "wpn_ak74m", "wpn_ak105", "wpn_akm",
+    "wpn_mp5", "wpn_mp5k", "wpn_mp5sd", "wpn_svd", "wpn_svds",
+    "wpn_spas12", "wpn_spas12_custom", "wpn_fn2000", "wpn_fn2000_nimble",
+    "wpn_groza", "wpn_vintorez", "wpn_val", "wpn_pkm", "wpn_pkp", "wpn_l96",
+    "wpn_sig550", "wpn_sig550_luckygun", "wpn_toz34", "wpn_toz34_custom",
+]
+
+
+def legacy_best_known_match(token, known_sorted, known_set):
+    """Reference copy of the original linear-scan matcher."""
+    if token in known_set:
+        return token
+
+    best_match = None
+    for w_id in known_sorted:
+        if token.startswith(w_id):
+            suffix = token[len(w_id):]
+            if not suffix or suffix.isdigit():
+                if best_match is None or len(w_id) > len(best_match):
+                    best_match = w_id
+
+    if best_match:
+        return best_match
+
+    prefix_candidates = [w_id for w_id in known_set if w_id.startswith(token) and w_id != token]
+    if len(prefix_candidates) == 1:
+        return prefix_candidates[0]
+
+    parts = token.split('_')
+    for i in range(len(parts) - 1, 1, -1):
+        base = "_".join(parts[:i])
+        if base in known_set:
+            return base
+    return None
+
+
+def _sample_tokens(rng, count=3000):
+    alphabet = "abcdefghijklmnopqrstuvwxyz0123456789_"
+    tokens = []
+    for _ in range(count):
+        base = rng.choice(KNOWN_IDS)
+        kind = rng.randrange(6)
+        if kind == 0:
+            tokens.append(base)
+        elif kind == 1:
+            tokens.append(base + str(rng.randrange(1, 99999)))
+        elif kind == 2:
+            tokens.append(base[:rng.randrange(5, len(base) + 1)])
+        elif kind == 3:
+            tokens.append(base + "_" + "".join(rng.choice(alphabet) for _ in range(rng.randrange(1, 8))))
+        elif kind == 4:
+            tokens.append("wpn_" + "".join(rng.choice(alphabet) for _ in range(rng.randrange(1, 10))))
+        else:
+            tokens.append(base + "".join(rng.choice(alphabet) for _ in range(rng.randrange(1, 4))))
+    return tokens
+
+
+def test_prefix_index_matches_legacy_rules():
+    rng = random.Random(7)
+    known_set = set(KNOWN_IDS)
+    known_sorted = sorted(known_set, key=len, reverse=True)
+    index = save_reader.get_known_index(KNOWN_IDS)
+    for token in _sample_tokens(rng):
+        expected = legacy_best_known_match(token, known_sorted, known_set)
+        assert save_reader._best_known_match(token, index) == expected, token
+
+
+def test_known_index_is_reused_for_same_id_set():
+    first = save_reader.get_known_index(KNOWN_IDS)
+    second = save_reader.get_known_index(list(reversed(KNOWN_IDS)))
+    assert first is second
+    assert save_reader.get_known_index(first) is first
+
+
+def test_extract_known_and_unknown_from_save(tmp_path):
+    save = tmp_path / "quicksave.scop"
+    save.write_bytes(
+        b"\x00\x01WPN_AK74\x00wpn_ak742\x00wpn_svds_scoped\x00wpn_binoc\x00"
+        b"wpn_ak74_hud\x00wpn_mystery_gun12\x00\xffwpn_spas12_cus\x00"
+    )
+    found = save_reader.extract_weapons_from_scop(str(save), KNOWN_IDS)
+    assert found == ["wpn_ak74", "wpn_spas12_custom", "wpn_svds"]
+    unknown = save_reader.extract_unknown_weapon_tokens(str(save), KNOWN_IDS)
+    assert unknown == ["wpn_mystery_gun"]
+
+
+def test_scan_save_single_pass_and_cache(tmp_path):
+    save = tmp_path / "autosave.scop"
+    save.write_bytes(b"wpn_ak74\x00wpn_ak74\x00wpn_mystery_gun12\x00wpn_bolt\x00")
+    scan = save_reader.scan_save(str(save), KNOWN_IDS)
+    assert scan.known == ["wpn_ak74"]
+    assert scan.unknown == ["wpn_mystery_gun"]
+    assert scan.token_counts == {"wpn_ak74": 2, "wpn_mystery_gun12": 1}
+    assert save_reader.scan_save(str(save), KNOWN_IDS) is scan
+
+    # A changed save (different size/mtime) is rescanned.
+    save.write_bytes(b"wpn_ak74\x00wpn_svd\x00wpn_svd\x00")
+    rescanned = save_reader.scan_save(str(save), KNOWN_IDS)
+    assert rescanned is not scan
+    assert rescanned.known == ["wpn_ak74", "wpn_svd"]
+    assert rescanned.token_counts["wpn_svd"] == 2
+
+
+def test_scan_save_cache_is_thread_safe(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    # More saves than cache slots, hammered from many threads: every lookup, insert and
+    # eviction races with the others, and no scan may come back empty.
+    saves = []
+    for i in range(save_reader.SCAN_CACHE_SIZE * 3):
+        save = tmp_path / f"save_{i}.scop"
+        save.write_bytes(b"wpn_ak74\x00" + f"wpn_gun{i}x\x00".encode())
+        saves.append(str(save))
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        scans = list(pool.map(lambda path: save_reader.scan_save(path, KNOWN_IDS), saves * 40))
+    assert all(scan.known == ["wpn_ak74"] for scan in scans)
+    assert len(save_reader._scan_cache) == save_reader.SCAN_CACHE_SIZE
+
+
+def test_scan_save_prefers_scoc_companion(tmp_path):
+    (tmp_path / "quick.scop").write_bytes(b"wpn_pkm\x00")
+    (tmp_path / "quick.scoc").write_bytes(b"wpn_groza\x00")
+    assert save_reader.scan_save(str(tmp_path / "quick.scop"), KNOWN_IDS).known == ["wpn_groza"]
+
+
+def test_bytes_token_scan_matches_decoded_text_scan():
+    """The mmap bytes regex must find the same tokens as decoding + lowercasing the save."""
+    import re
+    from collections import Counter
+
+    rng = random.Random(3)
+    blob = bytearray(rng.randbytes(200_000))
+    for _ in range(300):
+        token = rng.choice([b"wpn_ak74", b"WPN_Svd", b"wPn_spas12_custom", b"wpn_mp5k_hud"])
+        token += str(rng.randrange(1000)).encode("ascii")
+        pos = rng.randrange(len(blob) - len(token))
+        blob[pos:pos + len(token)] = token
+    blob = bytes(blob)
+
+    text = blob.decode("latin-1", errors="ignore").lower()
+    expected = Counter(re.findall(r"(wpn_[a-z0-9_]+)", text))
+    assert save_reader._count_weapon_tokens(blob) == expected
+
+
+def test_scan_all_saves_streams_and_skips_cached(tmp_path):
+    save_dir = tmp_path / "saves"
+    save_dir.mkdir()
+    contents = {
+        "a.scop": b"wpn_ak74\x00wpn_svd\x00",
+        "b.scop": b"wpn_ak74\x00wpn_groza\x00",
+        "c.scop": b"wpn_ak74\x00wpn_svd\x00wpn_pkm\x00",
+    }
+    for offset, (name, blob) in enumerate(contents.items()):
+        path = save_dir / name
+        path.write_bytes(blob)
+        os.utime(path, (1_000_000 + offset, 1_000_000 + offset))
+    cache_file = str(tmp_path / "bulk_cache.json")
+
+    events = list(save_reader.scan_all_saves(str(save_dir), KNOWN_IDS, cache_file, max_workers=2))
+    assert sorted(e.name for e in events) == sorted(contents)
+    assert [e.done for e in events] == [1, 2, 3]
+    assert not any(e.cached for e in events)
+
+    (save_dir / "b.scop").write_bytes(b"wpn_ak74\x00wpn_groza\x00wpn_val\x00")
+    os.utime(save_dir / "b.scop", (1_000_001, 1_000_001))
+    events = {e.name: e for e in save_reader.scan_all_saves(str(save_dir), KNOWN_IDS, cache_file)}
+    assert events["a.scop"].cached and events["c.scop"].cached
+    assert not events["b.scop"].cached
+    assert events["b.scop"].scan.known == ["wpn_ak74", "wpn_groza", "wpn_val"]
+
+    ordered = [(name, events[name].scan) for name in reversed(save_reader.get_savegames(str(save_dir)))]
+    assert save_reader.merge_save_scans(ordered, "union") == [
+        "wpn_ak74", "wpn_groza", "wpn_pkm", "wpn_svd", "wpn_val"]
+    assert save_reader.merge_save_scans(ordered, "intersection") == ["wpn_ak74"]
+    assert save_reader.merge_save_scans(ordered, "timeline") == [
+        "wpn_ak74", "wpn_svd", "wpn_groza", "wpn_val", "wpn_pkm"]
+    assert save_reader.first_seen_timeline(ordered)["wpn_pkm"] == "c.scop"
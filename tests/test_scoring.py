@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+# Reuse the streamlit mock + fixture CSV set up for the drafting tests.
+from tests.test_drafting import app
+
+EDGE_ROWS = """id,real_name,hit,rpm,slot,rec,rec_hor,mag,handling,ammo,class
+wpn_val_custom,Val,0.7,,2,1.5,,20,1.1,9x39_pab9,Sniper/DMR
+wpn_vss,VSS,0.7,900,2,1.4,0.4,20,0.9,,Sniper/DMR
+wpn_odd,Odd,0.5,300,1,0.0,0.2,12,1.0,45acp_hydro,
+wpn_eft_mp7a1,MP7,0.4,950,2,-1,0.1,40,1.0,4.6x30,SMG/PDW
+wpn_colt_heavy,Colt,0.9,120,1,2.0,0.7,7,1.2,11.43x23_fmj,Sidearm Heavy
+wpn_br,BR,0.8,500,2,1.9,0.6,20,1.0,7.62x51_fmj,Battle Rifle
+wpn_lmg,Ultimax,0.6,700,2,1.2,0.3,100,0.8,5.56x45_ss190,LMG
+wpn_ppsh,PPSh,0.4,1000,2,1.4,0.5,71,1.0,7.62x25,SMG
+wpn_pistol2,P2,0.4,300,1.0,1.0,0.4,15,1.0,9x18_fmj,pistol
+wpn_knife_like,Mystery,0.1,60,3,1.0,0.2,1,1.0,unknown,Launcher
+"""
+
+
+def _frames():
+    from io import StringIO
+    edge = pd.read_csv(StringIO(EDGE_ROWS))
+    base = app.df[[c for c in edge.columns if c in app.df.columns]]
+    return [app.df.copy(), edge, pd.concat([base, edge], ignore_index=True)]
+
+
+def _row_wise(frame, fn):
+    return frame.apply(fn, axis=1)
+
+
+def test_vectorized_columns_match_row_functions():
+    for frame in _frames():
+        pd.testing.assert_series_equal(app.get_mutant_killers(frame), _row_wise(frame, app.is_mutant_killer))
+        pd.testing.assert_series_equal(app.compute_scores(frame), _row_wise(frame, app.compute_score))
+        pd.testing.assert_series_equal(app.compute_adjusted_scores(frame), _row_wise(frame, app.compute_adjusted_score))
+        pd.testing.assert_series_equal(app.get_score_buckets(frame), _row_wise(frame, app.get_score_bucket))
+        pd.testing.assert_series_equal(app.get_roles(frame), _row_wise(frame, app.get_role))
+
+
+def test_caliber_weights_match_first_matching_pattern():
+    ammo = pd.Series(["5.56x45_fmj", ".45_acp", "11.43x23", "12x76_zhekan", None, np.nan, "", "7.62x54R"])
+    expected = ammo.map(app.get_caliber_weight)
+    pd.testing.assert_series_equal(app.get_caliber_weights(ammo), expected)
+
+
+def test_load_data_round_trips_through_binary_cache(tmp_path, monkeypatch):
+    from tests.test_drafting import _MOCK_CSV
+
+    # The binary cache is off under TESTING_ENV, so the real weapons_cache.* is never touched.
+    assert app.WEAPON_CACHE_META is None
+    assert app.BULK_SCAN_CACHE_FILE is None
+    (tmp_path / "weapons_stats.csv").write_text(_MOCK_CSV)
+    monkeypatch.setattr(app, "DATA_DIR", str(tmp_path))
+    app.load_data()
+    assert app.DATA_LOAD_INFO["source"] == "csv" and app.DATA_LOAD_INFO["key"] is None
+    assert not list(tmp_path.glob("weapons_cache*"))
+
+    monkeypatch.setattr(app, "WEAPON_CACHE_META", str(tmp_path / "weapons_cache.json"))
+
+    fresh = app.load_data()
+    assert app.DATA_LOAD_INFO["source"] == "csv"
+    cached = app.load_data()
+    assert app.DATA_LOAD_INFO["source"] == "cache"
+    pd.testing.assert_frame_equal(cached, fresh)
+
+    # Missing strings survive the npz encoding as NaN.
+    frame = fresh.copy()
+    frame.loc[0, 'real_name'] = np.nan
+    monkeypatch.setattr(app, "_feather", None)
+    app.save_weapon_cache("k", frame)
+    pd.testing.assert_frame_equal(app.load_weapon_cache("k"), frame)
+    assert app.load_weapon_cache("other-key") is None
+
+    # Any change to the CSV changes the key.
+    (tmp_path / "weapons_stats.csv").write_text(_MOCK_CSV + "\n")
+    app.load_data()
+    assert app.DATA_LOAD_INFO["source"] == "csv"
+
+
+def test_weapon_cache_write_failure_is_logged_not_raised(tmp_path, monkeypatch, caplog):
+    from tests.test_drafting import _MOCK_CSV
+
+    (tmp_path / "weapons_stats.csv").write_text(_MOCK_CSV)
+    monkeypatch.setattr(app, "DATA_DIR", str(tmp_path / "missing"))
+    monkeypatch.setattr(app, "WEAPON_CACHE_META", str(tmp_path / "missing" / "weapons_cache.json"))
+    with caplog.at_level("WARNING", logger=app.logger.name):
+        app.save_weapon_cache("k", app.enrich_weapon_table(pd.read_csv(tmp_path / "weapons_stats.csv")))
+    assert "Could not write weapon cache" in caplog.text
+    assert app.load_weapon_cache("k") is None
+
+def test_shared_weapon_table_is_reused_and_left_untouched_by_the_ui():
+    # Importing app ran every tab against the shared table; it must still equal a fresh build.
+    pd.testing.assert_frame_equal(app.df, app.enrich_weapon_table(app.pd.read_csv("weapons_stats.csv")))
+    assert {'global_rank', 'class_rank'} <= set(app.df.columns)
+
+    stamp = app.weapons_csv_stamp()
+    assert app.shared_weapon_table(stamp)[0] is app.df
+    assert app.shared_weapon_table(("new", 1))[0] is not app.df
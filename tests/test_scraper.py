@@ -0,0 +1,334 @@
+import os
+import random
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import scraper
+
+KEYS = ["hit_power", "rpm", "inv_grid_x", "ammo_class", "inv_name", "slot"]
+
+
+def legacy_get_v(sec, key, db, d=0):
+    """Reference copy of the original recursive lookup (depth-capped at 10)."""
+    if d > 10 or not sec or sec not in db: return None
+    if key in db[sec]: return db[sec][key]
+    return legacy_get_v(db[sec].get('parent'), key, db, d + 1)
+
+
+def _random_registry(rng, size=120):
+    names = [f"wpn_s{i}" for i in range(size)]
+    registry = {}
+    for i, sec in enumerate(names):
+        # Mostly point "up" to keep chains shallow, with a few cycles and dangling parents mixed in.
+        roll = rng.random()
+        if roll < 0.15 or i == 0:
+            parent = None
+        elif roll < 0.22:
+            parent = f"wpn_missing_{i}"
+        elif roll < 0.3:
+            parent = rng.choice(names)
+        else:
+            parent = names[rng.randrange(max(0, i - 6), i)]
+        entry = {'id': sec, 'mod': 'Vanilla', 'parent': parent, 'root': '.'}
+        for key in rng.sample(KEYS, rng.randrange(0, 4)):
+            entry[key] = f"{sec}:{key}"
+        registry[sec] = entry
+    return registry
+
+
+def _chain_depth(sec, registry):
+    seen = []
+    while sec in registry and sec not in seen:
+        seen.append(sec)
+        sec = registry[sec].get('parent')
+    return len(seen)
+
+
+def test_section_resolver_matches_recursive_lookup():
+    rng = random.Random(9)
+    for _ in range(20):
+        registry = _random_registry(rng)
+        resolver = scraper.SectionResolver(registry)
+        for sec in registry:
+            # The old lookup gave up after 11 levels; only compare where it could see the whole chain.
+            if _chain_depth(sec, registry) > 11: continue
+            flat = resolver.resolve(sec)
+            for key in KEYS:
+                assert flat.get(key) == legacy_get_v(sec, key, registry), (sec, key)
+
+
+def test_section_resolver_reports_missing_and_cyclic_parents():
+    registry = {
+        'wpn_a': {'id': 'wpn_a', 'parent': 'wpn_b', 'rpm': '600'},
+        'wpn_b': {'id': 'wpn_b', 'parent': 'wpn_a', 'hit_power': '0.5'},
+        'wpn_c': {'id': 'wpn_c', 'parent': 'wpn_a'},
+        'wpn_d': {'id': 'wpn_d', 'parent': 'wpn_gone'},
+    }
+    resolver = scraper.SectionResolver(registry)
+    assert resolver.resolve('wpn_c')['hit_power'] == '0.5'
+    assert resolver.resolve('wpn_b')['rpm'] == '600'
+    assert resolver.resolve('wpn_d')['parent'] == 'wpn_gone'
+    assert resolver.cyclic == {'wpn_a', 'wpn_b'}
+    assert resolver.missing_parents == {'wpn_d': 'wpn_gone'}
+
+
+def test_parallel_registry_matches_serial(tmp_path, monkeypatch):
+    mods = tmp_path / "mods"
+    rng = random.Random(4)
+    for m in ("001-base", "050-patch", "348-final"):
+        folder = mods / m / "gamedata" / "configs"
+        folder.mkdir(parents=True)
+        for i in range(30):
+            lines = []
+            for _ in range(3):
+                sec = f"wpn_gun{rng.randrange(12)}"
+                lines.append(f"![{sec}]:wpn_base{rng.randrange(3)}" if rng.random() < 0.3 else f"[{sec}]")
+                lines.append(f"rpm = {rng.randrange(300, 900)} ; comment")
+            (folder / f"w_{i:02d}.ltx").write_text("\n".join(lines) + "\n")
+    monkeypatch.setattr(scraper, "SCAN_PATHS", [mods])
+    monkeypatch.setattr(scraper, "LTX_PARALLEL_MIN_FILES", 1)
+    files = scraper.collect_ltx_files()
+
+    monkeypatch.setattr(scraper, "LTX_CACHE_FILE", tmp_path / "serial.pkl")
+    serial = scraper.build_registry(files, jobs=1)
+    monkeypatch.setattr(scraper, "LTX_CACHE_FILE", tmp_path / "parallel.pkl")
+    parallel = scraper.build_registry(files, jobs=3)
+    assert list(parallel.items()) == list(serial.items())
+    assert len(serial) > 10
+
+
+def test_icon_extraction_skips_unchanged_and_removes_orphans(tmp_path, monkeypatch):
+    import pandas as pd
+    from PIL import Image
+
+    tex_dir = tmp_path / "textures" / "ui"
+    tex_dir.mkdir(parents=True)
+    atlas = Image.new("RGBA", (200, 100), (0, 0, 0, 0))
+    atlas.paste((200, 30, 30, 255), (0, 0, 100, 50))
+    atlas.paste((30, 200, 30, 255), (100, 50, 200, 100))
+    atlas.save(tex_dir / "ui_icon_equipment.dds")
+
+    icon_dir = tmp_path / "icons"
+    monkeypatch.setattr(scraper, "TEXTURE_PATHS", [tmp_path / "textures"])
+    monkeypatch.setattr(scraper, "ICON_DIR", icon_dir)
+    monkeypatch.setattr(scraper, "OUT_DIR", tmp_path)
+    monkeypatch.setattr(scraper, "ICON_MANIFEST_FILE", icon_dir / "manifest.json")
+    monkeypatch.setattr(scraper, "ICON_TIMINGS_FILE", tmp_path / "timings.csv")
+    decoded = []
+    real_decode = scraper.decode_texture
+    monkeypatch.setattr(scraper, "decode_texture", lambda *a: decoded.append(a[0]) or real_decode(*a))
+
+    rows = pd.DataFrame([
+        {'id': 'wpn_red', 'tex': 'ui\\ui_icon_equipment', 'gx': 0, 'gy': 0, 'gw': 2, 'gh': 1},
+        {'id': 'wpn_green', 'tex': 'ui\\ui_icon_equipment', 'gx': 2, 'gy': 1, 'gw': 2, 'gh': 1},
+    ])
+    scraper.extract_icons(rows, jobs=2)
+    assert len(decoded) == 1
+    with Image.open(icon_dir / "wpn_red.png") as icon:
+        assert icon.size == (100, 50)
+        assert icon.getpixel((10, 10)) == (200, 30, 30, 255)
+
+    scraper.extract_icons(rows, jobs=2)
+    assert len(decoded) == 1
+
+    scraper.extract_icons(rows[rows['id'] == 'wpn_red'], jobs=2)
+    assert len(decoded) == 1
+    assert not (icon_dir / "wpn_green.png").exists()
+    assert (icon_dir / "wpn_red.png").exists()
+    assert (tmp_path / "icon_atlas.json").exists()
+
+    # --rebuild-icons re-cuts everything but still cleans up icons of vanished weapons.
+    scraper.extract_icons(rows, jobs=2)
+    assert len(decoded) == 2
+    scraper.extract_icons(rows[rows['id'] == 'wpn_green'], jobs=2, rebuild=True)
+    assert len(decoded) == 3
+    assert not (icon_dir / "wpn_red.png").exists()
+    assert (icon_dir / "wpn_green.png").exists()
+
+
+def legacy_is_junk(sec):
+    """Reference copy of the original per-pattern loop."""
+    import re
+    return any(re.search(pat, sec.lower()) for pat in scraper.JUNK_PATTERNS)
+
+
+def legacy_weapon_class(sec, ammo, slot, d):
+    """Reference copy of the original keyword scans in get_weapon_class."""
+    id_l, ammo, kind = sec.lower(), str(ammo).lower(), str(d.get('kind', '')).lower()
+    is_sniper = any(x in id_l or x in kind for x in ['sniper', 'vssk', 'svd', 'dvl', 'l96', 'm24', 'trg', 'm98', 'scout', 'remington', 'sr25', 'dmr'])
+    if any(x in ammo for x in ['12x70', '12x76', '23x75']): return "Shotgun"
+    if any(x in ammo for x in ['7.62x51', '7.62x54', '308', 'magnum_300', '338_lapua', '12.7x55']):
+        if is_sniper: return "Sniper/DMR"
+        if any(x in id_l for x in ['deagle', 'rex', 'mp412', 'desert_eagle']): return "Pistol"
+        if slot == 1: return "Sidearm Heavy"
+        return "Battle Rifle"
+    if is_sniper: return "Sniper/DMR"
+    if slot == 1:
+        if any(x in id_l for x in ['p90', 'mp7', 'mp5k', 'aps']): return "SMG/PDW"
+        return "Pistol"
+    mag_size = scraper.clean_num(d.get('ammo_mag_size', 0))
+    if mag_size and mag_size > 60: return "LMG"
+    if any(x in id_l or x in kind for x in ['mp5', 'vityaz', 'ump', 'vector', 'pp2000', 'bizon', 'mp7', 'p90']): return "SMG"
+    if any(x in id_l or x in kind for x in ['vss', 'val', 'sr3', '7.62x39_sniper']): return "Sniper/DMR"
+    return "Assault Rifle"
+
+
+def test_compiled_rules_match_per_pattern_loops():
+    import scraper_rules
+    rng = random.Random(21)
+    stems = ["wpn_ak74", "wpn_svd", "wpn_mp5k", "wpn_deagle", "wpn_val", "wpn_pkm", "wpn_vector", "wpn_rex"]
+    tokens = [p.strip('_$') for p in scraper.JUNK_PATTERNS] + ["n", "kit", "custom", "c1", "k3x", "scout", "aps", "p90"]
+    ammo = ["9x19_fmj", "12x70_buck", "7.62x54_7h1", "308_win", "5.45x39", "", "7.62x39_sniper"]
+    for _ in range(3000):
+        sec = "_".join([rng.choice(stems)] + rng.sample(tokens, rng.randrange(0, 3)))
+        if rng.random() < 0.3: sec = sec.upper()
+        assert scraper.is_junk_section(sec) == legacy_is_junk(sec), sec
+        d = {'kind': rng.choice(["", "w_sniper", "w_smg", "w_rifle"]), 'ammo_mag_size': rng.choice(["30", "100", None])}
+        a, slot = rng.choice(ammo), rng.choice([1, 2])
+        assert scraper.get_weapon_class(sec, a, slot, d, {}) == legacy_weapon_class(sec, a, slot, d), sec
+
+    # Matches name the deciding pattern.
+    assert scraper_rules.JUNK_SECTIONS.search("wpn_ak74_kobra_n") == "_kobra"
+    assert scraper_rules.JUNK_SECTIONS.all_matches("wpn_ak74_kobra_n") == ["_kobra", "_n$"]
+    assert scraper_rules.classify_weapon("wpn_svd", "7.62x54_7h1", 2, "", 10) == ("Sniper/DMR", "heavy_ammo:7.62x54+sniper:svd")
+
+
+def test_lazy_translations_match_full_load_and_use_cache(tmp_path, monkeypatch):
+    eng = tmp_path / "mods" / "001-base" / "gamedata" / "configs" / "text" / "eng"
+    late = tmp_path / "mods" / "200-patch" / "gamedata" / "configs" / "text" / "eng"
+    rus = tmp_path / "mods" / "200-patch" / "gamedata" / "configs" / "text" / "rus"
+    for folder in (eng, late, rus):
+        folder.mkdir(parents=True)
+    entry = lambda s_id, text: f'<string id="{s_id}"><text>{text}</text></string>'
+    (eng / "st_a.xml").write_text("<root>" + entry("st_wpn_ak", "AK base") + entry("st_wpn_svd", "SVD") + "</root>")
+    (eng / "st_b.xml").write_text("<root>" + entry("st_unrelated", "x") + "</root>")
+    # Malformed XML goes through the regex fallback; later files override earlier ones.
+    (late / "st_c.xml").write_text("<root>" + entry("ST_WPN_AK", "AK patched") + "<broken></root>")
+    (rus / "st_a.xml").write_text("<root>" + entry("st_wpn_svd", "СВД") + "</root>")
+
+    monkeypatch.setattr(scraper, "TEXT_PATHS", [tmp_path / "mods"])
+    monkeypatch.setattr(scraper, "TRANSLATION_CACHE_FILE", tmp_path / "translations_cache.json")
+    monkeypatch.setattr(scraper, "translations", {})
+    full = {}
+    for p in scraper.collect_translation_files():
+        full.update(scraper.parse_translation_file(p))
+
+    parsed = []
+    real_parse = scraper.parse_translation_file
+    monkeypatch.setattr(scraper, "parse_translation_file", lambda p: parsed.append(os.path.basename(p)) or real_parse(p))
+    wanted = ["st_wpn_ak", "ST_WPN_SVD", "st_missing"]
+    scraper.resolve_translations(wanted)
+    assert {s: scraper.translate(s) for s in wanted} == {s: full.get(s.lower()) for s in wanted}
+    assert "st_b.xml" not in parsed  # byte prefilter skipped it
+
+    parsed.clear()
+    monkeypatch.setattr(scraper, "translations", {})
+    scraper.resolve_translations(wanted)
+    assert parsed == [] and scraper.translate("st_wpn_svd") == "SVD"
+
+    for path in (eng / "st_a.xml", late / "st_c.xml"):
+        path.write_text("<root>" + entry("st_wpn_ak", "AK v2") + "</root>")
+        os.utime(path, ns=(1, 10**18))
+    scraper.resolve_translations(["st_wpn_ak"])
+    assert scraper.translate("st_wpn_ak") == "AK v2"
+
+
+def test_file_index_matches_os_walk_and_reuses_unchanged_dirs(tmp_path):
+    mods = tmp_path / "mods"
+    for rel, text in [("a/gamedata/configs/w_ak.ltx", "x"), ("a/gamedata/configs/text/eng/st.xml", "<a/>"),
+                      ("a/gamedata/textures/ui/icons.dds", "dds"), ("a/gamedata/configs/readme.txt", ""),
+                      ("b/gamedata/configs/sub/w_svd.ltx", "y"), ("b/.git/skip.ltx", "z")]:
+        (mods / rel).parent.mkdir(parents=True, exist_ok=True)
+        (mods / rel).write_text(text)
+    roots = [mods, mods / "a" / "gamedata" / "configs" / "text", tmp_path / "missing"]
+    cache = tmp_path / "fs_index.pkl"
+
+    def listing(walk):
+        return [(root, [f for f in files if f.lower().endswith(scraper.FS_INDEX_EXTS)])
+                for root, _, files in walk]
+
+    index = scraper.build_file_index(roots, jobs=2, cache_file=cache)
+    expected = []
+    for root, dirs, files in os.walk(mods):
+        dirs[:] = sorted(d for d in dirs if d not in scraper.FS_SKIP_DIRS)
+        expected.append((root, dirs, sorted(files)))
+    assert listing(index.walk(mods)) == listing(expected)
+    assert [r for r, _, _ in index.walk(roots[1])] == [str(roots[1]), str(roots[1] / "eng")]
+    assert list(index.walk(roots[2])) == []
+
+    ltx = mods / "b" / "gamedata" / "configs" / "sub" / "w_svd.ltx"
+    st = os.stat(ltx)
+    assert index.stamp(str(ltx)) == (st.st_mtime_ns, st.st_size)
+
+    # Second run reuses every listing but still notices an edited file; a new file changes its dir.
+    ltx.write_text("longer")
+    os.utime(ltx, ns=(st.st_mtime_ns + 10**9, st.st_mtime_ns + 10**9))
+    cached = scraper.load_file_index_cache(cache)
+    assert all(scraper.scan_index_dir(p, cached.get(p))[1] for p in cached)
+    index = scraper.build_file_index(roots, cache_file=cache)
+    assert index.stamp(str(ltx)) == (st.st_mtime_ns + 10**9, 6)
+
+    new = ltx.parent / "w_new.ltx"
+    new.write_text("n")
+    os.utime(ltx.parent, ns=(st.st_mtime_ns + 2 * 10**9,) * 2)
+    assert scraper.scan_index_dir(str(ltx.parent), scraper.load_file_index_cache(cache)[str(ltx.parent)])[1] is False
+    index = scraper.build_file_index(roots, cache_file=cache)
+    assert [f for _, _, files in index.walk(ltx.parent) for f in files] == ["w_new.ltx", "w_svd.ltx"]
+
+
+def test_pipeline_stages_resume_from_checkpoints(tmp_path, monkeypatch):
+    from PIL import Image
+
+    configs = tmp_path / "mods" / "001-guns" / "gamedata" / "configs"
+    configs.mkdir(parents=True)
+    (configs / "w_guns.ltx").write_text(
+        "[wpn_frame]\nhit_power = 0.5\ninv_grid_x = 0\ninv_grid_y = 0\ninv_grid_width = 2\n"
+        "[wpn_ak]:wpn_frame\nrpm = 600\nammo_class = ammo_5.45x39_fmj\n"
+        "[wpn_svd]:wpn_frame\ninv_grid_x = 2\nammo_class = ammo_7.62x54_7h1\n"
+    )
+    tex_dir = tmp_path / "textures" / "ui"
+    tex_dir.mkdir(parents=True)
+    Image.new("RGBA", (200, 50), (90, 90, 90, 255)).save(tex_dir / "ui_icon_equipment.dds")
+
+    out = tmp_path / "out"
+    out.mkdir()
+    for name, value in [("SCAN_PATHS", [tmp_path / "mods"]), ("TEXT_PATHS", []),
+                        ("TEXTURE_PATHS", [tmp_path / "textures"]), ("OUT_DIR", out),
+                        ("FS_INDEX_FILE", out / "fs_index.pkl"), ("LTX_CACHE_FILE", out / "ltx.pkl"),
+                        ("TRANSLATION_CACHE_FILE", out / "tr.json"), ("ICON_DIR", out / "icons"),
+                        ("ICON_MANIFEST_FILE", out / "icons" / "manifest.json"),
+                        ("ICON_TIMINGS_FILE", out / "timings.csv")]:
+        monkeypatch.setattr(scraper, name, value)
+    checkpoints = tmp_path / "checkpoints"
+    args = scraper.parse_args(["--jobs", "1"])
+
+    run = scraper.run_pipeline(args, checkpoint_dir=checkpoints)
+    csv = (out / "weapons_stats.csv").read_text()
+    assert sorted(run.outputs["dedupe"]["id"]) == ["wpn_ak", "wpn_frame", "wpn_svd"]
+    assert set(run.outputs["dedupe"]["class"]) == {"Assault Rifle", "Sniper/DMR"}
+    assert scraper.available_checkpoints(checkpoints) == {"discover", "parse", "resolve", "classify", "dedupe"}
+    assert (out / "icons" / "wpn_svd.png").exists()
+
+    # Later stages never touch the LTX files again.
+    def no_parse(*a, **k):
+        raise AssertionError("LTX stages re-ran")
+    monkeypatch.setattr(scraper, "collect_ltx_files", no_parse)
+    monkeypatch.setattr(scraper, "build_registry", no_parse)
+    (out / "weapons_stats.csv").unlink()
+    (out / "icons" / "wpn_svd.png").unlink()
+    assert scraper.plan_stages(["icons", "stats"], scraper.available_checkpoints(checkpoints)) == ["stats", "icons"]
+    scraper.run_pipeline(args, ["stats", "icons"], checkpoint_dir=checkpoints)
+    assert (out / "weapons_stats.csv").read_text() == csv
+    assert (out / "icons" / "wpn_svd.png").exists()
+
+    scraper.checkpoint_path("dedupe", checkpoints).write_bytes(b"corrupt")
+    assert scraper.plan_stages(["icons"], scraper.available_checkpoints(checkpoints)) == ["dedupe", "icons"]
+    scraper.run_pipeline(args, scraper.STAGES[scraper.STAGES.index("classify"):], checkpoint_dir=checkpoints)
+    assert (out / "weapons_stats.csv").read_text() == csv
+    assert scraper.plan_stages(["icons"], set()) == ["discover", "parse", "resolve", "classify", "dedupe", "icons"]
+
+
+def test_app_stage_list_matches_scraper():
+    from tests.test_drafting import app
+    assert app.SCRAPER_STAGES == scraper.STAGES